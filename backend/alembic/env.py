@@ -9,7 +9,14 @@ from alembic import context
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.database import Base, engine
-from app.models import User, Analysis
+from app.models import (
+    User,
+    Analysis,
+    ScoreRollup,
+    TrackedRepo,
+    SchedulerLock,
+    SharedStateEntry,
+)
 
 config = context.config
 if config.config_file_name is not None:
@@ -0,0 +1,109 @@
+"""add score_rollups
+
+Revision ID: 0054fa0cd7b4
+Revises: 6797a98f8737
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+from typing import Sequence, Union
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0054fa0cd7b4'
+down_revision: Union[str, Sequence[str], None] = '6797a98f8737'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCORE_KEYS = ['test', 'comment', 'commit_size', 'commit_frequency', 'commit_message', 'activity']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('score_rollups',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('repo_url', sa.String(), nullable=False),
+    sa.Column('branch', sa.String(), nullable=False),
+    sa.Column('bucket_date', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('test_sum', sa.Integer(), nullable=False),
+    sa.Column('test_min', sa.Integer(), nullable=True),
+    sa.Column('test_max', sa.Integer(), nullable=True),
+    sa.Column('comment_sum', sa.Integer(), nullable=False),
+    sa.Column('comment_min', sa.Integer(), nullable=True),
+    sa.Column('comment_max', sa.Integer(), nullable=True),
+    sa.Column('commit_size_sum', sa.Integer(), nullable=False),
+    sa.Column('commit_size_min', sa.Integer(), nullable=True),
+    sa.Column('commit_size_max', sa.Integer(), nullable=True),
+    sa.Column('commit_frequency_sum', sa.Integer(), nullable=False),
+    sa.Column('commit_frequency_min', sa.Integer(), nullable=True),
+    sa.Column('commit_frequency_max', sa.Integer(), nullable=True),
+    sa.Column('commit_message_sum', sa.Integer(), nullable=False),
+    sa.Column('commit_message_min', sa.Integer(), nullable=True),
+    sa.Column('commit_message_max', sa.Integer(), nullable=True),
+    sa.Column('activity_sum', sa.Integer(), nullable=False),
+    sa.Column('activity_min', sa.Integer(), nullable=True),
+    sa.Column('activity_max', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'repo_url', 'branch', 'bucket_date')
+    )
+
+    # 既存の分析から日次集計を作成
+    bind = op.get_bind()
+    analyses = sa.table(
+        'analyses',
+        sa.column('user_id', sa.String()),
+        sa.column('repo_url', sa.String()),
+        sa.column('branch', sa.String()),
+        sa.column('scores', sa.JSON()),
+        sa.column('created_at', sa.DateTime()),
+    )
+    rollups = {}
+    for row in bind.execute(sa.select(analyses)):
+        if row.created_at is None:
+            continue
+        key = (row.user_id, row.repo_url, row.branch or 'main', row.created_at.date())
+        rollup = rollups.setdefault(key, {'count': 0})
+        rollup['count'] += 1
+        for k in SCORE_KEYS:
+            value = row.scores[k]
+            rollup[f'{k}_sum'] = rollup.get(f'{k}_sum', 0) + value
+            rollup[f'{k}_min'] = min(rollup.get(f'{k}_min', value), value)
+            rollup[f'{k}_max'] = max(rollup.get(f'{k}_max', value), value)
+
+    if rollups:
+        score_rollups = sa.table(
+            'score_rollups',
+            sa.column('id', sa.String()),
+            sa.column('user_id', sa.String()),
+            sa.column('repo_url', sa.String()),
+            sa.column('branch', sa.String()),
+            sa.column('bucket_date', sa.Date()),
+            sa.column('count', sa.Integer()),
+            *[
+                sa.column(f'{k}_{agg}', sa.Integer())
+                for k in SCORE_KEYS
+                for agg in ('sum', 'min', 'max')
+            ],
+        )
+        op.bulk_insert(score_rollups, [
+            {
+                'id': str(uuid.uuid4()),
+                'user_id': user_id,
+                'repo_url': repo_url,
+                'branch': branch,
+                'bucket_date': bucket_date,
+                **values,
+            }
+            for (user_id, repo_url, branch, bucket_date), values in rollups.items()
+        ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('score_rollups')
@@ -0,0 +1,70 @@
+"""compress report
+
+Revision ID: 45c5e97b3cea
+Revises: 9c3e5b1d7a24
+Create Date: 2026-10-19 10:48:09.530812
+
+"""
+from typing import Sequence, Union
+import json
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45c5e97b3cea'
+down_revision: Union[str, Sequence[str], None] = '9c3e5b1d7a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+analyses = sa.table(
+    'analyses',
+    sa.column('id', sa.String()),
+    sa.column('report', sa.JSON()),
+    sa.column('report_compressed', sa.LargeBinary()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('analyses') as batch_op:
+        batch_op.add_column(sa.Column('report_compressed', sa.LargeBinary(), nullable=True))
+
+    # JSONをzlib圧縮してバックフィル
+    bind = op.get_bind()
+    for row in bind.execute(sa.select(analyses.c.id, analyses.c.report)).all():
+        compressed = zlib.compress(
+            json.dumps(row.report, ensure_ascii=False).encode('utf-8')
+        )
+        bind.execute(
+            analyses.update()
+            .where(analyses.c.id == row.id)
+            .values(report_compressed=compressed)
+        )
+
+    with op.batch_alter_table('analyses') as batch_op:
+        batch_op.alter_column('report_compressed', existing_type=sa.LargeBinary(), nullable=False)
+        batch_op.drop_column('report')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('analyses') as batch_op:
+        batch_op.add_column(sa.Column('report', sa.JSON(), nullable=True))
+
+    bind = op.get_bind()
+    for row in bind.execute(
+        sa.select(analyses.c.id, analyses.c.report_compressed)
+    ).all():
+        bind.execute(
+            analyses.update()
+            .where(analyses.c.id == row.id)
+            .values(report=json.loads(zlib.decompress(row.report_compressed)))
+        )
+
+    with op.batch_alter_table('analyses') as batch_op:
+        batch_op.alter_column('report', existing_type=sa.JSON(), nullable=False)
+        batch_op.drop_column('report_compressed')
@@ -0,0 +1,86 @@
+"""extract scores into columns
+
+Revision ID: 9c3e5b1d7a24
+Revises: 0054fa0cd7b4
+Create Date: 2026-10-19 10:02:47.118340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3e5b1d7a24'
+down_revision: Union[str, Sequence[str], None] = '0054fa0cd7b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCORE_KEYS = [
+    'test',
+    'comment',
+    'commit_size',
+    'commit_frequency',
+    'commit_message',
+    'activity',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. スコア用カラムを追加（バックフィルまではNULL許可）
+    with op.batch_alter_table('analyses') as batch_op:
+        for key in SCORE_KEYS:
+            batch_op.add_column(sa.Column(f'score_{key}', sa.Integer(), nullable=True))
+
+    # 2. JSONからバックフィル
+    bind = op.get_bind()
+    analyses = sa.table(
+        'analyses',
+        sa.column('id', sa.String()),
+        sa.column('scores', sa.JSON()),
+        *[sa.column(f'score_{key}', sa.Integer()) for key in SCORE_KEYS],
+    )
+    for row in bind.execute(sa.select(analyses.c.id, analyses.c.scores)).all():
+        bind.execute(
+            analyses.update()
+            .where(analyses.c.id == row.id)
+            .values({f'score_{key}': row.scores[key] for key in SCORE_KEYS})
+        )
+
+    # 3. NOT NULL化・JSONカラム削除・インデックス作成
+    with op.batch_alter_table('analyses') as batch_op:
+        for key in SCORE_KEYS:
+            batch_op.alter_column(f'score_{key}', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_column('scores')
+        for key in SCORE_KEYS:
+            batch_op.create_index(
+                f'ix_analyses_user_id_score_{key}', ['user_id', f'score_{key}']
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('analyses') as batch_op:
+        batch_op.add_column(sa.Column('scores', sa.JSON(), nullable=True))
+
+    bind = op.get_bind()
+    analyses = sa.table(
+        'analyses',
+        sa.column('id', sa.String()),
+        sa.column('scores', sa.JSON()),
+        *[sa.column(f'score_{key}', sa.Integer()) for key in SCORE_KEYS],
+    )
+    for row in bind.execute(sa.select(analyses)).all():
+        bind.execute(
+            analyses.update()
+            .where(analyses.c.id == row.id)
+            .values(scores={key: row._mapping[f'score_{key}'] for key in SCORE_KEYS})
+        )
+
+    with op.batch_alter_table('analyses') as batch_op:
+        batch_op.alter_column('scores', existing_type=sa.JSON(), nullable=False)
+        for key in SCORE_KEYS:
+            batch_op.drop_index(f'ix_analyses_user_id_score_{key}')
+            batch_op.drop_column(f'score_{key}')
@@ -0,0 +1,51 @@
+"""encrypt github access tokens
+
+Revision ID: f4c2a9d1b7e3
+Revises: d81f3b6a2c47
+Create Date: 2026-10-19 18:40:12.204517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.token_vault import PREFIX, token_vault
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c2a9d1b7e3'
+down_revision: Union[str, Sequence[str], None] = 'd81f3b6a2c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.String()),
+    sa.column('github_access_token', sa.String()),
+)
+
+
+def _convert(convert, encrypted: bool) -> None:
+    """平文/暗号文のトークンを1行ずつ変換（鍵はTOKEN_VAULT_KEY_FILE）"""
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(users.c.id, users.c.github_access_token)).all()
+    for user_id, token in rows:
+        if token.startswith(PREFIX + ".") != encrypted:
+            continue
+        connection.execute(
+            users.update()
+            .where(users.c.id == user_id)
+            .values(github_access_token=convert(token))
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 平文で保存されているトークンを暗号化する
+    _convert(token_vault.encrypt, encrypted=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _convert(token_vault.decrypt, encrypted=True)
@@ -0,0 +1,167 @@
+# app/admission.py
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict
+
+from app.config import settings
+from app.exceptions import AppException, ErrorCode
+from app.logger import logger
+from app.shared_state import shared_state
+
+
+@dataclass
+class Ticket:
+    """受け付けた分析（releaseで枠を返す）"""
+
+    user_id: str
+
+
+class AdmissionController:
+    """
+    重い分析リクエストの受付制御
+    - ユーザーごとの同時実行数（待ち行列にいる分も含む）と、一定時間あたりの回数
+    - ワーカー全体の実行中の上限。超えた分は上限付きの待ち行列で順番を待つ
+    - 受け付けられなければ 429 + Retry-After
+    - 回数制限のカウンターはワーカー間で共有（shared_state）、同時実行数はワーカーごと
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        queue_size: int,
+        queue_timeout: float,
+        user_max_concurrency: int,
+        user_rate_limit: int,
+        user_rate_window: int,
+    ):
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.user_max_concurrency = user_max_concurrency
+        self.user_rate_limit = user_rate_limit
+        self.user_rate_window = user_rate_window
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._user_active: Dict[str, int] = {}
+
+    @staticmethod
+    def _reject(code: ErrorCode, message: str, retry_after: float) -> AppException:
+        logger.warning(f"Admission | Rejected | {code.value} | {message}")
+        return AppException(
+            429,
+            code,
+            message,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def _check_rate(self, user_id: str, cost: int) -> str:
+        """固定窓の回数制限（窓の終わりまでの秒数をRetry-Afterにする）。数えたカウンターのキーを返す"""
+        now = time.time()
+        window = int(now // self.user_rate_window)
+        key = f"admission:rate:{user_id}:{window}"
+        count = await shared_state.aincr(key, ttl=self.user_rate_window, amount=cost)
+        if count > self.user_rate_limit:
+            raise self._reject(
+                ErrorCode.RATE_LIMIT_EXCEEDED,
+                f"Rate limit exceeded: {self.user_rate_limit} analyses "
+                f"per {self.user_rate_window} seconds",
+                (window + 1) * self.user_rate_window - now,
+            )
+        return key
+
+    async def _refund_rate(self, key: str, cost: int) -> None:
+        """受け付けなかったリクエストの分を回数から戻す（失敗しても元のエラーを返す）"""
+        try:
+            await shared_state.aincr(key, ttl=self.user_rate_window, amount=-cost)
+        except Exception as e:
+            logger.warning(f"Admission | Refund failed | {type(e).__name__}: {e}")
+
+    async def acquire(self, user_id: str, cost: int = 1) -> Ticket:
+        active = self._user_active.get(user_id, 0)
+        if active >= self.user_max_concurrency:
+            raise self._reject(
+                ErrorCode.RATE_LIMIT_EXCEEDED,
+                f"Too many concurrent analyses (max {self.user_max_concurrency})",
+                settings.admission_retry_after_seconds,
+            )
+        # 回数の確認で待つ間に同じユーザーの別のリクエストが割り込まないよう、先に数える
+        self._user_active[user_id] = active + 1
+        try:
+            key = await self._check_rate(user_id, cost)
+            try:
+                await self._acquire_slot()
+            except AppException:
+                # 混雑で断った分まで回数に数えると、待って出直したクライアントが429になる
+                await self._refund_rate(key, cost)
+                raise
+        except BaseException:
+            self._release_user(user_id)
+            raise
+        return Ticket(user_id)
+
+    async def _acquire_slot(self) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise self._reject(
+                ErrorCode.SERVER_BUSY,
+                "Server is busy",
+                settings.admission_retry_after_seconds,
+            )
+
+        # 空いた枠はreleaseで先頭の待ちに直接渡される（in_flightはそのまま）
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter not in self._waiters:
+                # タイムアウトと同時に枠を受け取っていた
+                return
+            self._waiters.remove(waiter)
+            raise self._reject(
+                ErrorCode.SERVER_BUSY,
+                "Server is busy",
+                settings.admission_retry_after_seconds,
+            )
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done():
+                # 枠を受け取った直後にキャンセルされたら次に回す
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _release_user(self, user_id: str) -> None:
+        active = self._user_active.get(user_id, 0) - 1
+        if active > 0:
+            self._user_active[user_id] = active
+        else:
+            self._user_active.pop(user_id, None)
+
+    def release(self, ticket: Ticket) -> None:
+        self._release_slot()
+        self._release_user(ticket.user_id)
+
+
+# 分析系エンドポイントで共有する受付制御（ワーカーごと）
+admission = AdmissionController(
+    max_in_flight=settings.admission_max_in_flight,
+    queue_size=settings.admission_queue_size,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+    user_max_concurrency=settings.admission_user_max_concurrency,
+    user_rate_limit=settings.admission_user_rate_limit,
+    user_rate_window=settings.admission_user_rate_window_seconds,
+)
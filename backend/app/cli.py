@@ -0,0 +1,381 @@
+# app/cli.py
+"""
+Webサーバーを通さずに実行するコマンド（大量の分析をAPIのワーカーと競合させずに流す用）
+
+    python -m app.cli analyze [ファイル]         リポジトリの一覧を分析する（省略時・"-"は標準入力）
+        --user-id ID      このユーザーのGitHubトークンで取得し、分析をDBに保存する
+        --output jsonl    DBには保存せず、スコアとレポートを出力する
+                          （トークンは --user-id のユーザーか環境変数 GITHUB_TOKEN）
+        --concurrency N   同時に分析するリポジトリ数
+        --batch-size N    DBにまとめてINSERTする件数
+      一覧は1行1リポジトリで「repo_url [branch]」か、POST /analyses と同じJSON
+      （incrementalは使えない。空行と#で始まる行は無視）
+
+    python -m app.cli rescore <分析ID> ...      指定した分析をアーカイブから分析し直す
+    python -m app.cli rescore --all             アーカイブのある分析をすべて分析し直す
+        --user-id ID      そのユーザーの分析だけ
+        --before 日時     その日時より前に更新された分析だけ（中断した続きから再開する用）
+        --concurrency N   同時に分析する件数
+
+    python -m app.cli init-token-key            アクセストークンの暗号化鍵のファイルを作る
+        --key-file PATH   作る場所（省略時はTOKEN_VAULT_KEY_FILE。既にあれば何もせず終了コード1）
+        --stdout          ファイルを作らず鍵を標準出力に出す（TOKEN_VAULT_KEYSに入れる用）
+
+- 結果は1件1行のJSON（JSONL）で標準出力に、ログは標準エラーに出す
+- 失敗した分析があれば終了コード1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.exceptions import AppException
+from app.logger import logger
+from app.models import Analysis, User
+from app.schemas import AnalysisRequest
+from app.services.analysis_service import (
+    fetch_commits_from_github,
+    rescore_analysis,
+    rescore_archived_analyses,
+)
+from app.services.commit_archive import pack_commits
+from app.services.commit_filter import CommitFilter
+from app.services.gemini_client import analyze_commits
+from app.services.github_client import GitHubClient
+from app.services.rollup_service import add_to_rollup
+from app.token_vault import TokenVaultError, generate_key, generate_key_file
+
+Result = Tuple[str, Optional[Analysis], Optional[AppException]]
+
+
+def _log_to_stderr() -> None:
+    """標準出力は結果だけにする"""
+    for handler in logger.handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+            handler.setStream(sys.stderr)
+
+
+def _parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _parse_repo_line(line: str) -> AnalysisRequest:
+    """「repo_url [branch]」かJSONの1行をAnalysisRequestにする"""
+    if line.startswith("{"):
+        request = AnalysisRequest.model_validate_json(line)
+    else:
+        repo_url, *rest = line.split()
+        if len(rest) > 1:
+            raise ValueError("expected: repo_url [branch]")
+        request = AnalysisRequest(
+            repo_url=repo_url, **({"branch": rest[0]} if rest else {})
+        )
+    if request.incremental:
+        raise ValueError("incremental is not supported in the CLI")
+    return request
+
+
+def _read_repo_lines(stream: TextIO) -> Iterable[Tuple[int, str]]:
+    """(行番号, 行)。空行とコメントは飛ばす"""
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield number, line
+
+
+class AnalyzeJob:
+    """
+    リポジトリの一覧を、concurrency件ずつ並行して分析する
+    - GitHubClient（接続・同時リクエスト数・レート制限の残量）を全リポジトリで共有
+    - 一覧は少しずつ読み（待ち行列はconcurrencyの2倍まで）、結果は完了した順に1行ずつ出力
+    - DBに保存する場合は、batch_size件ごとにまとめてINSERTし、保存できた分の結果（id付き）を出力する
+      保存に失敗したら次の保存でやり直し、最後まで保存できなかった分はエラーとして出力する
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        user_id: Optional[str],
+        concurrency: int,
+        batch_size: int,
+        out: TextIO,
+    ):
+        self.access_token = access_token
+        self.user_id = user_id
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.out = out
+        # 保存待ちの分析と、保存後に出力する結果
+        self.pending: List[Tuple[Analysis, dict]] = []
+        self.failed = 0
+
+    def _emit(self, line: dict) -> None:
+        print(json.dumps(line, ensure_ascii=False), file=self.out, flush=True)
+
+    def _error(self, number: int, repo_url: Optional[str], code: str, message: str):
+        self.failed += 1
+        self._emit(
+            {
+                "line": number,
+                "repo_url": repo_url,
+                "status": "error",
+                "code": code,
+                "message": message,
+            }
+        )
+
+    def _flush(self, final: bool = False) -> None:
+        """保存待ちをINSERTし、保存できたら結果を出力する（finalなら失敗分をエラーにする）"""
+        if not self.pending:
+            return
+        batch = self.pending
+        try:
+            with SessionLocal() as db:
+                db.add_all([analysis for analysis, _ in batch])
+                for analysis, _ in batch:
+                    add_to_rollup(db, analysis)
+                db.commit()
+        except Exception as e:
+            logger.error(f"CLI | Save failed | {len(batch)} analyses | {e}")
+            if not final:
+                return
+            self.pending = []
+            for _, line in batch:
+                message = f"Failed to save: {type(e).__name__}: {e}"
+                self._error(line["line"], line["repo_url"], "INTERNAL_ERROR", message)
+            return
+        logger.info(f"CLI | Saved | {len(batch)} analyses")
+        self.pending = []
+        for _, line in batch:
+            self._emit(line)
+
+    async def _analyze(
+        self, client: GitHubClient, number: int, request: AnalysisRequest
+    ) -> None:
+        save = self.user_id is not None
+        records = [] if save and settings.commit_archive_enabled else None
+        try:
+            parsed_log = await fetch_commits_from_github(
+                request.repo_url,
+                request.branch,
+                request.limit,
+                self.access_token,
+                client=client,
+                commit_filter=CommitFilter.from_request(request),
+                records=records,
+            )
+            result = await analyze_commits(parsed_log)
+        except AppException as e:
+            self._error(number, request.repo_url, e.code.value, e.message)
+            return
+        except Exception as e:
+            logger.warning(
+                f"CLI | Error | {request.repo_url} | {type(e).__name__}: {e}"
+            )
+            self._error(number, request.repo_url, type(e).__name__, str(e))
+            return
+
+        line = {
+            "line": number,
+            "repo_url": request.repo_url,
+            "branch": request.branch,
+            "status": "success",
+            "scores": result["scores"],
+        }
+        if save:
+            # 集計に使うので、日時はINSERT前に確定させる
+            now = datetime.now(timezone.utc)
+            analysis = Analysis(
+                id=str(uuid.uuid4()),
+                user_id=self.user_id,
+                repo_url=request.repo_url,
+                branch=request.branch,
+                scores=result["scores"],
+                report=result["report"],
+                commits_compressed=pack_commits(records) if records else None,
+                created_at=now,
+                updated_at=now,
+            )
+            # idは保存できてから出力する
+            line["id"] = analysis.id
+            self.pending.append((analysis, line))
+            if len(self.pending) >= self.batch_size:
+                self._flush()
+            return
+        line["report"] = result["report"]
+        self._emit(line)
+
+    async def run(self, lines: Iterable[Tuple[int, str]]) -> int:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async with GitHubClient(self.access_token) as client:
+
+            async def worker() -> None:
+                while (item := await queue.get()) is not None:
+                    await self._analyze(client, *item)
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                # 標準入力が来るのを待つ間も分析を止めないよう、読むのは別スレッドで
+                lines = iter(lines)
+                while item := await asyncio.to_thread(next, lines, None):
+                    number, line = item
+                    try:
+                        request = _parse_repo_line(line)
+                    except ValueError as e:
+                        message = (
+                            e.errors()[0]["msg"]
+                            if isinstance(e, ValidationError)
+                            else str(e)
+                        )
+                        self._error(number, None, "INVALID_REQUEST", message)
+                        continue
+                    await queue.put((number, request))
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+                self._flush(final=True)
+
+        return 1 if self.failed else 0
+
+
+async def _rescore_ids(analysis_ids: List[str]) -> AsyncIterator[Result]:
+    for analysis_id in analysis_ids:
+        try:
+            yield analysis_id, await rescore_analysis(analysis_id, SessionLocal), None
+        except AppException as e:
+            yield analysis_id, None, e
+
+
+def _result_line(analysis_id: str, analysis, error) -> str:
+    if error is not None:
+        line = {
+            "id": analysis_id,
+            "status": "error",
+            "code": error.code.value,
+            "message": error.message,
+        }
+    else:
+        line = {"id": analysis_id, "status": "success", "scores": analysis.scores}
+    return json.dumps(line, ensure_ascii=False)
+
+
+async def rescore(args: argparse.Namespace) -> int:
+    if args.all:
+        results = rescore_archived_analyses(
+            SessionLocal,
+            user_id=args.user_id,
+            before=args.before,
+            concurrency=args.concurrency,
+        )
+    else:
+        results = _rescore_ids(args.analysis_ids)
+
+    failed = 0
+    async for analysis_id, analysis, error in results:
+        failed += error is not None
+        print(_result_line(analysis_id, analysis, error), flush=True)
+    return 1 if failed else 0
+
+
+def _access_token(user_id: Optional[str]) -> str:
+    if user_id is None:
+        return os.environ.get("GITHUB_TOKEN", "")
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        if user is None:
+            raise SystemExit(f"analyze: user not found: {user_id}")
+        try:
+            return user.github_access_token
+        except TokenVaultError as e:
+            raise SystemExit(f"analyze: cannot read the user's GitHub token: {e}")
+
+
+async def analyze(args: argparse.Namespace) -> int:
+    user_id = args.user_id if args.output == "db" else None
+    job = AnalyzeJob(
+        access_token=_access_token(args.user_id),
+        user_id=user_id,
+        concurrency=args.concurrency or settings.batch_max_concurrency,
+        batch_size=args.batch_size,
+        out=sys.stdout,
+    )
+    if args.file == "-":
+        return await job.run(_read_repo_lines(sys.stdin))
+    with open(args.file, encoding="utf-8") as f:
+        return await job.run(_read_repo_lines(f))
+
+
+def init_token_key(args: argparse.Namespace) -> int:
+    if args.stdout:
+        print(generate_key())
+        return 0
+    key_file = args.key_file or settings.token_vault_key_file
+    try:
+        generate_key_file(key_file)
+    except FileExistsError:
+        # 既存の鍵を上書きすると保存済みのトークンを復号できなくなる
+        print(f"init-token-key: already exists: {key_file}", file=sys.stderr)
+        return 1
+    print(f"init-token-key: created {key_file}", file=sys.stderr)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze_parser = commands.add_parser(
+        "analyze", help="リポジトリの一覧を分析する（APIサーバーを通さない）"
+    )
+    analyze_parser.add_argument("file", nargs="?", default="-")
+    analyze_parser.add_argument("--user-id")
+    analyze_parser.add_argument("--output", choices=["db", "jsonl"], default="db")
+    analyze_parser.add_argument("--concurrency", type=int)
+    analyze_parser.add_argument("--batch-size", type=int, default=100)
+
+    rescore_parser = commands.add_parser(
+        "rescore", help="保存したcommitのアーカイブで分析し直す（GitHubは呼ばない）"
+    )
+    rescore_parser.add_argument("analysis_ids", nargs="*", metavar="ANALYSIS_ID")
+    rescore_parser.add_argument("--all", action="store_true")
+    rescore_parser.add_argument("--user-id")
+    rescore_parser.add_argument("--before", type=_parse_datetime)
+    rescore_parser.add_argument("--concurrency", type=int)
+
+    key_parser = commands.add_parser(
+        "init-token-key", help="アクセストークンの暗号化鍵のファイルを作る"
+    )
+    key_parser.add_argument("--key-file")
+    key_parser.add_argument("--stdout", action="store_true")
+
+    args = parser.parse_args(argv)
+    if args.command == "rescore" and bool(args.analysis_ids) == args.all:
+        parser.error("rescore: specify analysis IDs or --all")
+    if args.command == "analyze" and args.output == "db" and args.user_id is None:
+        parser.error("analyze: --user-id is required unless --output jsonl")
+
+    if args.command == "init-token-key":
+        return init_token_key(args)
+    _log_to_stderr()
+    if args.command == "analyze":
+        return asyncio.run(analyze(args))
+    return asyncio.run(rescore(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# app/compression.py
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.shared_state import SharedStateBackend, shared_state
+
+# brotli / zstd はライブラリが入っている環境でのみ使う（gzipは標準ライブラリ）
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+# Content-Encoding名 → 圧縮関数（同じq値なら先頭を優先）
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = zstandard.ZstdCompressor(level=3).compress
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=5)
+ENCODERS["gzip"] = _gzip
+
+# 圧縮する価値のあるContent-Type
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Accept-Encodingから使う圧縮方式を決める（対応なしならNone）
+    """
+    if not accept_encoding:
+        return None
+
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name] = quality
+
+    best = None
+    best_quality = 0.0
+    for encoding in ENCODERS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    return ENCODERS[encoding](body)
+
+
+def etag_for_encoding(etag: str, encoding: str) -> str:
+    """圧縮後の表現用のETag（強いETagは表現ごとに変える）"""
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+class CompressedCache:
+    """
+    圧縮済みボディのLRUキャッシュ
+    - キーは (id, updated_at, encoding)。分析はmemo以外不変なので版ごとに使い回せる
+    - 合計バイト数が上限を超えたら古いものから捨てる
+    - sharedを渡すと、プロセス内で見つからない場合に共有の保存先も見る（複数ワーカー用）
+    """
+
+    def __init__(self, max_bytes: int, shared: Optional[SharedStateBackend] = None):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _shared_key(key: Tuple[str, str, str]) -> str:
+        return "compressed:" + ":".join(key)
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        if self.shared is None:
+            return None
+        body = self.shared.get(self._shared_key(key))
+        if body is not None:
+            self._set_local(key, body)
+        return body
+
+    def set(self, key: Tuple[str, str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        self._set_local(key, body)
+        if self.shared is not None:
+            self.shared.set(
+                self._shared_key(key), body, ttl=settings.shared_cache_ttl_seconds
+            )
+
+    def _set_local(self, key: Tuple[str, str, str], body: bytes) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# 分析詳細の圧縮済みレポート用（memory以外ならワーカー間でも共有）
+report_cache = CompressedCache(
+    settings.compression_cache_max_bytes,
+    shared=shared_state if settings.shared_state_backend != "memory" else None,
+)
@@ -10,6 +10,93 @@ class Settings(BaseSettings):
     github_client_secret: str
     jwt_secret_key: str
 
+    # LLMの呼び出し先（"gemini" / "stub"）とGemini呼び出しの耐障害設定
+    llm_backend: str = "gemini"
+    llm_stub_latency_seconds: float = 0.0
+    gemini_timeout_seconds: float = 60.0
+    gemini_max_retries: int = 3
+    gemini_retry_base_delay: float = 0.5
+    gemini_retry_max_delay: float = 8.0
+    gemini_hedge_enabled: bool = False
+    gemini_hedge_min_samples: int = 20
+    gemini_circuit_failure_threshold: int = 5
+    gemini_circuit_reset_seconds: float = 30.0
+    # 出力がスキーマに合わない（修復もできない）ときに生成し直す回数
+    gemini_output_retries: int = 1
+
+    # GitHub API（ベースURLはベンチマークでローカルの代替サーバーに向ける用）
+    github_api_base_url: str = "https://api.github.com"
+    # OAuthのトークン交換（ベンチマークでは同じくローカルの代替サーバーに向ける）
+    github_oauth_base_url: str = "https://github.com"
+    github_max_concurrency: int = 10
+    # commit一覧の1ページの件数（GitHubの上限は100）
+    github_commits_per_page: int = 100
+    # commit詳細1件あたりに読む上限（超えたらfilesを打ち切る）
+    github_commit_max_bytes: int = 512 * 1024
+    github_commit_max_files: int = 300
+
+    # commitの取得方法（"api": GitHub REST API / "git": bare cloneのキャッシュから読む）
+    commit_fetcher: str = "api"
+    git_cache_dir: str = "/tmp/github-analyzer/repos"
+    git_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    git_timeout_seconds: int = 120
+    # 作者・パスで絞り込むとき（sinceなし）に取得する深さ
+    git_filter_depth: int = 1000
+
+    # ワーカー数と、ワーカー間で共有する状態の保存先（"memory" / "database" / "redis"）
+    web_concurrency: int = 1
+    shared_state_backend: str = "memory"
+    shared_state_url: str = "redis://localhost:6379/0"
+    shared_cache_ttl_seconds: int = 3600
+
+    # 遅いリクエストのプロファイル（保存先はリングバッファ、GET /admin/profiles で取得）
+    profiler_enabled: bool = False
+    profiler_slow_threshold_seconds: float = 1.0
+    profiler_sample_rate: float = 0.0
+    profiler_interval_seconds: float = 0.005
+    profiler_dir: str = "/tmp/github-analyzer/profiles"
+    profiler_max_profiles: int = 100
+
+    # GitHubのアクセストークンの暗号化（マスター鍵のファイル・復号したトークンをメモリに置く秒数と件数）
+    token_vault_key_file: str = "./token_vault.key"
+    # 鍵ファイルの代わりにマスター鍵を直接渡す（改行かカンマ区切り。設定すると鍵ファイルは読まない）
+    token_vault_keys: str = ""
+    token_vault_cache_ttl_seconds: float = 300.0
+    token_vault_cache_max_entries: int = 10000
+
+    # 管理者（カンマ区切りのGitHubユーザー名）
+    admin_github_usernames: str = ""
+
+    # 分析の受付制御（同時実行数・待ち行列はワーカーごと、回数はワーカー間で共有）
+    admission_max_in_flight: int = 20
+    admission_queue_size: int = 50
+    admission_queue_timeout_seconds: float = 10.0
+    admission_user_max_concurrency: int = 3
+    admission_user_rate_limit: int = 30
+    admission_user_rate_window_seconds: int = 3600
+    admission_retry_after_seconds: int = 5
+
+    # 一括分析
+    batch_max_concurrency: int = 5
+
+    # 取得したcommitを分析と一緒に保存し、GitHubを呼ばずに再分析できるようにする
+    commit_archive_enabled: bool = False
+
+    # レスポンス圧縮
+    compression_min_size: int = 1024
+    compression_cache_max_bytes: int = 32 * 1024 * 1024
+
+    # 定期分析スケジューラー（時刻はUTC。開始 > 終了なら日をまたぐ）
+    scheduler_enabled: bool = False
+    scheduler_offpeak_start_hour: int = 17
+    scheduler_offpeak_end_hour: int = 21
+    scheduler_refresh_interval_hours: int = 24
+    scheduler_tick_seconds: int = 60
+    scheduler_batch_size: int = 50
+    scheduler_max_concurrency: int = 2
+    scheduler_start_interval_seconds: float = 5.0
+    scheduler_lease_seconds: int = 300
+
     class Config:
         env_file = ".env"
 
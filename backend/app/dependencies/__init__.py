@@ -1,5 +1,18 @@
 # app/dependencies/__init__.py
-from app.dependencies.database import get_db
-from app.dependencies.auth import get_current_user
+from app.dependencies.database import get_db, get_session_factory
+from app.dependencies.auth import (
+    get_current_user,
+    get_detached_user,
+    get_admin_user,
+)
+from app.dependencies.admission import admit_analysis, admit_batch_analysis
 
-__all__ = ["get_db", "get_current_user"]
+__all__ = [
+    "get_db",
+    "get_session_factory",
+    "get_current_user",
+    "get_detached_user",
+    "get_admin_user",
+    "admit_analysis",
+    "admit_batch_analysis",
+]
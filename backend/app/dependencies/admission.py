@@ -0,0 +1,35 @@
+# app/dependencies/admission.py
+from typing import AsyncIterator
+
+from fastapi import Depends
+
+from app.admission import admission
+from app.dependencies.auth import get_detached_user
+from app.models import User
+from app.schemas import BatchAnalysisRequest
+
+
+async def admit_analysis(
+    current_user: User = Depends(get_detached_user),
+) -> AsyncIterator[None]:
+    """
+    分析1件分の受付（受け付けられなければ429）
+    - ストリーミングレスポンスの送信が終わるまで枠を持つ
+    """
+    ticket = await admission.acquire(current_user.id)
+    try:
+        yield
+    finally:
+        admission.release(ticket)
+
+
+async def admit_batch_analysis(
+    request: BatchAnalysisRequest,
+    current_user: User = Depends(get_detached_user),
+) -> AsyncIterator[None]:
+    """一括分析の受付（同時実行は1枠、回数は件数分）"""
+    ticket = await admission.acquire(current_user.id, cost=len(request.items))
+    try:
+        yield
+    finally:
+        admission.release(ticket)
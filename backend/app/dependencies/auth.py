@@ -1,27 +1,20 @@
 # app/dependencies/auth.py
 from fastapi import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 from jose import jwt, JWTError
 
 from app.config import settings
 from app.models import User
-from app.dependencies.database import get_db
+from app.dependencies.database import get_db, get_session_factory
 from app.exceptions import AppException, ErrorCode
 
 # HTTPヘッダーからBearerトークンを取得するためのセキュリティスキーム
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    """
-    JWTトークンを検証し、現在のユーザーを取得する
-    """
-    token = credentials.credentials
-
+def _user_id_from_token(token: str) -> str:
+    """JWTトークンを検証し、ユーザーIDを取り出す"""
     try:
         # JWTをデコードしてペイロードを取得
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=["HS256"])
@@ -33,6 +26,17 @@ def get_current_user(
     except JWTError:
         # トークンが不正または期限切れ
         raise AppException(401, ErrorCode.INVALID_TOKEN, "Invalid or expired token")
+    return user_id
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> User:
+    """
+    JWTトークンを検証し、現在のユーザーを取得する
+    """
+    user_id = _user_id_from_token(credentials.credentials)
 
     # DBからユーザーを取得
     user = db.query(User).filter(User.id == user_id).first()
@@ -40,3 +44,34 @@ def get_current_user(
         raise AppException(401, ErrorCode.USER_NOT_FOUND, "User not found")
 
     return user
+
+
+def get_detached_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session_factory: sessionmaker = Depends(get_session_factory),
+) -> User:
+    """
+    get_current_userと同じだが、読み込み後すぐにセッションを閉じて切り離したユーザーを返す
+    - リクエスト中ずっとDB接続を持たないよう、GitHub・Geminiを待つ分析系で使う
+    """
+    user_id = _user_id_from_token(credentials.credentials)
+
+    with session_factory() as db:
+        user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        raise AppException(401, ErrorCode.USER_NOT_FOUND, "User not found")
+
+    return user
+
+
+def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """
+    管理者（ADMIN_GITHUB_USERNAMESに含まれるユーザー）だけを通す
+    """
+    admins = {
+        name.strip() for name in settings.admin_github_usernames.split(",") if name
+    }
+    if current_user.github_username not in admins:
+        raise AppException(403, ErrorCode.FORBIDDEN, "Admin privileges required")
+
+    return current_user
@@ -1,6 +1,6 @@
 # app/dependencies/database.py
 from typing import Generator
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.database import SessionLocal
 
@@ -16,3 +16,11 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def get_session_factory() -> sessionmaker:
+    """
+    DBセッションを作る関数を取得
+    - 外部APIを長く待つ処理で、DB接続を使う区間だけセッションを開くために使う
+    """
+    return SessionLocal
@@ -2,6 +2,7 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
 from enum import Enum
+from typing import Dict, Optional
 
 from app.schemas.response.common import ErrorResponse
 from app.logger import logger
@@ -15,6 +16,8 @@ class ErrorCode(str, Enum):
     TOKEN_EXPIRED = "TOKEN_EXPIRED"
     USER_NOT_FOUND = "USER_NOT_FOUND"
     GITHUB_AUTH_FAILED = "GITHUB_AUTH_FAILED"
+    GITHUB_REAUTH_REQUIRED = "GITHUB_REAUTH_REQUIRED"
+    FORBIDDEN = "FORBIDDEN"
 
     # リクエスト系
     INVALID_REPO_URL = "INVALID_REPO_URL"
@@ -22,10 +25,20 @@ class ErrorCode(str, Enum):
 
     # リソース系
     ANALYSIS_NOT_FOUND = "ANALYSIS_NOT_FOUND"
+    TRACKED_REPO_NOT_FOUND = "TRACKED_REPO_NOT_FOUND"
+    TRACKED_REPO_ALREADY_EXISTS = "TRACKED_REPO_ALREADY_EXISTS"
+    PROFILE_NOT_FOUND = "PROFILE_NOT_FOUND"
+    COMMIT_ARCHIVE_NOT_FOUND = "COMMIT_ARCHIVE_NOT_FOUND"
+    INCREMENTAL_RESCORE_UNSUPPORTED = "INCREMENTAL_RESCORE_UNSUPPORTED"
+
+    # 受付制御系
+    RATE_LIMIT_EXCEEDED = "RATE_LIMIT_EXCEEDED"
+    SERVER_BUSY = "SERVER_BUSY"
 
     # 外部API系
     GITHUB_API_ERROR = "GITHUB_API_ERROR"
     GEMINI_API_ERROR = "GEMINI_API_ERROR"
+    GEMINI_API_UNAVAILABLE = "GEMINI_API_UNAVAILABLE"
 
     # サーバー系
     INTERNAL_ERROR = "INTERNAL_ERROR"
@@ -34,10 +47,18 @@ class ErrorCode(str, Enum):
 class AppException(Exception):
     """アプリケーション共通の例外"""
 
-    def __init__(self, status_code: int, code: ErrorCode, message: str):
+    def __init__(
+        self,
+        status_code: int,
+        code: ErrorCode,
+        message: str,
+        headers: Optional[Dict[str, str]] = None,
+    ):
         self.status_code = status_code
         self.code = code
         self.message = message
+        # Retry-Afterなど、レスポンスに付けるヘッダー
+        self.headers = headers
 
 
 async def app_exception_handler(request: Request, exc: AppException):
@@ -54,6 +75,7 @@ async def app_exception_handler(request: Request, exc: AppException):
             "code": exc.code.value,
             "message": exc.message,
         },
+        headers=exc.headers,
     )
 
 
@@ -61,6 +83,10 @@ async def app_exception_handler(request: Request, exc: AppException):
 error_responses = {
     400: {"model": ErrorResponse, "description": "Bad Request"},
     401: {"model": ErrorResponse, "description": "Unauthorized"},
+    403: {"model": ErrorResponse, "description": "Forbidden"},
     404: {"model": ErrorResponse, "description": "Not Found"},
+    409: {"model": ErrorResponse, "description": "Conflict"},
+    429: {"model": ErrorResponse, "description": "Too Many Requests"},
     500: {"model": ErrorResponse, "description": "Internal Server Error"},
+    503: {"model": ErrorResponse, "description": "Service Unavailable"},
 }
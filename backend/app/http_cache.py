@@ -0,0 +1,74 @@
+# app/http_cache.py
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# 認証付きのユーザー固有データなので共有キャッシュには載せず、毎回再検証させる
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: object) -> str:
+    """値の組み合わせから強いETagを作成"""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # DBから読んだdatetimeはタイムゾーンなし（UTC）
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """ETag / Last-Modified / Cache-Control ヘッダー"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Authorization",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> bool:
+    """
+    条件付きリクエストを評価（If-None-Matchを優先し、無い場合のみIf-Modified-Since）
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Matchは弱い比較（W/ を無視）。圧縮表現のETag（"...-gzip"）も同じ版とみなす
+        candidates = [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ]
+        return any(
+            tag == etag or (tag.startswith(etag[:-1] + "-") and tag.endswith('"'))
+            for tag in candidates
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # HTTP日付は秒単位なので秒未満は切り捨てて比較
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+
+    return False
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """304 Not Modified（ボディなし）"""
+    return Response(status_code=304, headers=headers)
@@ -1,20 +1,53 @@
 # app/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.routers import auth, analyses
+from app.routers import auth, analyses, tracked_repos, admin
 from app.exceptions import AppException, app_exception_handler
-from app.middleware import LoggingMiddleware
+from app.middleware import (
+    LoggingMiddleware,
+    CompressionMiddleware,
+    ProfilerMiddleware,
+)
 from app.logger import logger
 from app.config import settings
+from app.profiler import profiler
+from app.services.auth_service import github_oauth
+from app.services.scheduler import Scheduler
+from app.token_vault import token_vault
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """定期分析スケジューラーとプロファイラーの起動・停止（有効な場合のみ）、GitHubへの接続の後始末"""
+    # 鍵ファイルが無ければ、最初のログインや分析を待たずに起動で失敗させる
+    token_vault.check()
+    scheduler = Scheduler() if settings.scheduler_enabled else None
+    if scheduler:
+        scheduler.start()
+    if settings.profiler_enabled:
+        profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        await github_oauth.aclose()
+        if scheduler:
+            await scheduler.stop()
+
 
 app = FastAPI(
     title="github-analyzer",
     description="GitHubリポジトリを分析してスコアとレポートを生成",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # ミドルウェア登録
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(ProfilerMiddleware)
 
 # 例外ハンドラ登録
 app.add_exception_handler(AppException, app_exception_handler)
@@ -22,12 +55,16 @@ app.add_exception_handler(AppException, app_exception_handler)
 # ルーター登録
 app.include_router(auth.router)
 app.include_router(analyses.router)
+app.include_router(tracked_repos.router)
+app.include_router(admin.router)
 
 # 起動ログ
 logger.info("=" * 50)
 logger.info("github-analyzer v0.1.0")
 logger.info(f"Database: {settings.database_url}")
 logger.info(f"Gemini Model: {settings.gemini_model}")
+logger.info(f"Scheduler: {'enabled' if settings.scheduler_enabled else 'disabled'}")
+logger.info(f"Profiler: {'enabled' if settings.profiler_enabled else 'disabled'}")
 logger.info("=" * 50)
 
 
@@ -1,10 +1,21 @@
 # app/middleware.py
 import time
 import logging
+from typing import Optional
 from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.compression import (
+    COMPRESSIBLE_TYPES,
+    compress,
+    etag_for_encoding,
+    negotiate_encoding,
+)
+from app.config import settings
 from app.logger import logger
+from app.profiler import Profiler, profiler as default_profiler
 
 
 class LoggingMiddleware(BaseHTTPMiddleware):
@@ -45,3 +56,107 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         )
 
         return response
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encodingに応じてレスポンスを圧縮するミドルウェア（zstd / br / gzip）
+    - minimum_size未満、圧縮済み（Content-Encodingあり）、JSON/テキスト以外はそのまま
+    - ストリーミング（SSE・NDJSON）はバッファせずそのまま流す
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = (
+            settings.compression_min_size if minimum_size is None else minimum_size
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message = {}
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # ボディを見てから圧縮するか決める
+                    start_message = message
+                return
+
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # ストリーミングは圧縮しない
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                if "etag" in headers:
+                    headers["ETag"] = etag_for_encoding(headers["etag"], encoding)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class ProfilerMiddleware:
+    """
+    リクエストごとにサンプリングプロファイラーの記録を開始・終了するミドルウェア
+    - プロファイラーが起動していなければ何もしない（PROFILER_ENABLED）
+    - 時間はストリーミングの送信完了までを含む
+    """
+
+    def __init__(self, app: ASGIApp, profiler: Optional[Profiler] = None):
+        self.app = app
+        self.profiler = profiler or default_profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self.profiler.running
+            or scope["path"].startswith("/admin/profiles")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profile = self.profiler.begin(scope["method"], scope["path"])
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await self.profiler.finish(profile, status_code)
@@ -1,5 +1,16 @@
 # app/models/__init__.py
 from app.models.user import User
 from app.models.analysis import Analysis
+from app.models.score_rollup import ScoreRollup
+from app.models.tracked_repo import TrackedRepo
+from app.models.scheduler_lock import SchedulerLock
+from app.models.shared_state import SharedStateEntry
 
-__all__ = ["User", "Analysis"]
+__all__ = [
+    "User",
+    "Analysis",
+    "ScoreRollup",
+    "TrackedRepo",
+    "SchedulerLock",
+    "SharedStateEntry",
+]
@@ -1,22 +1,54 @@
 # app/models/analysis.py
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime, timezone
+import json
 import uuid
+import zlib
 
 from app.database import Base
 
 
+# スコア項目（score_<項目名> カラムに対応）
+SCORE_KEYS = [
+    "test",
+    "comment",
+    "commit_size",
+    "commit_frequency",
+    "commit_message",
+    "activity",
+]
+
+
 class Analysis(Base):
     __tablename__ = "analyses"
+    # スコアでの絞り込み・並び替えは常にユーザー単位なので user_id との複合インデックス
+    __table_args__ = (
+        *(
+            Index(f"ix_analyses_user_id_score_{key}", "user_id", f"score_{key}")
+            for key in SCORE_KEYS
+        ),
+        # 差分分析で前回の分析を探す
+        Index("ix_analyses_user_id_repo_url_branch", "user_id", "repo_url", "branch"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     repo_url = Column(String, nullable=False)
     branch = Column(String, default="main")
-    scores = Column(JSON, nullable=False)
-    report = Column(JSON, nullable=False)
+    score_test = Column(Integer, nullable=False)
+    score_comment = Column(Integer, nullable=False)
+    score_commit_size = Column(Integer, nullable=False)
+    score_commit_frequency = Column(Integer, nullable=False)
+    score_commit_message = Column(Integer, nullable=False)
+    score_activity = Column(Integer, nullable=False)
+    # レポート本文はzlib圧縮したJSON。一覧・更新・削除では読まないので遅延ロード
+    report_compressed = deferred(Column(LargeBinary, nullable=False))
+    # 再分析用に取得したcommitのアーカイブ（COMMIT_ARCHIVE_ENABLED=trueのときだけ保存。遅延ロード）
+    commits_compressed = deferred(Column(LargeBinary, nullable=True))
     memo = Column(String, nullable=True)
+    # 差分分析用：この分析が対象にしたブランチ先頭のcommit SHA
+    head_sha = Column(String, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(
         DateTime,
@@ -25,3 +57,29 @@ class Analysis(Base):
     )
 
     user = relationship("User", back_populates="analyses")
+
+    @classmethod
+    def score_column(cls, key: str) -> Column:
+        """スコア項目名からカラムを取得"""
+        return getattr(cls, f"score_{key}")
+
+    @property
+    def scores(self) -> dict:
+        """スコアをScoresと同じ形のdictで返す"""
+        return {key: getattr(self, f"score_{key}") for key in SCORE_KEYS}
+
+    @scores.setter
+    def scores(self, value: dict) -> None:
+        for key in SCORE_KEYS:
+            setattr(self, f"score_{key}", value[key])
+
+    @property
+    def report(self) -> dict:
+        """レポートを展開してReportと同じ形のdictで返す（アクセス時にロード）"""
+        return json.loads(zlib.decompress(self.report_compressed))
+
+    @report.setter
+    def report(self, value: dict) -> None:
+        self.report_compressed = zlib.compress(
+            json.dumps(value, ensure_ascii=False).encode("utf-8")
+        )
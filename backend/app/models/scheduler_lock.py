@@ -0,0 +1,17 @@
+# app/models/scheduler_lock.py
+from sqlalchemy import Column, String, DateTime
+
+from app.database import Base
+
+
+class SchedulerLock(Base):
+    """
+    スケジューラーのリーダー選出用のリース
+    - 複数タスクのうち、期限内のリースを持つ1つだけが定期分析を実行する
+    """
+
+    __tablename__ = "scheduler_locks"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,41 @@
+# app/models/score_rollup.py
+from sqlalchemy import Column, String, Integer, Date, ForeignKey, UniqueConstraint
+import uuid
+
+from app.database import Base
+
+
+class ScoreRollup(Base):
+    """
+    スコア推移の集計テーブル（ユーザー × リポジトリ × ブランチ × 日）
+    - 分析の保存時に差分更新し、推移APIは分析本体をスキャンせずにここから返す
+    - 平均は sum / count で求める
+    """
+
+    __tablename__ = "score_rollups"
+    __table_args__ = (UniqueConstraint("user_id", "repo_url", "branch", "bucket_date"),)
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    repo_url = Column(String, nullable=False)
+    branch = Column(String, nullable=False)
+    bucket_date = Column(Date, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    test_sum = Column(Integer, nullable=False, default=0)
+    test_min = Column(Integer, nullable=True)
+    test_max = Column(Integer, nullable=True)
+    comment_sum = Column(Integer, nullable=False, default=0)
+    comment_min = Column(Integer, nullable=True)
+    comment_max = Column(Integer, nullable=True)
+    commit_size_sum = Column(Integer, nullable=False, default=0)
+    commit_size_min = Column(Integer, nullable=True)
+    commit_size_max = Column(Integer, nullable=True)
+    commit_frequency_sum = Column(Integer, nullable=False, default=0)
+    commit_frequency_min = Column(Integer, nullable=True)
+    commit_frequency_max = Column(Integer, nullable=True)
+    commit_message_sum = Column(Integer, nullable=False, default=0)
+    commit_message_min = Column(Integer, nullable=True)
+    commit_message_max = Column(Integer, nullable=True)
+    activity_sum = Column(Integer, nullable=False, default=0)
+    activity_min = Column(Integer, nullable=True)
+    activity_max = Column(Integer, nullable=True)
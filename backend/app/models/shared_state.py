@@ -0,0 +1,19 @@
+# app/models/shared_state.py
+from sqlalchemy import Column, String, Integer, LargeBinary, DateTime
+
+from app.database import Base
+
+
+class SharedStateEntry(Base):
+    """
+    ワーカー間で共有する状態（SHARED_STATE_BACKEND=database の保存先）
+    - キャッシュの値・レート制限のカウンター・ロックの持ち主を期限付きで持つ
+    """
+
+    __tablename__ = "shared_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(LargeBinary, nullable=True)
+    counter = Column(Integer, nullable=True)
+    # 期限なしならNone
+    expires_at = Column(DateTime, nullable=True, index=True)
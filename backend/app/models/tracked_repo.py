@@ -0,0 +1,34 @@
+# app/models/tracked_repo.py
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    DateTime,
+    ForeignKey,
+    UniqueConstraint,
+)
+from datetime import datetime, timezone
+import uuid
+
+from app.database import Base
+
+
+class TrackedRepo(Base):
+    """
+    定期分析の対象（ユーザー × リポジトリ × ブランチ）
+    - スケジューラーがオフピーク時間帯に差分分析で更新する
+    """
+
+    __tablename__ = "tracked_repos"
+    __table_args__ = (UniqueConstraint("user_id", "repo_url", "branch"),)
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    repo_url = Column(String, nullable=False)
+    branch = Column(String, nullable=False)
+    limit = Column(Integer, nullable=False, default=30)
+    # 最後に定期分析を実行した日時（未実行ならNone）
+    last_run_at = Column(DateTime, nullable=True, index=True)
+    last_analysis_id = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
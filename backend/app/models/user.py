@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 import uuid
 
 from app.database import Base
+from app.token_vault import token_vault
 
 
 class User(Base):
@@ -13,7 +14,10 @@ class User(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     github_id = Column(Integer, unique=True, nullable=False)
     github_username = Column(String, nullable=False)
-    github_access_token = Column(String, nullable=False)
+    # token_vaultで暗号化したアクセストークン（読み書きはgithub_access_tokenで）
+    github_access_token_encrypted = Column(
+        "github_access_token", String, nullable=False
+    )
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(
         DateTime,
@@ -22,3 +26,12 @@ class User(Base):
     )
 
     analyses = relationship("Analysis", back_populates="user")
+
+    @property
+    def github_access_token(self) -> str:
+        """復号したアクセストークン（ユーザーごとにキャッシュされ、分析のたびには復号しない）"""
+        return token_vault.decrypt(self.github_access_token_encrypted, self.id)
+
+    @github_access_token.setter
+    def github_access_token(self, value: str) -> None:
+        self.github_access_token_encrypted = token_vault.encrypt(value)
@@ -0,0 +1,351 @@
+# app/profiler.py
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.logger import logger
+
+# 処理中のリクエストのプロファイル（子タスクにも引き継がれる）
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "current_profile", default=None
+)
+
+# 1サンプルあたりに残すフレーム数（葉に近い方を残す）
+MAX_DEPTH = 64
+
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _frame_name(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{frame.f_code.co_qualname}"
+
+
+def fold_frames(frame: Optional[FrameType]) -> List[str]:
+    """スレッドのスタック（葉のフレーム）を根→葉の順の関数名にする"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return names[::-1][-MAX_DEPTH:]
+
+
+def fold_awaits(task: asyncio.Task) -> List[str]:
+    """待機中のタスクのawaitの連鎖を根→葉の順の関数名にする（最後は待っている対象）"""
+    names = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = (
+            getattr(awaitable, "cr_frame", None)
+            or getattr(awaitable, "ag_frame", None)
+            or getattr(awaitable, "gi_frame", None)
+        )
+        if frame is None:
+            names.append(f"<{type(awaitable).__name__}>")
+            break
+        names.append(_frame_name(frame))
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "ag_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+        )
+    return names[-MAX_DEPTH:]
+
+
+def _is_idle_worker(frame: FrameType) -> bool:
+    """スレッドプールのワーカーが仕事待ち（queue.get / Condition.wait）か"""
+    return frame.f_code.co_name in ("wait", "get", "_wait_for_tstate_lock")
+
+
+class RequestProfile:
+    """1リクエスト分のサンプル（スタックごとの回数）"""
+
+    def __init__(self, method: str, path: str, task: Optional[asyncio.Task]):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        # このリクエストが作ったタスク（ストリーミングの送信などは子タスクで動く）
+        self.tasks: List[weakref.ref] = [weakref.ref(task)] if task else []
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.token = None
+
+    def add_task(self, task: asyncio.Task) -> None:
+        self.tasks.append(weakref.ref(task))
+
+    def pending_tasks(self) -> List[asyncio.Task]:
+        tasks = [ref() for ref in self.tasks]
+        return [task for task in tasks if task is not None and not task.done()]
+
+    def record(self, state: str, names: List[str]) -> None:
+        self.samples += 1
+        self.stacks[";".join([f"[{state}]", *names])] += 1
+
+    def to_dict(self, status_code: int, duration: float, reason: str) -> dict:
+        by_state: Counter = Counter()
+        by_module: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            by_state[frames[0].strip("[]")] += count
+            if frames[0] != "[waiting]" and len(frames) > 1:
+                # CPUを使っていた場所をパッケージ単位で（json / sqlalchemy / pydantic など）
+                by_module[frames[-1].split(".", 1)[0]] += count
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "reason": reason,
+            "interval_ms": round(settings.profiler_interval_seconds * 1000, 2),
+            "samples": self.samples,
+            "by_state": dict(by_state),
+            "by_module": dict(by_module.most_common()),
+            "stacks": [
+                {"stack": stack, "count": count}
+                for stack, count in self.stacks.most_common()
+            ],
+        }
+
+
+class ProfileStore:
+    """
+    保存したプロファイルのリングバッファ（ディレクトリ内のJSONファイル）
+    - max_profiles件を超えたら古いものから消す
+    """
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id: str) -> Path:
+        return self.directory / f"{profile_id}.json"
+
+    def _files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        return [path for _, path in sorted(files, reverse=True)]
+
+    def save(self, profile: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(profile["id"])
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(profile, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        for old in self._files()[self.max_profiles :]:
+            old.unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        """新しい順の一覧（スタックは除く）"""
+        summaries = []
+        for path in self._files():
+            try:
+                profile = json.loads(path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                continue
+            profile.pop("stacks", None)
+            summaries.append(profile)
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            return json.loads(self._path(profile_id).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+
+class Profiler:
+    """
+    遅いリクエストを調べるためのサンプリングプロファイラー（PROFILER_ENABLED=trueのときだけ動く）
+    - 別スレッドが一定間隔でイベントループのスタックを取り、実行中のタスクが属するリクエストに記録する
+      待機中のリクエストは、awaitの連鎖（何を待っているか）を記録する
+    - スレッドプールで動く同期処理は、待っているリクエストとワーカーが1つずつなら、そのワーカーのスタックを記録する
+    - slow_threshold秒以上かかったリクエストと、sample_rateの割合で選んだリクエストだけを保存する
+    - cProfileはスレッド単位で、同じループ上の並行リクエストが混ざるため使わない
+    """
+
+    def __init__(
+        self,
+        store: ProfileStore,
+        interval: float,
+        slow_threshold: float,
+        sample_rate: float,
+    ):
+        self.store = store
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.sample_rate = sample_rate
+        self.running = False
+        self._profiles: Dict[str, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._previous_factory = None
+
+    def start(self) -> None:
+        """実行中のイベントループで開始（タスクファクトリーで子タスクをリクエストに紐付ける）"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="profiler-sampler", daemon=True
+        )
+        self._thread.start()
+        self.running = True
+        logger.info(
+            f"Profiler | Start | threshold: {self.slow_threshold}s | "
+            f"sample rate: {self.sample_rate}"
+        )
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self.running = False
+        self._stop.set()
+        self._thread.join()
+        self._loop.set_task_factory(self._previous_factory)
+        self._profiles.clear()
+
+    def _task_factory(self, loop, coro, context=None):
+        if self._previous_factory is not None:
+            task = (
+                self._previous_factory(loop, coro, context=context)
+                if context is not None
+                else self._previous_factory(loop, coro)
+            )
+        else:
+            task = asyncio.Task(coro, loop=loop, context=context)
+        profile = (
+            context.get(_current_profile) if context is not None else None
+        ) or _current_profile.get()
+        if profile is not None:
+            profile.add_task(task)
+        return task
+
+    def begin(self, method: str, path: str) -> RequestProfile:
+        profile = RequestProfile(method, path, asyncio.current_task())
+        profile.token = _current_profile.set(profile)
+        with self._lock:
+            self._profiles[profile.id] = profile
+        return profile
+
+    async def finish(self, profile: RequestProfile, status_code: int) -> Optional[str]:
+        """記録を止め、保存の対象なら保存してIDを返す"""
+        with self._lock:
+            self._profiles.pop(profile.id, None)
+        _current_profile.reset(profile.token)
+        duration = time.perf_counter() - profile.start
+        if duration >= self.slow_threshold:
+            reason = "slow"
+        elif random.random() < self.sample_rate:
+            reason = "sampled"
+        else:
+            return None
+        data = profile.to_dict(status_code, duration, reason)
+        try:
+            await asyncio.to_thread(self.store.save, data)
+        except OSError as e:
+            logger.warning(f"Profiler | Save failed | {type(e).__name__}: {e}")
+            return None
+        logger.info(
+            f"Profiler | Saved | {profile.method} {profile.path} | "
+            f"{data['duration_ms']}ms | id: {profile.id}"
+        )
+        return profile.id
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:  # pragma: no cover
+                logger.debug(f"Profiler | Sample failed | {type(e).__name__}: {e}")
+
+    def sample(self) -> None:
+        """1回分のサンプルを、処理中のすべてのリクエストに記録する"""
+        # finishで外されたプロファイルに書き込まないよう、記録し終えるまでロックを持つ
+        with self._lock:
+            if self._profiles:
+                self._sample(list(self._profiles.values()))
+
+    def _running_task(self) -> Optional[asyncio.Task]:
+        """
+        イベントループでいま実行中のタスク（サンプラーのスレッドから見る）
+        - asyncio.current_task(loop)は、CPythonでは渡したループの実行中のタスクを返す
+          ループのスレッド以外から呼ぶことはドキュメントで保証されていないので、
+          使えなければNoneにする（CPU時間が"waiting"として記録されるだけで、サンプリングは止めない）
+        """
+        try:
+            return asyncio.current_task(self._loop)
+        except Exception:
+            return None
+
+    def _sample(self, profiles: List[RequestProfile]) -> None:
+        frames = sys._current_frames()
+        running = self._running_task()
+        sampler_id = threading.get_ident()
+        busy_workers = [
+            frame
+            for thread_id, frame in frames.items()
+            if thread_id not in (self._loop_thread_id, sampler_id)
+            and not _is_idle_worker(frame)
+        ]
+
+        in_threadpool = []
+        for profile in profiles:
+            tasks = profile.pending_tasks()
+            if running is not None and running in tasks:
+                profile.record("running", fold_frames(frames.get(self._loop_thread_id)))
+                continue
+            if not tasks:
+                continue
+            # 最後に作られた子タスクが、いま処理を進めている側
+            names = fold_awaits(tasks[-1])
+            if any("to_thread" in name or "run_sync" in name for name in names):
+                in_threadpool.append((profile, names))
+            else:
+                profile.record("waiting", names)
+
+        if len(in_threadpool) == 1 and len(busy_workers) == 1:
+            profile, _ = in_threadpool[0]
+            profile.record("thread", fold_frames(busy_workers[0]))
+        else:
+            for profile, names in in_threadpool:
+                profile.record("waiting", names)
+
+
+# アプリ全体で使うプロファイラー（起動はlifespanで）
+profiler = Profiler(
+    store=ProfileStore(settings.profiler_dir, settings.profiler_max_profiles),
+    interval=settings.profiler_interval_seconds,
+    slow_threshold=settings.profiler_slow_threshold_seconds,
+    sample_rate=settings.profiler_sample_rate,
+)
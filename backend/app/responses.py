@@ -0,0 +1,63 @@
+# app/responses.py
+from typing import Callable, Dict, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from app.compression import (
+    compress,
+    etag_for_encoding,
+    negotiate_encoding,
+    report_cache,
+)
+from app.config import settings
+
+
+class ModelResponse(Response):
+    """
+    組み立て済みのPydanticモデルをそのままJSONにして返すレスポンス
+    - Responseを返すとFastAPIはresponse_modelでの再検証・再シリアライズを行わない
+    - シリアライズはpydantic-core（Rust）で1回だけ行う
+    - response_modelはSwaggerのスキーマ定義として残す
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: BaseModel) -> bytes:
+        return to_json(content)
+
+
+def cached_compressed_response(
+    request: Request,
+    cache_key: Tuple[str, str],
+    build: Callable[[], BaseModel],
+    headers: Dict[str, str],
+) -> Response:
+    """
+    圧縮済みボディをキャッシュして返す（不変な分析詳細用）
+    - cache_keyは (id, updated_at)。圧縮方式ごとに保存する
+    - キャッシュにあればモデルの組み立て・シリアライズ・圧縮をすべて省く
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    key = (*cache_key, encoding)
+
+    body = report_cache.get(key) if encoding is not None else None
+    if body is None:
+        body = to_json(build())
+        if encoding is None or len(body) < settings.compression_min_size:
+            return Response(body, media_type="application/json", headers=headers)
+        body = compress(body, encoding)
+        report_cache.set(key, body)
+
+    headers = {
+        **headers,
+        "Content-Encoding": encoding,
+        "Vary": f"{headers['Vary']}, Accept-Encoding"
+        if "Vary" in headers
+        else "Accept-Encoding",
+    }
+    if "ETag" in headers:
+        headers["ETag"] = etag_for_encoding(headers["ETag"], encoding)
+    return Response(body, media_type="application/json", headers=headers)
@@ -1,4 +1,4 @@
 # app/routers/__init__.py
-from app.routers import auth, analyses
+from app.routers import auth, analyses, tracked_repos, admin
 
-__all__ = ["auth", "analyses"]
+__all__ = ["auth", "analyses", "tracked_repos", "admin"]
@@ -0,0 +1,92 @@
+# app/routers/admin.py
+import json
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+from typing import List, Literal
+
+from app.dependencies import get_admin_user
+from app.models import User
+from app.profiler import profiler
+from app.schemas import SuccessResponse, LLMUsage, ProfileSummary
+from app.services.llm_backends import llm_usage
+from app.exceptions import AppException, ErrorCode, error_responses
+from app.logger import logger
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+)
+
+
+@router.get(
+    "/profiles",
+    response_model=SuccessResponse[List[ProfileSummary]],
+    responses={
+        401: error_responses[401],
+        403: error_responses[403],
+    },
+)
+def get_profiles(admin_user: User = Depends(get_admin_user)):
+    """
+    保存された遅いリクエストのプロファイル一覧（新しい順）
+    """
+    profiles = profiler.store.list()
+    logger.debug(f"Admin | Get profiles | count: {len(profiles)}")
+
+    return SuccessResponse(data=[ProfileSummary(**p) for p in profiles])
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    responses={
+        200: {
+            "content": {"application/json": {}, "text/plain": {}},
+            "description": "json: 概要とスタックごとのサンプル数 / "
+            "folded: flamegraph.pl・speedscope用の「スタック 回数」形式",
+        },
+        401: error_responses[401],
+        403: error_responses[403],
+        404: error_responses[404],
+    },
+)
+def download_profile(
+    profile_id: str,
+    format: Literal["json", "folded"] = Query("json"),
+    admin_user: User = Depends(get_admin_user),
+):
+    """
+    プロファイルをダウンロード
+    """
+    profile = profiler.store.get(profile_id)
+    if profile is None:
+        raise AppException(404, ErrorCode.PROFILE_NOT_FOUND, "Profile not found")
+
+    if format == "folded":
+        body = "".join(f"{s['stack']} {s['count']}\n" for s in profile["stacks"])
+        media_type = "text/plain; charset=utf-8"
+    else:
+        body = json.dumps(profile, ensure_ascii=False)
+        media_type = "application/json"
+
+    return Response(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.{format}"'
+        },
+    )
+
+
+@router.get(
+    "/llm-usage",
+    response_model=SuccessResponse[LLMUsage],
+    responses={
+        401: error_responses[401],
+        403: error_responses[403],
+    },
+)
+def get_llm_usage(admin_user: User = Depends(get_admin_user)):
+    """
+    LLM呼び出しのトークン数（Gemini側のキャッシュから読まれた分を含む）と最初のトークンまでの時間
+    """
+    return SuccessResponse(data=LLMUsage(**llm_usage.snapshot()))
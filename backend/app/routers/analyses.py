@@ -1,21 +1,51 @@
 # app/routers/analyses.py
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+import json
+from sqlalchemy import func
+from sqlalchemy.orm import Session, sessionmaker, undefer
+from pydantic import TypeAdapter
+from typing import Annotated, List, Optional
+from datetime import date
 
-from app.dependencies import get_db, get_current_user
+from app.dependencies import (
+    get_db,
+    get_session_factory,
+    get_current_user,
+    get_detached_user,
+    admit_analysis,
+    admit_batch_analysis,
+)
 from app.models import User, Analysis
+from app.models.analysis import SCORE_KEYS
 from app.schemas import (
     AnalysisRequest,
+    AnalysisListQuery,
+    BatchAnalysisRequest,
     MemoUpdate,
     SuccessResponse,
     AnalysisResponse,
     AnalysisListItem,
-    Scores,
-    Report,
+    BatchAnalysisItem,
+    BatchAnalysisSummary,
+    ScoreTrendItem,
+)
+from app.services.analysis_service import (
+    read_access_token,
+    rescore_analysis,
+    run_analysis,
+    run_batch_analysis,
+    stream_analysis,
+)
+from app.services.commit_filter import CommitFilter
+from app.services.rollup_service import (
+    Bucket,
+    get_score_trends,
+    rebuild_rollup_bucket,
 )
-from app.services.analysis_service import run_analysis
 from app.exceptions import AppException, ErrorCode, error_responses
+from app.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.responses import ModelResponse, cached_compressed_response
 from app.logger import logger
 
 router = APIRouter(
@@ -24,87 +54,268 @@ router = APIRouter(
 )
 
 
+# ORMの行リストを1回の呼び出しでまとめて検証する
+_list_adapter = TypeAdapter(List[AnalysisListItem])
+
+
+def _analysis_response(analysis: Analysis) -> AnalysisResponse:
+    """AnalysisモデルをAnalysisResponseに変換"""
+    return AnalysisResponse.model_validate(analysis)
+
+
+def _sse(event: str, data: str) -> str:
+    """Server-Sent Eventsの1イベント分の文字列"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
 @router.post(
     "",
     response_model=SuccessResponse[AnalysisResponse],
     responses={
         400: error_responses[400],
         401: error_responses[401],
+        429: error_responses[429],
         500: error_responses[500],
     },
+    dependencies=[Depends(admit_analysis)],
 )
 async def create_analysis(
     request: AnalysisRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    current_user: User = Depends(get_detached_user),
 ):
     """
     分析を実行してDBに保存
     """
     analysis = await run_analysis(
-        request.repo_url, request.branch, request.limit, current_user, db
+        request.repo_url,
+        request.branch,
+        request.limit,
+        current_user,
+        session_factory,
+        incremental=request.incremental,
+        commit_filter=CommitFilter.from_request(request),
     )
 
-    return SuccessResponse(
-        data=AnalysisResponse(
-            id=analysis.id,
-            repo_url=analysis.repo_url,
-            branch=analysis.branch,
-            scores=Scores(**analysis.scores),
-            report=Report(**analysis.report),
-            memo=analysis.memo,
-            created_at=analysis.created_at.isoformat(),
-            updated_at=analysis.updated_at.isoformat(),
-        )
+    return ModelResponse(
+        SuccessResponse[AnalysisResponse](data=_analysis_response(analysis))
     )
 
 
+@router.post(
+    "/stream",
+    responses={
+        200: {
+            "content": {"text/event-stream": {}},
+            "description": "commits / details / prompt / token の進捗イベントを順に返し、"
+            "最後に result（AnalysisResponse）または error を返す",
+        },
+        401: error_responses[401],
+        429: error_responses[429],
+    },
+    dependencies=[Depends(admit_analysis)],
+)
+async def create_analysis_stream(
+    request: AnalysisRequest,
+    session_factory: sessionmaker = Depends(get_session_factory),
+    current_user: User = Depends(get_detached_user),
+):
+    """
+    分析を実行してDBに保存（進捗をServer-Sent Eventsで返す）
+    """
+    # ストリーム開始後はステータスを変えられないので、トークンは先に確かめる
+    read_access_token(current_user)
+
+    async def stream():
+        try:
+            async for event, data in stream_analysis(
+                request.repo_url,
+                request.branch,
+                request.limit,
+                current_user,
+                session_factory,
+                incremental=request.incremental,
+                commit_filter=CommitFilter.from_request(request),
+            ):
+                if event == "result":
+                    yield _sse(event, _analysis_response(data).model_dump_json())
+                else:
+                    yield _sse(event, json.dumps(data, ensure_ascii=False))
+        except AppException as e:
+            # ヘッダー送信後なのでステータスコードは変えられない → errorイベントで通知
+            error = {"code": e.code.value, "message": e.message}
+            yield _sse("error", json.dumps(error, ensure_ascii=False))
+        except Exception:
+            # 想定外の例外でもストリームを途中で切らず、errorイベントで終える
+            logger.exception("Analysis stream | Unexpected error")
+            error = {
+                "code": ErrorCode.INTERNAL_ERROR.value,
+                "message": "Internal server error",
+            }
+            yield _sse("error", json.dumps(error, ensure_ascii=False))
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/batch",
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "リポジトリごとの結果（BatchAnalysisItem）を完了順に1行ずつ返し、"
+            "最後にBatchAnalysisSummaryを返す",
+        },
+        401: error_responses[401],
+        429: error_responses[429],
+    },
+    dependencies=[Depends(admit_batch_analysis)],
+)
+async def create_batch_analysis(
+    request: BatchAnalysisRequest,
+    session_factory: sessionmaker = Depends(get_session_factory),
+    current_user: User = Depends(get_detached_user),
+):
+    """
+    複数リポジトリを一括分析してDBに保存（NDJSONでストリーミング）
+    """
+    read_access_token(current_user)
+
+    async def stream():
+        succeeded = 0
+        async for index, analysis, error in run_batch_analysis(
+            request.items, current_user, session_factory
+        ):
+            repo_url = request.items[index].repo_url
+            if error is not None:
+                item = BatchAnalysisItem(
+                    index=index,
+                    repo_url=repo_url,
+                    status="error",
+                    code=error.code.value,
+                    message=error.message,
+                )
+            else:
+                succeeded += 1
+                item = BatchAnalysisItem(
+                    index=index,
+                    repo_url=repo_url,
+                    status="success",
+                    data=_analysis_response(analysis),
+                )
+            yield item.model_dump_json() + "\n"
+
+        summary = BatchAnalysisSummary(
+            succeeded=succeeded, failed=len(request.items) - succeeded
+        )
+        yield summary.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.get(
     "",
     response_model=SuccessResponse[List[AnalysisListItem]],
-    responses={401: error_responses[401]},
+    responses={
+        304: {
+            "description": "Not Modified（If-None-Match / If-Modified-Since に一致）"
+        },
+        401: error_responses[401],
+    },
 )
 def list_analyses(
+    http_request: Request,
+    params: Annotated[AnalysisListQuery, Query()],
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     ログインユーザーの分析履歴一覧を取得
+    - min_<項目> / max_<項目> でスコア絞り込み、sort_by / order で並び替え
     """
-    analyses = (
-        db.query(Analysis)
-        .filter(Analysis.user_id == current_user.id)
-        .order_by(Analysis.created_at.desc())
-        .all()
+    query = db.query(Analysis).filter(Analysis.user_id == current_user.id)
+
+    for key in SCORE_KEYS:
+        column = Analysis.score_column(key)
+        low = getattr(params, f"min_{key}")
+        high = getattr(params, f"max_{key}")
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+
+    if params.sort_by == "created_at":
+        sort_column = Analysis.created_at
+    else:
+        sort_column = Analysis.score_column(params.sort_by)
+    sort_column = sort_column.asc() if params.order == "asc" else sort_column.desc()
+
+    # 一覧のバージョン（件数・最終更新日時・条件）で条件付きリクエストを判定
+    count, last_modified = query.with_entities(
+        func.count(Analysis.id), func.max(Analysis.updated_at)
+    ).one()
+    etag = make_etag(
+        "list", current_user.id, params.model_dump_json(), count, last_modified
     )
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(http_request, etag, last_modified):
+        return not_modified(headers)
+
+    analyses = query.order_by(sort_column, Analysis.created_at.desc()).all()
 
     logger.debug(f"List analyses | user: {current_user.id} | count: {len(analyses)}")
 
-    return SuccessResponse(
-        data=[
-            AnalysisListItem(
-                id=a.id,
-                repo_url=a.repo_url,
-                branch=a.branch,
-                scores=Scores(**a.scores),
-                memo=a.memo,
-                created_at=a.created_at.isoformat(),
-            )
-            for a in analyses
-        ]
+    return ModelResponse(
+        SuccessResponse[List[AnalysisListItem]](
+            data=_list_adapter.validate_python(analyses)
+        ),
+        headers=headers,
     )
 
 
+@router.get(
+    "/trends",
+    response_model=SuccessResponse[List[ScoreTrendItem]],
+    responses={401: error_responses[401]},
+)
+def get_trends(
+    bucket: Bucket = Query(default="day", description="集計単位（day / week / month）"),
+    repo_url: Optional[str] = None,
+    branch: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    リポジトリ・ブランチごとのスコア推移（平均・最小・最大）を取得
+    """
+    trends = get_score_trends(
+        db, current_user.id, bucket, repo_url, branch, since, until
+    )
+
+    logger.debug(f"Score trends | user: {current_user.id} | count: {len(trends)}")
+
+    return ModelResponse(SuccessResponse[List[ScoreTrendItem]](data=trends))
+
+
 @router.get(
     "/{analysis_id}",
     response_model=SuccessResponse[AnalysisResponse],
     responses={
+        304: {
+            "description": "Not Modified（If-None-Match / If-Modified-Since に一致）"
+        },
         401: error_responses[401],
         404: error_responses[404],
     },
 )
 def get_analysis(
     analysis_id: str,
+    http_request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -113,6 +324,7 @@ def get_analysis(
     """
     analysis = (
         db.query(Analysis)
+        .options(undefer(Analysis.report_compressed))
         .filter(
             Analysis.id == analysis_id,
             Analysis.user_id == current_user.id,
@@ -123,17 +335,17 @@ def get_analysis(
     if not analysis:
         raise AppException(404, ErrorCode.ANALYSIS_NOT_FOUND, "Analysis not found")
 
-    return SuccessResponse(
-        data=AnalysisResponse(
-            id=analysis.id,
-            repo_url=analysis.repo_url,
-            branch=analysis.branch,
-            scores=Scores(**analysis.scores),
-            report=Report(**analysis.report),
-            memo=analysis.memo,
-            created_at=analysis.created_at.isoformat(),
-            updated_at=analysis.updated_at.isoformat(),
-        )
+    # 分析はmemo以外不変なので id と updated_at で版を識別できる
+    etag = make_etag(analysis.id, analysis.updated_at.isoformat())
+    headers = cache_headers(etag, analysis.updated_at)
+    if is_not_modified(http_request, etag, analysis.updated_at):
+        return not_modified(headers)
+
+    return cached_compressed_response(
+        http_request,
+        (analysis.id, analysis.updated_at.isoformat()),
+        lambda: SuccessResponse[AnalysisResponse](data=_analysis_response(analysis)),
+        headers,
     )
 
 
@@ -173,6 +385,35 @@ def update_analysis(
     return SuccessResponse(data={"message": "Updated"})
 
 
+@router.post(
+    "/{analysis_id}/rescore",
+    response_model=SuccessResponse[AnalysisResponse],
+    responses={
+        401: error_responses[401],
+        404: error_responses[404],
+        409: error_responses[409],
+        429: error_responses[429],
+        500: error_responses[500],
+    },
+    dependencies=[Depends(admit_analysis)],
+)
+async def rescore_stored_analysis(
+    analysis_id: str,
+    session_factory: sessionmaker = Depends(get_session_factory),
+    current_user: User = Depends(get_detached_user),
+):
+    """
+    保存したcommitのアーカイブで分析し直し、スコアとレポートを更新（GitHubは呼ばない）
+    """
+    analysis = await rescore_analysis(
+        analysis_id, session_factory, user_id=current_user.id
+    )
+
+    return ModelResponse(
+        SuccessResponse[AnalysisResponse](data=_analysis_response(analysis))
+    )
+
+
 @router.delete(
     "/{analysis_id}",
     responses={
@@ -201,6 +442,14 @@ def delete_analysis(
         raise AppException(404, ErrorCode.ANALYSIS_NOT_FOUND, "Analysis not found")
 
     db.delete(analysis)
+    db.flush()
+    rebuild_rollup_bucket(
+        db,
+        analysis.user_id,
+        analysis.repo_url,
+        analysis.branch,
+        analysis.created_at.date(),
+    )
     db.commit()
 
     logger.info(f"Delete analysis | id: {analysis_id}")
@@ -0,0 +1,116 @@
+# app/routers/tracked_repos.py
+from fastapi import APIRouter, Depends
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.dependencies import get_db, get_current_user
+from app.models import User, TrackedRepo
+from app.schemas import SuccessResponse, TrackedRepoRequest, TrackedRepoResponse
+from app.exceptions import AppException, ErrorCode, error_responses
+from app.logger import logger
+
+router = APIRouter(
+    prefix="/tracked-repos",
+    tags=["tracked-repos"],
+)
+
+
+@router.post(
+    "",
+    response_model=SuccessResponse[TrackedRepoResponse],
+    responses={
+        401: error_responses[401],
+        409: error_responses[409],
+    },
+)
+def create_tracked_repo(
+    request: TrackedRepoRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    定期分析の対象に登録（オフピーク時間帯に差分分析で自動更新）
+    """
+    tracked = TrackedRepo(
+        user_id=current_user.id,
+        repo_url=request.repo_url,
+        branch=request.branch,
+        limit=request.limit,
+    )
+    db.add(tracked)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise AppException(
+            409, ErrorCode.TRACKED_REPO_ALREADY_EXISTS, "Repository is already tracked"
+        )
+    db.refresh(tracked)
+
+    logger.info(f"Track repo | id: {tracked.id} | repo: {tracked.repo_url}")
+
+    return SuccessResponse(data=TrackedRepoResponse.model_validate(tracked))
+
+
+@router.get(
+    "",
+    response_model=SuccessResponse[List[TrackedRepoResponse]],
+    responses={
+        401: error_responses[401],
+    },
+)
+def get_tracked_repos(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    定期分析の対象一覧（最終実行日時・直近の分析ID・エラーを含む）
+    """
+    tracked_repos = (
+        db.query(TrackedRepo)
+        .filter(TrackedRepo.user_id == current_user.id)
+        .order_by(TrackedRepo.created_at.desc())
+        .all()
+    )
+
+    return SuccessResponse(
+        data=[TrackedRepoResponse.model_validate(t) for t in tracked_repos]
+    )
+
+
+@router.delete(
+    "/{tracked_repo_id}",
+    responses={
+        401: error_responses[401],
+        404: error_responses[404],
+    },
+)
+def delete_tracked_repo(
+    tracked_repo_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    定期分析の対象から外す（これまでの分析結果は残る）
+    """
+    tracked = (
+        db.query(TrackedRepo)
+        .filter(
+            TrackedRepo.id == tracked_repo_id,
+            TrackedRepo.user_id == current_user.id,
+        )
+        .first()
+    )
+
+    if not tracked:
+        raise AppException(
+            404, ErrorCode.TRACKED_REPO_NOT_FOUND, "Tracked repository not found"
+        )
+
+    db.delete(tracked)
+    db.commit()
+
+    logger.info(f"Untrack repo | id: {tracked_repo_id}")
+
+    return SuccessResponse(data={"message": "Deleted"})
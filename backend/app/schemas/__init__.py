@@ -1,5 +1,11 @@
 # app/schemas/__init__.py
-from app.schemas.request import AnalysisRequest, MemoUpdate
+from app.schemas.request import (
+    AnalysisRequest,
+    AnalysisListQuery,
+    BatchAnalysisRequest,
+    MemoUpdate,
+    TrackedRepoRequest,
+)
 from app.schemas.response import (
     SuccessResponse,
     ErrorResponse,
@@ -8,12 +14,23 @@ from app.schemas.response import (
     AnalysisData,
     AnalysisResponse,
     AnalysisListItem,
+    BatchAnalysisItem,
+    BatchAnalysisSummary,
+    ScoreAggregate,
+    ScoreTrendScores,
+    ScoreTrendItem,
+    LLMUsage,
+    ProfileSummary,
+    TrackedRepoResponse,
     UserData,
 )
 
 __all__ = [
     "AnalysisRequest",
+    "AnalysisListQuery",
+    "BatchAnalysisRequest",
     "MemoUpdate",
+    "TrackedRepoRequest",
     "SuccessResponse",
     "ErrorResponse",
     "Scores",
@@ -21,5 +38,13 @@ __all__ = [
     "AnalysisData",
     "AnalysisResponse",
     "AnalysisListItem",
+    "BatchAnalysisItem",
+    "BatchAnalysisSummary",
+    "ScoreAggregate",
+    "ScoreTrendScores",
+    "ScoreTrendItem",
+    "LLMUsage",
+    "ProfileSummary",
+    "TrackedRepoResponse",
     "UserData",
 ]
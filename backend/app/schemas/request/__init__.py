@@ -1,4 +1,16 @@
 # app/schemas/request/__init__.py
-from app.schemas.request.analysis import AnalysisRequest, MemoUpdate
+from app.schemas.request.analysis import (
+    AnalysisRequest,
+    AnalysisListQuery,
+    BatchAnalysisRequest,
+    MemoUpdate,
+)
+from app.schemas.request.tracked_repo import TrackedRepoRequest
 
-__all__ = ["AnalysisRequest", "MemoUpdate"]
+__all__ = [
+    "AnalysisRequest",
+    "AnalysisListQuery",
+    "BatchAnalysisRequest",
+    "MemoUpdate",
+    "TrackedRepoRequest",
+]
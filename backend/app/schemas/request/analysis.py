@@ -1,12 +1,21 @@
 # app/schemas/request/analysis.py
-from pydantic import BaseModel, Field, field_validator
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Literal, Optional
 import re
 
+# 期間（since）を指定しない場合のcommit数の上限
+MAX_LIMIT = 30
+# 期間を指定した場合の上限（一覧はページをたどって取得する）
+MAX_WINDOW_LIMIT = 300
+
+
+class RepoRequest(BaseModel):
+    """分析対象のリポジトリ・ブランチ（分析実行と定期分析の登録で共通）"""
 
-class AnalysisRequest(BaseModel):
     repo_url: str = Field(..., min_length=1, examples=["https://github.com/user/repo"])
     branch: str = Field(default="main", min_length=1, max_length=255)
-    limit: int = Field(default=30, ge=1, le=30)
+    limit: int = Field(default=30, ge=1, le=MAX_LIMIT)
 
     @field_validator("repo_url")
     @classmethod
@@ -20,11 +29,108 @@ class AnalysisRequest(BaseModel):
     @field_validator("branch")
     @classmethod
     def sanitize_branch(cls, v: str) -> str:
-        """ブランチ名サニタイズ（コマンドインジェクション対策）"""
-        if re.search(r"[;&|`$\\'\"\n\r]", v):
+        """
+        ブランチ名サニタイズ（git check-ref-formatの規則）
+        - gitのオプション（先頭の "-"）やURLのクエリ・フラグメント（"?" "#"）として解釈させない
+        """
+        if (
+            re.search(r"[\x00-\x20\x7f~^:?*\[\\#;&|`$'\"]", v)
+            or v.startswith(("-", "/"))
+            or v.endswith(("/", ".", ".lock"))
+            or ".." in v
+            or "@{" in v
+            or v == "@"
+            or "//" in v
+            or any(part.startswith(".") for part in v.split("/"))
+        ):
             raise ValueError("Invalid branch name")
         return v
 
 
+class AnalysisRequest(RepoRequest):
+    limit: int = Field(default=30, ge=1, le=MAX_WINDOW_LIMIT)
+    # 前回の分析以降のcommitだけを分析する
+    incremental: bool = False
+    # 取得するcommitの絞り込み（期間・作者・パス）
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    author: Optional[str] = Field(default=None, min_length=1, max_length=100)
+    path: Optional[str] = Field(default=None, min_length=1, max_length=1024)
+
+    @field_validator("since", "until")
+    @classmethod
+    def to_utc(cls, v: Optional[datetime]) -> Optional[datetime]:
+        """タイムゾーンの無い日時はUTCとして扱う"""
+        if v is not None and v.tzinfo is None:
+            return v.replace(tzinfo=timezone.utc)
+        return v
+
+    @field_validator("author")
+    @classmethod
+    def sanitize_author(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and re.search(r"[\x00-\x1f]", v):
+            raise ValueError("Invalid author")
+        return v
+
+    @field_validator("path")
+    @classmethod
+    def sanitize_path(cls, v: Optional[str]) -> Optional[str]:
+        """リポジトリ内の相対パスのみ（gitのオプション・pathspecとして解釈させない）"""
+        if v is None:
+            return v
+        if (
+            re.search(r"[\x00-\x1f]", v)
+            or v.startswith(("/", "-", ":"))
+            or ".." in v.split("/")
+        ):
+            raise ValueError("Invalid path")
+        return v
+
+    @model_validator(mode="after")
+    def validate_window(self) -> "AnalysisRequest":
+        if self.since and self.until and self.since >= self.until:
+            raise ValueError("since must be earlier than until")
+        if self.limit > MAX_LIMIT and self.since is None:
+            raise ValueError(f"limit above {MAX_LIMIT} requires since")
+        if self.incremental and (self.since or self.until or self.author or self.path):
+            raise ValueError(
+                "incremental cannot be combined with since/until/author/path"
+            )
+        return self
+
+
 class MemoUpdate(BaseModel):
     memo: str = Field(..., max_length=1000)
+
+
+class BatchAnalysisRequest(BaseModel):
+    items: List[AnalysisRequest] = Field(..., min_length=1, max_length=50)
+
+
+ScoreKey = Literal[
+    "test",
+    "comment",
+    "commit_size",
+    "commit_frequency",
+    "commit_message",
+    "activity",
+]
+
+
+class AnalysisListQuery(BaseModel):
+    """一覧のスコア絞り込み・並び替え（DB側で実行）"""
+
+    sort_by: Literal["created_at", ScoreKey] = "created_at"
+    order: Literal["asc", "desc"] = "desc"
+    min_test: Optional[int] = Field(default=None, ge=0, le=100)
+    max_test: Optional[int] = Field(default=None, ge=0, le=100)
+    min_comment: Optional[int] = Field(default=None, ge=0, le=100)
+    max_comment: Optional[int] = Field(default=None, ge=0, le=100)
+    min_commit_size: Optional[int] = Field(default=None, ge=0, le=100)
+    max_commit_size: Optional[int] = Field(default=None, ge=0, le=100)
+    min_commit_frequency: Optional[int] = Field(default=None, ge=0, le=100)
+    max_commit_frequency: Optional[int] = Field(default=None, ge=0, le=100)
+    min_commit_message: Optional[int] = Field(default=None, ge=0, le=100)
+    max_commit_message: Optional[int] = Field(default=None, ge=0, le=100)
+    min_activity: Optional[int] = Field(default=None, ge=0, le=100)
+    max_activity: Optional[int] = Field(default=None, ge=0, le=100)
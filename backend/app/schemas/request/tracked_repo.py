@@ -0,0 +1,6 @@
+# app/schemas/request/tracked_repo.py
+from app.schemas.request.analysis import RepoRequest
+
+
+class TrackedRepoRequest(RepoRequest):
+    """定期分析の対象として登録するリポジトリ・ブランチ"""
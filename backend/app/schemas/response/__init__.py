@@ -6,7 +6,15 @@ from app.schemas.response.analysis import (
     AnalysisData,
     AnalysisResponse,
     AnalysisListItem,
+    BatchAnalysisItem,
+    BatchAnalysisSummary,
+    ScoreAggregate,
+    ScoreTrendScores,
+    ScoreTrendItem,
 )
+from app.schemas.response.llm import LLMUsage
+from app.schemas.response.profile import ProfileSummary
+from app.schemas.response.tracked_repo import TrackedRepoResponse
 from app.schemas.response.user import UserData
 
 __all__ = [
@@ -17,5 +25,13 @@ __all__ = [
     "AnalysisData",
     "AnalysisResponse",
     "AnalysisListItem",
+    "BatchAnalysisItem",
+    "BatchAnalysisSummary",
+    "ScoreAggregate",
+    "ScoreTrendScores",
+    "ScoreTrendItem",
+    "LLMUsage",
+    "ProfileSummary",
+    "TrackedRepoResponse",
     "UserData",
 ]
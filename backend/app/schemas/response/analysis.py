@@ -1,6 +1,7 @@
 # app/schemas/response/analysis.py
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, field_validator
+from datetime import datetime
+from typing import Any, Literal, Optional
 
 
 class Scores(BaseModel):
@@ -26,7 +27,17 @@ class AnalysisData(BaseModel):
     report: Report
 
 
+def _isoformat(value: Any) -> Any:
+    """ORMのdatetimeをそのまま渡せるように文字列化"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
 class AnalysisResponse(BaseModel):
+    # Analysisモデルから直接 model_validate できるようにする
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     repo_url: str
     branch: str
@@ -36,11 +47,57 @@ class AnalysisResponse(BaseModel):
     created_at: str
     updated_at: Optional[str] = None
 
+    _format_datetime = field_validator("created_at", "updated_at", mode="before")(
+        _isoformat
+    )
+
 
 class AnalysisListItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     repo_url: str
     branch: str
     scores: Scores
     memo: Optional[str] = None
     created_at: str
+
+    _format_datetime = field_validator("created_at", mode="before")(_isoformat)
+
+
+class BatchAnalysisItem(BaseModel):
+    index: int
+    repo_url: str
+    status: Literal["success", "error"]
+    data: Optional[AnalysisResponse] = None
+    code: Optional[str] = None
+    message: Optional[str] = None
+
+
+class BatchAnalysisSummary(BaseModel):
+    status: str = "done"
+    succeeded: int
+    failed: int
+
+
+class ScoreAggregate(BaseModel):
+    avg: float
+    min: int
+    max: int
+
+
+class ScoreTrendScores(BaseModel):
+    test: ScoreAggregate
+    comment: ScoreAggregate
+    commit_size: ScoreAggregate
+    commit_frequency: ScoreAggregate
+    commit_message: ScoreAggregate
+    activity: ScoreAggregate
+
+
+class ScoreTrendItem(BaseModel):
+    repo_url: str
+    branch: str
+    bucket_start: str
+    count: int
+    scores: ScoreTrendScores
@@ -0,0 +1,14 @@
+# app/schemas/response/llm.py
+from pydantic import BaseModel
+from typing import Optional
+
+
+class LLMUsage(BaseModel):
+    """起動してからのLLM呼び出しのトークン数（ワーカーごと）"""
+
+    calls: int
+    prompt_tokens: int
+    cached_tokens: int
+    output_tokens: int
+    cached_ratio: float
+    avg_first_token_ms: Optional[float]
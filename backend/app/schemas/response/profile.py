@@ -0,0 +1,19 @@
+# app/schemas/response/profile.py
+from pydantic import BaseModel
+from typing import Dict
+
+
+class ProfileSummary(BaseModel):
+    """保存されたプロファイルの概要（スタックは GET /admin/profiles/{id} で取得）"""
+
+    id: str
+    method: str
+    path: str
+    status_code: int
+    started_at: str
+    duration_ms: float
+    reason: str
+    interval_ms: float
+    samples: int
+    by_state: Dict[str, int]
+    by_module: Dict[str, int]
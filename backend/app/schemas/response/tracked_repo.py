@@ -0,0 +1,22 @@
+# app/schemas/response/tracked_repo.py
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import Optional
+
+from app.schemas.response.analysis import _isoformat
+
+
+class TrackedRepoResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    repo_url: str
+    branch: str
+    limit: int
+    last_run_at: Optional[str] = None
+    last_analysis_id: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: str
+
+    _format_datetime = field_validator("last_run_at", "created_at", mode="before")(
+        _isoformat
+    )
@@ -1,5 +1,14 @@
 # app/services/__init__.py
 from app.services.gemini_client import analyze_commits
-from app.services.analysis_service import run_analysis, fetch_commits_from_github
+from app.services.analysis_service import (
+    run_analysis,
+    fetch_commits_from_github,
+    fetch_head_sha,
+)
 
-__all__ = ["analyze_commits", "run_analysis", "fetch_commits_from_github"]
+__all__ = [
+    "analyze_commits",
+    "run_analysis",
+    "fetch_commits_from_github",
+    "fetch_head_sha",
+]
@@ -1,24 +1,48 @@
 # app/services/analysis_service.py
 import asyncio
+import time
+from contextlib import aclosing
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, Optional, Tuple
 
 import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists, inspect
+from sqlalchemy.orm import Session, aliased, undefer
 
+from app.config import settings
 from app.exceptions import AppException, ErrorCode
 from app.logger import logger
 from app.models import Analysis, User
-from app.services.gemini_client import analyze_commits
+from app.schemas import AnalysisRequest
+from app.services.gemini_client import (
+    SYSTEM_INSTRUCTION,
+    analyze_commits,
+    build_prompt,
+    stream_analyze_commits,
+    validate_streamed_result,
+)
+from app.services.commit_archive import pack_commits, unpack_commits
+from app.services.commit_filter import CommitFilter
+from app.services.commit_detail_reader import (
+    PATCH_PREVIEW_CHARS,
+    read_commit_detail,
+)
+from app.services.git_fetcher import fetch_head_sha_via_git, repo_cache
+from app.services.github_client import GitHubClient
+from app.services.resilience import CircuitOpenError
+from app.services.rollup_service import add_to_rollup, rebuild_rollup_bucket
+from app.token_vault import TokenVaultError
 
 
-async def fetch_commits_from_github(
-    repo_url: str,
-    branch: str,
-    limit: int,
-    access_token: str,
-) -> str:
-    """
-    GitHub APIからcommit取得してテキスト形式に変換
-    """
+# 進捗通知のコールバック（イベント名, データ）
+ProgressCallback = Callable[[str, dict], None]
+
+# DBセッションを作る関数（GitHub・Geminiを待つ間は接続を持たないよう、使う区間だけ開く）
+SessionFactory = Callable[[], Session]
+
+
+def _parse_repo_url(repo_url: str) -> Tuple[str, str]:
+    """repo_urlから (owner, repo) を取り出す"""
     try:
         parts = repo_url.rstrip("/").split("/")
         owner = parts[-2]
@@ -29,44 +53,270 @@ async def fetch_commits_from_github(
             ErrorCode.INVALID_REPO_URL,
             "Invalid repo_url format. Expected: https://github.com/owner/repo",
         )
+    return owner, repo
 
-    logger.debug(f"GitHub API | Fetching commits | {owner}/{repo} | branch: {branch}")
 
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/vnd.github.v3+json",
-    }
+def _is_github_api_url(url: str) -> bool:
+    """GitHub APIと同じスキーム・ホスト・ポートか（前方一致だと api.github.com.evil... を通す）"""
+    base = httpx.URL(settings.github_api_base_url)
+    try:
+        target = httpx.URL(url)
+    except httpx.InvalidURL:
+        return False
+    return (target.scheme, target.host, target.port) == (
+        base.scheme,
+        base.host,
+        base.port,
+    )
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.github.com/repos/{owner}/{repo}/commits",
-            params={"sha": branch, "per_page": limit},
-            headers=headers,
-        )
 
-    if response.status_code != 200:
-        error_msg = response.json().get("message", "Unknown error")
-        logger.warning(f"GitHub API | Error | {response.status_code} | {error_msg}")
+def _rate_limit_retry_after(response: httpx.Response) -> Optional[int]:
+    """
+    GitHubのレート制限によるエラーなら、再試行までの秒数（そうでなければNone）
+    - 429、または403でX-RateLimit-Remainingが0かRetry-After付き（二次レート制限）
+    """
+    headers = response.headers
+    if response.status_code not in (403, 429):
+        return None
+    if headers.get("Retry-After", "").isdigit():
+        return max(1, int(headers["Retry-After"]))
+    if headers.get("X-RateLimit-Remaining") == "0":
+        reset = headers.get("X-RateLimit-Reset", "")
+        return max(1, int(reset) - int(time.time())) if reset.isdigit() else 60
+    return 60 if response.status_code == 429 else None
+
+
+def _raise_github_error(response: httpx.Response) -> None:
+    error_msg = response.json().get("message", "Unknown error")
+    logger.warning(f"GitHub API | Error | {response.status_code} | {error_msg}")
+    retry_after = _rate_limit_retry_after(response)
+    if retry_after is not None:
+        # 呼び出し側（定期分析など）が残りを後に回せるよう、429として扱う
         raise AppException(
-            400, ErrorCode.GITHUB_API_ERROR, f"GitHub API error: {error_msg}"
+            429,
+            ErrorCode.GITHUB_API_ERROR,
+            f"GitHub API rate limit exceeded: {error_msg}",
+            headers={"Retry-After": str(retry_after)},
         )
+    raise AppException(
+        400, ErrorCode.GITHUB_API_ERROR, f"GitHub API error: {error_msg}"
+    )
 
-    commits_data = response.json()
-    logger.info(f"GitHub API | Success | {len(commits_data)} commits fetched")
 
-    async with httpx.AsyncClient() as client:
+async def fetch_head_sha(
+    repo_url: str,
+    branch: str,
+    access_token: str,
+    client: Optional[GitHubClient] = None,
+) -> str:
+    """
+    ブランチの先頭commitのSHAを取得（SHAだけを返すメディアタイプで軽量に）
+    """
+    if settings.commit_fetcher == "git":
+        return await fetch_head_sha_via_git(repo_url, branch, access_token)
+
+    owner, repo = _parse_repo_url(repo_url)
 
-        async def fetch_detail(sha: str):
-            response = await client.get(
-                f"https://api.github.com/repos/{owner}/{repo}/commits/{sha}",
-                headers=headers,
+    async def get(client: GitHubClient) -> httpx.Response:
+        return await client.get(
+            f"/repos/{owner}/{repo}/commits/{branch}",
+            headers={"Accept": "application/vnd.github.sha"},
+        )
+
+    if client is None:
+        async with GitHubClient(access_token) as client:
+            response = await get(client)
+    else:
+        response = await get(client)
+
+    if response.status_code != 200:
+        _raise_github_error(response)
+
+    return response.text.strip()
+
+
+async def fetch_commits_from_github(
+    repo_url: str,
+    branch: str,
+    limit: int,
+    access_token: str,
+    client: Optional[GitHubClient] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    base_sha: Optional[str] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    records: Optional[List[dict]] = None,
+) -> str:
+    """
+    GitHub APIからcommit取得してテキスト形式に変換
+    - clientを渡すと接続とレート制限の残量を共有する（一括分析用）
+    - on_progressを渡すと取得の進捗を (イベント名, データ) で通知する
+    - base_shaを渡すとそのcommit以降（compare API）だけを取得する（差分分析用）
+    - commit_filterを渡すと期間・作者・パスで絞り込む（base_shaとは併用しない）
+    - recordsにリストを渡すと、取得したcommit詳細を追加する（再分析用のアーカイブ）
+    - commit_fetcher="git" ならREST APIの代わりにbare cloneのキャッシュから読む
+    """
+    owner, repo = _parse_repo_url(repo_url)
+    commit_filter = commit_filter or CommitFilter()
+
+    if settings.commit_fetcher == "git":
+        logger.debug(f"git | Fetching commits | {owner}/{repo} | ref: {branch}")
+        details = await repo_cache.fetch_commits(
+            repo_url,
+            branch,
+            limit,
+            access_token,
+            base_sha=base_sha,
+            commit_filter=commit_filter,
+        )
+        if on_progress:
+            on_progress("commits", {"count": len(details)})
+            on_progress("details", {"fetched": len(details), "total": len(details)})
+    else:
+        logger.debug(
+            f"GitHub API | Fetching commits | {owner}/{repo} | branch: {branch}"
+        )
+        if client is None:
+            async with GitHubClient(access_token) as client:
+                details = await _fetch_commit_details(
+                    client,
+                    owner,
+                    repo,
+                    branch,
+                    limit,
+                    on_progress,
+                    base_sha,
+                    commit_filter,
+                )
+        else:
+            details = await _fetch_commit_details(
+                client, owner, repo, branch, limit, on_progress, base_sha, commit_filter
             )
+
+    if records is not None:
+        records.extend(detail for detail in details if detail is not None)
+    return format_commit_log(details)
+
+
+async def _list_commit_pages(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    branch: str,
+    limit: int,
+    commit_filter: CommitFilter,
+) -> AsyncIterator[List[dict]]:
+    """
+    commit一覧をLinkヘッダーのnextをたどってページごとにyield（合計limit件まで）
+    - ページを返す前に次のページのリクエストを始めておき、
+      呼び出し側が詳細を取得している間に一覧の取得を進める
+    """
+    params = {
+        "sha": branch,
+        "per_page": min(limit, settings.github_commits_per_page),
+        **commit_filter.api_params(),
+    }
+    next_page = asyncio.create_task(
+        client.get(f"/repos/{owner}/{repo}/commits", params=params)
+    )
+    remaining = limit
+    try:
+        while next_page is not None:
+            response = await next_page
+            next_page = None
             if response.status_code != 200:
-                return None
-            return response.json()
+                _raise_github_error(response)
+            page = response.json()[:remaining]
+            remaining -= len(page)
+
+            next_url = response.links.get("next", {}).get("url")
+            if page and remaining > 0 and next_url:
+                # 認証ヘッダー付きで他のホストへ送らない
+                if not _is_github_api_url(next_url):
+                    logger.warning(f"GitHub API | Unexpected next page | {next_url}")
+                else:
+                    next_page = asyncio.create_task(client.get(next_url))
+            yield page
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
+async def _compare_commits(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    branch: str,
+    limit: int,
+    base_sha: str,
+) -> AsyncIterator[List[dict]]:
+    """base_sha以降のcommit（compare APIは1回で返すので1ページだけ）"""
+    response = await client.get(f"/repos/{owner}/{repo}/compare/{base_sha}...{branch}")
+    if response.status_code != 200:
+        _raise_github_error(response)
+    # compareは古い順なので、新しい方からlimit件を一覧と同じ新しい順に並べる
+    yield response.json().get("commits", [])[-limit:][::-1]
+
+
+async def _fetch_commit_details(
+    client: GitHubClient,
+    owner: str,
+    repo: str,
+    branch: str,
+    limit: int,
+    on_progress: Optional[ProgressCallback] = None,
+    base_sha: Optional[str] = None,
+    commit_filter: Optional[CommitFilter] = None,
+) -> List[Optional[dict]]:
+    """
+    commit一覧を取得し、各commitの詳細を並行取得
+    - 一覧は複数ページになりうるので、ページが届くたびにそのページの詳細の取得を始める
+    """
+    total = 0
+    fetched = 0
+
+    async def fetch_detail(sha: str):
+        nonlocal fetched
+        # 巨大なcommitでもメモリを使いすぎないよう、上限まで少しずつ読む
+        async with client.stream(f"/repos/{owner}/{repo}/commits/{sha}") as response:
+            if response.status_code == 200:
+                detail = await read_commit_detail(
+                    response,
+                    settings.github_commit_max_bytes,
+                    settings.github_commit_max_files,
+                )
+            else:
+                detail = None
+        fetched += 1
+        if on_progress:
+            on_progress("details", {"fetched": fetched, "total": total})
+        return detail
+
+    if base_sha is None:
+        pages = _list_commit_pages(
+            client, owner, repo, branch, limit, commit_filter or CommitFilter()
+        )
+    else:
+        pages = _compare_commits(client, owner, repo, branch, limit, base_sha)
+
+    tasks: List[asyncio.Task] = []
+    try:
+        async with aclosing(pages):
+            async for page in pages:
+                total += len(page)
+                if on_progress:
+                    on_progress("commits", {"count": total})
+                tasks += [asyncio.create_task(fetch_detail(c["sha"])) for c in page]
+        logger.info(f"GitHub API | Success | {total} commits fetched")
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
 
-        details = await asyncio.gather(*[fetch_detail(c["sha"]) for c in commits_data])
 
+def format_commit_log(details: List[Optional[dict]]) -> str:
+    """
+    commit詳細をGeminiに渡すテキスト形式に変換
+    """
     lines = []
     for detail in details:
         if detail is None:
@@ -84,35 +334,299 @@ async def fetch_commits_from_github(
             )
             patch = f.get("patch", "")
             if patch:
-                lines.append(f"    Diff: {patch[:200]}...")
+                lines.append(f"    Diff: {patch[:PATCH_PREVIEW_CHARS]}...")
 
         lines.append("")
 
     return "\n".join(lines)
 
 
+def read_access_token(current_user: User) -> str:
+    """
+    保存したGitHubのアクセストークン（復号できなければ再ログインを求める401）
+    - ストリーミングの分析ではヘッダー送信前に呼び、401をそのまま返す
+    """
+    try:
+        return current_user.github_access_token
+    except TokenVaultError as e:
+        logger.error(f"Token vault | Error | user: {current_user.id} | {e}")
+        raise AppException(
+            401,
+            ErrorCode.GITHUB_REAUTH_REQUIRED,
+            "Stored GitHub token cannot be read. Please log in again",
+        )
+
+
+def _gemini_unavailable() -> AppException:
+    logger.warning("Gemini API | Circuit open | failing fast")
+    return AppException(
+        503,
+        ErrorCode.GEMINI_API_UNAVAILABLE,
+        "Gemini API is temporarily unavailable",
+    )
+
+
+async def _analyze_log(parsed_log: str, previous_scores: Optional[dict] = None) -> dict:
+    """
+    Geminiで分析（タイムアウト・再試行・サーキットブレーカーはgemini_client側）
+    """
+    logger.debug("Gemini API | Start analysis")
+    try:
+        result = await analyze_commits(parsed_log, previous_scores)
+        logger.info("Gemini API | Success")
+    except CircuitOpenError:
+        raise _gemini_unavailable()
+    except Exception as e:
+        logger.error(f"Gemini API | Error | {type(e).__name__}: {str(e)}")
+        raise AppException(
+            500, ErrorCode.GEMINI_API_ERROR, f"Gemini API error: {str(e)}"
+        )
+    return result
+
+
+def _save_analysis(
+    session_factory: SessionFactory,
+    current_user: User,
+    repo_url: str,
+    branch: str,
+    result: dict,
+    head_sha: Optional[str] = None,
+    records: Optional[List[dict]] = None,
+) -> Analysis:
+    """
+    分析結果をDBに保存（保存の間だけ接続を使い、切り離したAnalysisを返す）
+    - recordsがあれば、取得したcommitのアーカイブも保存する
+    """
+    analysis = Analysis(
+        user_id=current_user.id,
+        repo_url=repo_url,
+        branch=branch,
+        scores=result["scores"],
+        report=result["report"],
+        head_sha=head_sha,
+        commits_compressed=pack_commits(records) if records else None,
+    )
+    _insert_analysis(session_factory, analysis)
+    return analysis
+
+
+def _insert_analysis(session_factory: SessionFactory, analysis: Analysis) -> None:
+    """Analysisを集計と一緒にINSERTし、切り離した状態で使えるようにする"""
+    with session_factory() as db:
+        db.add(analysis)
+        db.flush()
+        add_to_rollup(db, analysis)
+        db.commit()
+        _refresh_detached(db, analysis)
+
+
+def _refresh_detached(db: Session, analysis: Analysis) -> None:
+    """セッションを閉じた後もレスポンスに使えるよう、遅延ロードの列も読み込む（アーカイブは除く）"""
+    db.refresh(
+        analysis,
+        [
+            attr.key
+            for attr in inspect(Analysis).column_attrs
+            if attr.key != "commits_compressed"
+        ],
+    )
+
+
+def _new_records() -> Optional[List[dict]]:
+    """commitのアーカイブを保存する設定なら、取得したcommitを集めるリスト"""
+    return [] if settings.commit_archive_enabled else None
+
+
+def _find_previous_analysis(
+    session_factory: SessionFactory, current_user: User, repo_url: str, branch: str
+) -> Optional[Analysis]:
+    """同じリポジトリ・ブランチの直近の分析（HEAD SHAを記録したもの、切り離して返す）"""
+    with session_factory() as db:
+        return (
+            db.query(Analysis)
+            .options(undefer(Analysis.report_compressed))
+            .filter(
+                Analysis.user_id == current_user.id,
+                Analysis.repo_url == repo_url,
+                Analysis.branch == branch,
+                Analysis.head_sha.isnot(None),
+            )
+            .order_by(Analysis.created_at.desc())
+            .first()
+        )
+
+
+async def _fetch_log(
+    repo_url: str,
+    branch: str,
+    limit: int,
+    incremental: bool,
+    current_user: User,
+    session_factory: SessionFactory,
+    client: Optional[GitHubClient] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    records: Optional[List[dict]] = None,
+) -> Tuple[Optional[str], Optional[str], Optional[Analysis]]:
+    """
+    分析対象のcommitを取得
+    - 差分分析では前回の分析が記録したHEAD SHA以降のcommitだけを取得する
+    - recordsにリストを渡すと、取得したcommit詳細を追加する
+    - 戻り値は (parsed_log, head_sha, 前回の分析)
+      新しいcommitが無ければ parsed_log は None
+    """
+    access_token = read_access_token(current_user)
+
+    if not incremental:
+        parsed_log = await fetch_commits_from_github(
+            repo_url,
+            branch,
+            limit,
+            access_token,
+            client=client,
+            on_progress=on_progress,
+            commit_filter=commit_filter,
+            records=records,
+        )
+        return parsed_log, None, None
+
+    previous = await asyncio.to_thread(
+        _find_previous_analysis, session_factory, current_user, repo_url, branch
+    )
+    head_sha = await fetch_head_sha(repo_url, branch, access_token, client=client)
+
+    if previous is not None and previous.head_sha == head_sha:
+        logger.info(f"Analysis | No new commits | previous: {previous.id}")
+        return None, head_sha, previous
+
+    # 取得中にブランチが進んでもずれないよう、HEAD SHAに固定して取得する
+    parsed_log = await fetch_commits_from_github(
+        repo_url,
+        head_sha,
+        limit,
+        access_token,
+        client=client,
+        on_progress=on_progress,
+        base_sha=previous.head_sha if previous else None,
+        records=records,
+    )
+    return parsed_log, head_sha, previous
+
+
 async def run_analysis(
     repo_url: str,
     branch: str,
     limit: int,
     current_user: User,
-    db: Session,
+    session_factory: SessionFactory,
+    incremental: bool = False,
+    commit_filter: Optional[CommitFilter] = None,
 ) -> Analysis:
     """
     GitHub取得 → Gemini分析 → DB保存 を実行
+    - incremental=Trueなら前回の分析以降のcommitだけを、前回のスコアと一緒に渡す
+      新しいcommitが無ければ前回の分析をそのまま返す
+    - DB接続は前回の分析の読み込みと保存の間だけ使う（current_userは切り離したものでよい）
+      DBの読み書きはスレッドで行い、待つ間も他の分析・ストリームを止めない
+    - commit_filterで期間・作者・パスを絞り込む（差分分析とは併用しない）
     """
     logger.info(f"Analysis | Start | user: {current_user.id} | repo: {repo_url}")
 
     # 1. GitHub APIからcommit取得
-    parsed_log = await fetch_commits_from_github(
-        repo_url, branch, limit, current_user.github_access_token
+    records = _new_records()
+    parsed_log, head_sha, previous = await _fetch_log(
+        repo_url,
+        branch,
+        limit,
+        incremental,
+        current_user,
+        session_factory,
+        commit_filter=commit_filter,
+        records=records,
     )
+    if parsed_log is None:
+        return previous
 
     # 2. Geminiで分析
-    logger.debug("Gemini API | Start analysis")
+    result = await _analyze_log(parsed_log, previous.scores if previous else None)
+
+    # 3. DBに保存
+    analysis = await asyncio.to_thread(
+        _save_analysis,
+        session_factory,
+        current_user,
+        repo_url,
+        branch,
+        result,
+        head_sha,
+        records,
+    )
+
+    logger.info(f"Analysis | Complete | id: {analysis.id}")
+
+    return analysis
+
+
+async def stream_analysis(
+    repo_url: str,
+    branch: str,
+    limit: int,
+    current_user: User,
+    session_factory: SessionFactory,
+    incremental: bool = False,
+    commit_filter: Optional[CommitFilter] = None,
+) -> AsyncIterator[Tuple[str, object]]:
+    """
+    run_analysisのストリーミング版
+    - 各段階の進捗を (イベント名, データ) でyieldする
+      commits / details / prompt / token、最後に result（保存済みのAnalysis）
+    """
+    logger.info(f"Analysis | Stream start | user: {current_user.id} | repo: {repo_url}")
+
+    # 1. GitHub APIからcommit取得（進捗はキュー経由で受け取る）
+    queue: asyncio.Queue = asyncio.Queue()
+    records = _new_records()
+    fetch_task = asyncio.create_task(
+        _fetch_log(
+            repo_url,
+            branch,
+            limit,
+            incremental,
+            current_user,
+            session_factory,
+            on_progress=lambda event, data: queue.put_nowait((event, data)),
+            commit_filter=commit_filter,
+            records=records,
+        )
+    )
+    fetch_task.add_done_callback(lambda _: queue.put_nowait(None))
     try:
-        result = analyze_commits(parsed_log)
+        while (item := await queue.get()) is not None:
+            yield item
+    finally:
+        fetch_task.cancel()
+    parsed_log, head_sha, previous = fetch_task.result()
+    if parsed_log is None:
+        yield "result", previous
+        return
+    previous_scores = previous.scores if previous else None
+
+    prompt = build_prompt(parsed_log, previous_scores)
+    yield "prompt", {"chars": len(SYSTEM_INSTRUCTION) + len(prompt)}
+
+    # 2. Geminiで分析（生成途中のテキストをそのまま流す）
+    logger.debug("Gemini API | Start streaming analysis")
+    chunks = []
+    try:
+        async for text in stream_analyze_commits(parsed_log, previous_scores):
+            chunks.append(text)
+            yield "token", {"text": text}
+        result = await validate_streamed_result(
+            "".join(chunks), parsed_log, previous_scores
+        )
         logger.info("Gemini API | Success")
+    except CircuitOpenError:
+        raise _gemini_unavailable()
     except Exception as e:
         logger.error(f"Gemini API | Error | {type(e).__name__}: {str(e)}")
         raise AppException(
@@ -120,17 +634,287 @@ async def run_analysis(
         )
 
     # 3. DBに保存
-    analysis = Analysis(
-        user_id=current_user.id,
-        repo_url=repo_url,
-        branch=branch,
-        scores=result["scores"],
-        report=result["report"],
+    analysis = await asyncio.to_thread(
+        _save_analysis,
+        session_factory,
+        current_user,
+        repo_url,
+        branch,
+        result,
+        head_sha,
+        records,
     )
-    db.add(analysis)
-    db.commit()
-    db.refresh(analysis)
 
     logger.info(f"Analysis | Complete | id: {analysis.id}")
 
+    yield "result", analysis
+
+
+async def run_batch_analysis(
+    requests: List[AnalysisRequest],
+    current_user: User,
+    session_factory: SessionFactory,
+) -> AsyncIterator[Tuple[int, Optional[Analysis], Optional[AppException]]]:
+    """
+    複数リポジトリを一括分析
+    - GitHubClientを全リポジトリで共有（接続・レート制限の残量）
+    - GitHub取得とGemini分析は最大batch_max_concurrency件まで並行
+    - 完了した順に (index, Analysis or None, AppException or None) をyield
+    - 成功分は1件ずつINSERTしてからyieldする（返したidは必ず保存済み）
+    - 想定外の例外もその1件のエラーにし、残りの分析は続ける
+    """
+    logger.info(
+        f"Batch analysis | Start | user: {current_user.id} | count: {len(requests)}"
+    )
+
+    semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+    access_token = read_access_token(current_user)
+    saved = 0
+
+    async with GitHubClient(access_token) as client:
+
+        async def analyze_one(index: int, request: AnalysisRequest):
+            records = _new_records()
+            async with semaphore:
+                try:
+                    parsed_log, head_sha, previous = await _fetch_log(
+                        request.repo_url,
+                        request.branch,
+                        request.limit,
+                        request.incremental,
+                        current_user,
+                        session_factory,
+                        client=client,
+                        commit_filter=CommitFilter.from_request(request),
+                        records=records,
+                    )
+                    if parsed_log is None:
+                        # 新しいcommitなし → 前回の分析をそのまま返す
+                        return index, previous, None
+                    result = await _analyze_log(
+                        parsed_log, previous.scores if previous else None
+                    )
+                except AppException as e:
+                    return index, None, e
+                except httpx.HTTPError as e:
+                    logger.warning(f"GitHub API | Error | {type(e).__name__}: {e}")
+                    return (
+                        index,
+                        None,
+                        AppException(
+                            400, ErrorCode.GITHUB_API_ERROR, f"GitHub API error: {e}"
+                        ),
+                    )
+                except Exception as e:
+                    logger.exception(f"Batch analysis | Unexpected error | {index}")
+                    return (
+                        index,
+                        None,
+                        AppException(500, ErrorCode.INTERNAL_ERROR, str(e)),
+                    )
+
+            analysis = Analysis(
+                user_id=current_user.id,
+                repo_url=request.repo_url,
+                branch=request.branch,
+                scores=result["scores"],
+                report=result["report"],
+                head_sha=head_sha,
+                commits_compressed=pack_commits(records) if records else None,
+            )
+            return index, analysis, None
+
+        tasks = [
+            asyncio.create_task(analyze_one(i, request))
+            for i, request in enumerate(requests)
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                index, analysis, error = await future
+                if analysis is not None and inspect(analysis).transient:
+                    # idを返す前に保存する（途中で切断されても返した分は残る）
+                    try:
+                        await asyncio.to_thread(
+                            _insert_analysis, session_factory, analysis
+                        )
+                        saved += 1
+                    except Exception as e:
+                        logger.exception(f"Batch analysis | Save failed | {index}")
+                        analysis = None
+                        error = AppException(500, ErrorCode.INTERNAL_ERROR, str(e))
+                yield index, analysis, error
+        finally:
+            # クライアント切断時などに残りのタスクを止める
+            for task in tasks:
+                task.cancel()
+
+    logger.info(f"Batch analysis | Complete | user: {current_user.id} | saved: {saved}")
+
+
+def _builds_on_previous():
+    """
+    差分分析で前回の分析に積み上げた結果か（SQLの条件式）
+    - 前回の分析（_find_previous_analysisと同じ条件）より後に、HEAD SHAを記録した分析
+    - アーカイブには前回以降のcommitしか無いので、それだけで採点し直すと累積のスコアを失う
+    """
+    previous = aliased(Analysis)
+    return and_(
+        Analysis.head_sha.isnot(None),
+        exists().where(
+            previous.user_id == Analysis.user_id,
+            previous.repo_url == Analysis.repo_url,
+            previous.branch == Analysis.branch,
+            previous.head_sha.isnot(None),
+            previous.created_at < Analysis.created_at,
+        ),
+    )
+
+
+async def rescore_analysis(
+    analysis_id: str,
+    session_factory: SessionFactory,
+    user_id: Optional[str] = None,
+) -> Analysis:
+    """
+    保存したcommitのアーカイブをGeminiで分析し直し、スコアとレポートを更新（GitHubは呼ばない）
+    - プロンプトやモデルを変えた後に、過去の分析を同じcommitで採点し直す用
+    - user_idを渡すと、そのユーザーの分析だけを対象にする
+    - 前回の分析に積み上げた差分分析は、アーカイブが差分だけなので分析し直さない（409）
+    """
+    analysis, incremental = await asyncio.to_thread(
+        _load_for_rescore, session_factory, analysis_id, user_id
+    )
+    if analysis is None:
+        raise AppException(404, ErrorCode.ANALYSIS_NOT_FOUND, "Analysis not found")
+    if incremental:
+        raise AppException(
+            409,
+            ErrorCode.INCREMENTAL_RESCORE_UNSUPPORTED,
+            "Incremental analyses built on a previous analysis cannot be rescored",
+        )
+    if analysis.commits_compressed is None:
+        raise AppException(
+            404,
+            ErrorCode.COMMIT_ARCHIVE_NOT_FOUND,
+            "No archived commits for this analysis",
+        )
+
+    parsed_log = format_commit_log(unpack_commits(analysis.commits_compressed))
+    result = await _analyze_log(parsed_log)
+
+    analysis = await asyncio.to_thread(
+        _update_scores, session_factory, analysis_id, result
+    )
+
+    logger.info(f"Analysis | Rescored | id: {analysis.id}")
     return analysis
+
+
+def _load_for_rescore(
+    session_factory: SessionFactory, analysis_id: str, user_id: Optional[str]
+) -> Tuple[Optional[Analysis], bool]:
+    """分析し直す分析をアーカイブごと読み込む（差分分析に積み上げた結果かも返す）"""
+    with session_factory() as db:
+        query = (
+            db.query(Analysis, _builds_on_previous())
+            .options(undefer(Analysis.commits_compressed))
+            .filter(Analysis.id == analysis_id)
+        )
+        if user_id is not None:
+            query = query.filter(Analysis.user_id == user_id)
+        analysis, incremental = query.first() or (None, False)
+        return analysis, incremental
+
+
+def _update_scores(
+    session_factory: SessionFactory, analysis_id: str, result: dict
+) -> Analysis:
+    """分析し直した結果で分析と集計を更新し、切り離したAnalysisを返す"""
+    with session_factory() as db:
+        analysis = db.get(Analysis, analysis_id)
+        if analysis is None:
+            # 分析中に削除された
+            raise AppException(404, ErrorCode.ANALYSIS_NOT_FOUND, "Analysis not found")
+        analysis.scores = result["scores"]
+        analysis.report = result["report"]
+        db.flush()
+        rebuild_rollup_bucket(
+            db,
+            analysis.user_id,
+            analysis.repo_url,
+            analysis.branch,
+            analysis.created_at.date(),
+        )
+        db.commit()
+        _refresh_detached(db, analysis)
+        return analysis
+
+
+def _rescorable_ids(
+    session_factory: SessionFactory,
+    user_id: Optional[str],
+    before: Optional[datetime],
+) -> List[str]:
+    """分析し直せる（アーカイブがあり、差分分析に積み上げていない）分析のID（古い順）"""
+    with session_factory() as db:
+        query = db.query(Analysis.id).filter(
+            Analysis.commits_compressed.isnot(None), ~_builds_on_previous()
+        )
+        if user_id is not None:
+            query = query.filter(Analysis.user_id == user_id)
+        if before is not None:
+            query = query.filter(Analysis.updated_at < before)
+        return [row.id for row in query.order_by(Analysis.created_at)]
+
+
+async def rescore_archived_analyses(
+    session_factory: SessionFactory,
+    user_id: Optional[str] = None,
+    before: Optional[datetime] = None,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, Optional[Analysis], Optional[AppException]]]:
+    """
+    アーカイブのある分析をまとめて分析し直す（モデルの更新時など。GitHubは呼ばない）
+    - beforeを渡すと、それより前に更新された分析だけを対象にする（中断しても続きから再開できる）
+    - 前回の分析に積み上げた差分分析は対象にしない
+    - 最大concurrency件（既定はbatch_max_concurrency）まで並行し、
+      完了した順に (分析ID, Analysis or None, AppException or None) をyield
+    """
+    analysis_ids = await asyncio.to_thread(
+        _rescorable_ids, session_factory, user_id, before
+    )
+
+    logger.info(f"Rescore | Start | count: {len(analysis_ids)}")
+
+    async def rescore_one(analysis_id: str):
+        try:
+            analysis = await rescore_analysis(analysis_id, session_factory)
+        except AppException as e:
+            return analysis_id, None, e
+        return analysis_id, analysis, None
+
+    # 件数が多くてもタスクを作りすぎないよう、concurrency件ずつ補充する
+    limit = concurrency or settings.batch_max_concurrency
+    pending_ids = iter(analysis_ids)
+    running = set()
+    rescored = 0
+    try:
+        while True:
+            for analysis_id in pending_ids:
+                running.add(asyncio.create_task(rescore_one(analysis_id)))
+                if len(running) >= limit:
+                    break
+            if not running:
+                break
+            done, running = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                analysis_id, analysis, error = task.result()
+                rescored += analysis is not None
+                yield analysis_id, analysis, error
+    finally:
+        for task in running:
+            task.cancel()
+
+    logger.info(f"Rescore | Complete | rescored: {rescored}/{len(analysis_ids)}")
@@ -0,0 +1,160 @@
+# app/services/auth_service.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+import httpx
+from jose import jwt
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.exceptions import AppException, ErrorCode
+from app.logger import logger
+from app.models import User
+from app.token_vault import token_vault
+
+# INSERT ... ON CONFLICT DO UPDATE が使えるDB
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+class GitHubOAuthClient:
+    """
+    ログインで使うGitHubへの接続（トークン交換・/user）
+    - httpx.AsyncClientをログイン間で共有し、TLS接続を使い回す（閉じるのはlifespanで）
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(headers={"Accept": "application/json"})
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def exchange_code(self, code: str) -> Optional[str]:
+        """codeをアクセストークンに交換（失敗したらNone）"""
+        response = await self.client.post(
+            f"{settings.github_oauth_base_url}/login/oauth/access_token",
+            data={
+                "client_id": settings.github_client_id,
+                "client_secret": settings.github_client_secret,
+                "code": code,
+            },
+        )
+        return response.json().get("access_token")
+
+    async def fetch_user(self, access_token: str) -> dict:
+        response = await self.client.get(
+            f"{settings.github_api_base_url}/user",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+        return response.json()
+
+
+# アプリ全体で使う接続
+github_oauth = GitHubOAuthClient()
+
+
+def upsert_user(
+    db: Session, github_id: int, github_username: str, access_token: str
+) -> str:
+    """
+    GitHubユーザーを作成、または名前・トークンを更新してユーザーIDを返す
+    - SQLite・PostgreSQLでは INSERT ... ON CONFLICT ... RETURNING の1文で行う
+    - トークンは暗号化して保存する
+    """
+    now = datetime.now(timezone.utc)
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        encrypted = token_vault.encrypt(access_token)
+        statement = insert(User).values(
+            github_id=github_id,
+            github_username=github_username,
+            github_access_token_encrypted=encrypted,
+        )
+        # ON CONFLICT の更新ではonupdateが効かないので、updated_atも明示する
+        statement = statement.on_conflict_do_update(
+            index_elements=[User.github_id],
+            set_={
+                User.github_username: github_username,
+                User.github_access_token_encrypted: encrypted,
+                User.updated_at: now,
+            },
+        ).returning(User.id)
+        return db.execute(statement).scalar_one()
+
+    user = db.query(User).filter(User.github_id == github_id).first()
+    if user is None:
+        user = User(
+            github_id=github_id,
+            github_username=github_username,
+            github_access_token=access_token,
+        )
+        db.add(user)
+    else:
+        user.github_username = github_username
+        user.github_access_token = access_token
+    db.flush()
+    return user.id
+
+
+def issue_jwt(user_id: str) -> str:
+    expire = datetime.now(timezone.utc) + timedelta(days=7)
+    return jwt.encode(
+        {"sub": user_id, "exp": expire}, settings.jwt_secret_key, algorithm="HS256"
+    )
+
+
+def login_user(
+    session_factory: sessionmaker,
+    github_id: int,
+    github_username: str,
+    access_token: str,
+) -> Tuple[str, str]:
+    """
+    ユーザーを保存してJWTを発行し、(ユーザーID, JWT) を返す
+    - 同期処理（DB・署名）なので、イベントループを止めないようスレッドで呼ぶ
+    """
+    with session_factory() as db:
+        user_id = upsert_user(db, github_id, github_username, access_token)
+        db.commit()
+    # 前のトークンを復号したものは捨てる（他のワーカーは暗号文が変わったことで気付く）
+    token_vault.invalidate(user_id)
+    return user_id, issue_jwt(user_id)
+
+
+async def authenticate(code: str, session_factory: sessionmaker) -> Tuple[str, str]:
+    """OAuthのcodeでログインし、(ユーザーID, JWT) を返す"""
+    # /userにはトークンが要るので、GitHubへの2回の呼び出しは順番に行う
+    access_token = await github_oauth.exchange_code(code)
+    if not access_token:
+        logger.warning("Auth | Failed to get access token from GitHub")
+        raise AppException(
+            400, ErrorCode.GITHUB_AUTH_FAILED, "Failed to get access token from GitHub"
+        )
+
+    logger.debug("Auth | GitHub access token obtained")
+
+    github_user = await github_oauth.fetch_user(access_token)
+    github_id = github_user.get("id")
+    github_username = github_user.get("login")
+
+    if not github_id:
+        logger.warning("Auth | Failed to get user info from GitHub")
+        raise AppException(
+            400, ErrorCode.GITHUB_AUTH_FAILED, "Failed to get user info from GitHub"
+        )
+
+    logger.debug(f"Auth | GitHub user: {github_username}")
+    user_id, jwt_token = await asyncio.to_thread(
+        login_user, session_factory, github_id, github_username, access_token
+    )
+    logger.info(f"Auth | User login: {github_username}")
+    return user_id, jwt_token
@@ -0,0 +1,79 @@
+# app/services/commit_archive.py
+import json
+import zlib
+from typing import List
+
+from app.services.commit_detail_reader import PATCH_PREVIEW_CHARS
+
+# 形式を変えたら上げる（古い形式も読めるようにする）
+ARCHIVE_VERSION = 1
+
+# commitごとの列
+COMMIT_COLUMNS = ("sha", "author", "date", "message", "file_count")
+# ファイルごとの列（全commitのファイルを順に並べる。file_countで区切る）
+FILE_COLUMNS = ("filename", "additions", "deletions", "patch")
+
+
+def pack_commits(records: List[dict]) -> bytes:
+    """
+    取得したcommit詳細を、再分析用のアーカイブ（列ごとの配列をzlib圧縮したJSON）にする
+    - format_commit_logが使う項目だけを残す（patchは先頭だけ）
+    - 同じ種類の値が並ぶので、commitごとのJSONより圧縮が効く
+    """
+    columns = {name: [] for name in COMMIT_COLUMNS + FILE_COLUMNS}
+    for record in records:
+        author = record["commit"]["author"]
+        files = record.get("files", [])
+        columns["sha"].append(record["sha"])
+        columns["author"].append(author["name"])
+        columns["date"].append(author["date"])
+        columns["message"].append(record["commit"]["message"])
+        columns["file_count"].append(len(files))
+        for f in files:
+            columns["filename"].append(f.get("filename", ""))
+            columns["additions"].append(f.get("additions", 0))
+            columns["deletions"].append(f.get("deletions", 0))
+            columns["patch"].append((f.get("patch") or "")[:PATCH_PREVIEW_CHARS])
+
+    data = {"version": ARCHIVE_VERSION, **columns}
+    return zlib.compress(
+        json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        level=9,
+    )
+
+
+def unpack_commits(data: bytes) -> List[dict]:
+    """アーカイブをcommit詳細（GitHub APIと同じ形、format_commit_logにそのまま渡せる）に戻す"""
+    columns = json.loads(zlib.decompress(data))
+    if columns.get("version") != ARCHIVE_VERSION:
+        raise ValueError(
+            f"Unsupported commit archive version: {columns.get('version')}"
+        )
+
+    records = []
+    offset = 0
+    for sha, author, date, message, file_count in zip(
+        *(columns[name] for name in COMMIT_COLUMNS)
+    ):
+        files = []
+        for i in range(offset, offset + file_count):
+            file = {
+                "filename": columns["filename"][i],
+                "additions": columns["additions"][i],
+                "deletions": columns["deletions"][i],
+            }
+            if columns["patch"][i]:
+                file["patch"] = columns["patch"][i]
+            files.append(file)
+        offset += file_count
+        records.append(
+            {
+                "sha": sha,
+                "commit": {
+                    "author": {"name": author, "date": date},
+                    "message": message,
+                },
+                "files": files,
+            }
+        )
+    return records
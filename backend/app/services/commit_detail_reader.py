@@ -0,0 +1,185 @@
+# app/services/commit_detail_reader.py
+import codecs
+import json
+from typing import Generator, List, Optional
+
+import httpx
+
+from app.logger import logger
+
+# Geminiに渡すdiffの先頭の文字数（format_commit_logと共通）
+PATCH_PREVIEW_CHARS = 200
+
+# ファイルごとに残す項目
+FILE_KEYS = ("filename", "additions", "deletions")
+
+WHITESPACE = " \t\r\n"
+
+# 読み終えた部分がこれを超えたらバッファから捨てる
+COMPACT_THRESHOLD = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class _Truncated(Exception):
+    """データが途中で終わった（上限で読むのをやめた）"""
+
+
+class CommitDetailReader:
+    """
+    /repos/{owner}/{repo}/commits/{sha} のレスポンスを、届いた分から少しずつ読む
+    - files以外の項目はそのまま、filesは1件ずつ読み、必要な項目とpatchの先頭だけを残す
+    - filesがmax_files件に達したら、それ以上は読まない（done）
+    - 途中で終わっても、そこまでに読めた分を返す（truncated）
+    """
+
+    def __init__(self, max_files: int):
+        self.max_files = max_files
+        self.detail: dict = {}
+        self.files: List[dict] = []
+        self.done = False
+        self.truncated = False
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._parser = self._parse()
+
+    def feed(self, chunk: bytes) -> None:
+        if self.done:
+            return
+        self._buffer += self._text.decode(chunk)
+        self._resume()
+
+    def close(self) -> Optional[dict]:
+        """読むのをやめて結果を返す（sha・commitが読めていなければNone）"""
+        if not self.done:
+            self._buffer += self._text.decode(b"", final=True)
+            self._eof = True
+            self._resume()
+        if "sha" not in self.detail or "commit" not in self.detail:
+            return None
+        return {**self.detail, "files": self.files}
+
+    def _resume(self) -> None:
+        try:
+            next(self._parser)
+        except StopIteration:
+            self.done = True
+        except _Truncated:
+            self.done = True
+            self.truncated = True
+        except json.JSONDecodeError:
+            logger.warning("GitHub API | Malformed commit detail")
+            self.done = True
+            self.truncated = True
+
+    def _need_more(self) -> Generator[None, None, None]:
+        if self._eof:
+            raise _Truncated()
+        yield
+
+    def _skip_whitespace(self) -> Generator[None, None, str]:
+        """空白を飛ばして次の文字を返す（読み進めない）"""
+        while True:
+            while (
+                self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            yield from self._need_more()
+
+    def _expect(self, chars: str) -> Generator[None, None, str]:
+        char = yield from self._skip_whitespace()
+        if char not in chars:
+            raise json.JSONDecodeError(f"Expected {chars!r}", self._buffer, self._pos)
+        self._pos += 1
+        return char
+
+    def _value(self) -> Generator[None, None, object]:
+        """値を1つ読む（最後まで届いていなければ待つ）"""
+        yield from self._skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                yield from self._need_more()
+                continue
+            # 末尾の数値は続きが届くと値が変わるので、区切りが来るまで確定させない
+            if end == len(self._buffer) and not self._eof:
+                yield from self._need_more()
+                continue
+            self._pos = end
+            return value
+
+    def _compact(self) -> None:
+        if self._pos > COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+
+    def _parse(self) -> Generator[None, None, None]:
+        yield from self._expect("{")
+        if (yield from self._skip_whitespace()) == "}":
+            return
+        while True:
+            key = yield from self._value()
+            yield from self._expect(":")
+            if key == "files":
+                yield from self._parse_files()
+                if self.done:
+                    return
+            else:
+                self.detail[key] = yield from self._value()
+            self._compact()
+            if (yield from self._expect(",}")) == "}":
+                return
+
+    def _parse_files(self) -> Generator[None, None, None]:
+        yield from self._expect("[")
+        if (yield from self._skip_whitespace()) == "]":
+            self._pos += 1
+            return
+        while True:
+            file = yield from self._value()
+            self.files.append(self._trim(file))
+            self._compact()
+            if len(self.files) >= self.max_files:
+                # 必要な分は読めた
+                self.done = True
+                self.truncated = True
+                return
+            if (yield from self._expect(",]")) == "]":
+                return
+
+    @staticmethod
+    def _trim(file: dict) -> dict:
+        trimmed = {key: file[key] for key in FILE_KEYS if key in file}
+        patch = file.get("patch")
+        if patch:
+            trimmed["patch"] = patch[:PATCH_PREVIEW_CHARS]
+        return trimmed
+
+
+async def read_commit_detail(
+    response: httpx.Response, max_bytes: int, max_files: int
+) -> Optional[dict]:
+    """
+    ストリーミングのレスポンスからcommit詳細を読む
+    - max_bytesバイト、またはfilesがmax_files件に達したら読むのをやめる
+    """
+    reader = CommitDetailReader(max_files)
+    received = 0
+    async for chunk in response.aiter_bytes():
+        chunk = chunk[: max_bytes - received]
+        received += len(chunk)
+        reader.feed(chunk)
+        if reader.done or received >= max_bytes:
+            break
+    detail = reader.close()
+    if reader.truncated:
+        logger.info(
+            f"GitHub API | Commit detail truncated | {received} bytes | "
+            f"{len(reader.files)} files"
+        )
+    return detail
@@ -0,0 +1,66 @@
+# app/services/commit_filter.py
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.schemas import AnalysisRequest
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@dataclass(frozen=True)
+class CommitFilter:
+    """
+    取得するcommitの絞り込み（期間・作者・パス）
+    - REST APIでは一覧のクエリパラメータ、gitではgit logのオプションにする
+    - authorはREST APIではGitHubのログイン名かメールアドレス、gitでは名前かメールアドレスの部分一致
+    """
+
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    author: Optional[str] = None
+    path: Optional[str] = None
+
+    @classmethod
+    def from_request(cls, request: AnalysisRequest) -> "CommitFilter":
+        return cls(
+            since=request.since,
+            until=request.until,
+            author=request.author,
+            path=request.path,
+        )
+
+    def __bool__(self) -> bool:
+        return any(
+            value is not None
+            for value in (self.since, self.until, self.author, self.path)
+        )
+
+    def api_params(self) -> dict:
+        """/repos/{owner}/{repo}/commits のクエリパラメータ"""
+        params = {}
+        if self.since is not None:
+            params["since"] = _iso(self.since)
+        if self.until is not None:
+            params["until"] = _iso(self.until)
+        if self.author is not None:
+            params["author"] = self.author
+        if self.path is not None:
+            params["path"] = self.path
+        return params
+
+    def git_log_args(self) -> List[str]:
+        """git logのオプション（パスは最後に -- の後ろに付ける）"""
+        args = []
+        if self.since is not None:
+            args.append(f"--since={_iso(self.since)}")
+        if self.until is not None:
+            args.append(f"--until={_iso(self.until)}")
+        if self.author is not None:
+            # 正規表現として解釈させない
+            args += ["--fixed-strings", f"--author={self.author}"]
+        if self.path is not None:
+            args += ["--", self.path]
+        return args
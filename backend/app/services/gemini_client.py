@@ -1,69 +1,83 @@
 # app/services/gemini_client.py
-from google import genai
-from google.genai import types
 import json
+import re
+from typing import Annotated, AsyncIterator, Optional
+
+from pydantic import AfterValidator, Field, TypeAdapter, ValidationError
 
 from app.config import settings
+from app.logger import logger
+from app.schemas import AnalysisData, Scores
+from app.services.llm_backends import create_llm_backend
+from app.services.resilience import CircuitBreaker, ResilientCaller
+
+
+# 呼び出し先（LLM_BACKEND）と、タイムアウト・再試行・ヘッジ・サーキットブレーカー
+llm_backend = create_llm_backend(settings.llm_backend)
+gemini_caller = ResilientCaller(
+    "Gemini API",
+    timeout=settings.gemini_timeout_seconds,
+    max_retries=settings.gemini_max_retries,
+    base_delay=settings.gemini_retry_base_delay,
+    max_delay=settings.gemini_retry_max_delay,
+    breaker=CircuitBreaker(
+        settings.gemini_circuit_failure_threshold,
+        settings.gemini_circuit_reset_seconds,
+    ),
+    hedge=settings.gemini_hedge_enabled,
+    hedge_min_samples=settings.gemini_hedge_min_samples,
+)
 
 
-client = genai.Client(api_key=settings.gemini_api_key)
-
-
-def analyze_commits(parsed_log: str) -> dict:
-    """Geminiにgit logを渡してスコアとレポートを取得"""
-
-    # JSONスキーマを定義
-    schema = {
-        "type": "object",
-        "properties": {
-            "scores": {
-                "type": "object",
-                "properties": {
-                    "test": {"type": "integer"},
-                    "comment": {"type": "integer"},
-                    "commit_size": {"type": "integer"},
-                    "commit_frequency": {"type": "integer"},
-                    "commit_message": {"type": "integer"},
-                    "activity": {"type": "integer"},
-                },
-                "required": [
-                    "test",
-                    "comment",
-                    "commit_size",
-                    "commit_frequency",
-                    "commit_message",
-                    "activity",
-                ],
+# JSONスキーマを定義
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scores": {
+            "type": "object",
+            "properties": {
+                "test": {"type": "integer"},
+                "comment": {"type": "integer"},
+                "commit_size": {"type": "integer"},
+                "commit_frequency": {"type": "integer"},
+                "commit_message": {"type": "integer"},
+                "activity": {"type": "integer"},
             },
-            "report": {
-                "type": "object",
-                "properties": {
-                    "test": {"type": "string"},
-                    "comment": {"type": "string"},
-                    "commit_size": {"type": "string"},
-                    "commit_frequency": {"type": "string"},
-                    "commit_message": {"type": "string"},
-                    "activity": {"type": "string"},
-                },
-                "required": [
-                    "test",
-                    "comment",
-                    "commit_size",
-                    "commit_frequency",
-                    "commit_message",
-                    "activity",
-                ],
+            "required": [
+                "test",
+                "comment",
+                "commit_size",
+                "commit_frequency",
+                "commit_message",
+                "activity",
+            ],
+        },
+        "report": {
+            "type": "object",
+            "properties": {
+                "test": {"type": "string"},
+                "comment": {"type": "string"},
+                "commit_size": {"type": "string"},
+                "commit_frequency": {"type": "string"},
+                "commit_message": {"type": "string"},
+                "activity": {"type": "string"},
             },
+            "required": [
+                "test",
+                "comment",
+                "commit_size",
+                "commit_frequency",
+                "commit_message",
+                "activity",
+            ],
         },
-        "required": ["scores", "report"],
-    }
-
-    prompt = f"""
-以下のgit logを分析して、開発者の評価をしてください。
+    },
+    "required": ["scores", "report"],
+}
 
-【git log】
-{parsed_log}
 
+# 呼び出しによらない固定の指示（呼び出しごとに変わるプロンプトより前に置く）
+SYSTEM_INSTRUCTION = """
 【評価項目（各0〜100点）】
 - test: テストコードの有無・割合
 - comment: コメントの質・量
@@ -73,15 +87,147 @@ def analyze_commits(parsed_log: str) -> dict:
 - activity: 稼働の安定性
 """
 
-    response = client.models.generate_content(
-        model=settings.gemini_model,
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema=schema,
-        ),
+
+def build_prompt(parsed_log: str, previous_scores: Optional[dict] = None) -> str:
+    """git logからGeminiに渡すプロンプト（呼び出しごとに変わる部分）を組み立てる"""
+    if previous_scores is None:
+        return f"""
+以下のgit logを分析して、開発者の評価をしてください。
+
+【git log】
+{parsed_log}
+"""
+
+    # 差分分析：前回のスコアを基準に、追加されたcommitだけを見て更新させる
+    return f"""
+以下は前回の分析以降に追加されたgit logです。
+前回のスコアを基準に、追加されたcommitを踏まえて更新したスコアとレポートを返してください。
+
+【前回のスコア】
+{json.dumps(previous_scores, ensure_ascii=False)}
+
+【追加されたgit log】
+{parsed_log}
+"""
+
+
+def _clamp_score(value: float) -> int:
+    """範囲外のスコアは0〜100に収める（小数は四捨五入）"""
+    return min(100, max(0, round(value)))
+
+
+Score = Annotated[float, Field(allow_inf_nan=False), AfterValidator(_clamp_score)]
+
+
+class LLMScores(Scores):
+    """LLMが返すスコア（範囲外・小数を許し、保存する形に直す）"""
+
+    test: Score
+    comment: Score
+    commit_size: Score
+    commit_frequency: Score
+    commit_message: Score
+    activity: Score
+
+
+class LLMResult(AnalysisData):
+    scores: LLMScores
+
+
+# JSONの解析と検証を1回で行う（pydantic-coreで組み立て済み）
+_result_adapter = TypeAdapter(LLMResult)
+
+# ```json ... ``` で囲まれた出力
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+class InvalidOutputError(ValueError):
+    """LLMの出力がスキーマに合わない"""
+
+
+def _repair(text: str) -> str:
+    """よくある崩れ（コードブロック・前後の余計な文）を取り除く"""
+    match = _CODE_FENCE.match(text)
+    if match:
+        text = match.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    return text[start : end + 1] if 0 <= start < end else text
+
+
+def _describe(e: ValidationError) -> str:
+    error = e.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+def parse_result(text: str) -> dict:
+    """
+    LLMの出力を検証して、保存する形（scores・reportのdict）にする
+    - スコアは0〜100の整数に収める
+    - 崩れたJSONは1回だけ修復を試みる
+    """
+    try:
+        return _result_adapter.validate_json(text).model_dump()
+    except ValidationError as e:
+        error = e
+    repaired = _repair(text)
+    if repaired != text:
+        try:
+            return _result_adapter.validate_json(repaired).model_dump()
+        except ValidationError:
+            pass
+    raise InvalidOutputError(f"Invalid LLM output: {_describe(error)}") from error
+
+
+async def _generate(prompt: str) -> str:
+    return await gemini_caller.call(
+        lambda: llm_backend.generate(
+            prompt, RESPONSE_SCHEMA, system_instruction=SYSTEM_INSTRUCTION
+        )
     )
 
-    result = json.loads(response.text)
 
-    return result
+async def _validated_result(prompt: str, text: str) -> dict:
+    """出力を検証し、だめなら最大GEMINI_OUTPUT_RETRIES回まで生成し直す"""
+    retries = settings.gemini_output_retries
+    for attempt in range(retries + 1):
+        try:
+            return parse_result(text)
+        except InvalidOutputError as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"Gemini API | {e} | regenerating ({attempt + 1}/{retries})")
+        text = await _generate(prompt)
+
+
+async def analyze_commits(
+    parsed_log: str, previous_scores: Optional[dict] = None
+) -> dict:
+    """
+    Geminiにgit logを渡してスコアとレポートを取得（検証済み）
+    - previous_scoresを渡すと、前回スコアからの差分分析になる
+    """
+    prompt = build_prompt(parsed_log, previous_scores)
+    return await _validated_result(prompt, await _generate(prompt))
+
+
+async def validate_streamed_result(
+    text: str, parsed_log: str, previous_scores: Optional[dict] = None
+) -> dict:
+    """ストリーミングで受け取った出力を検証する（だめならストリーミングなしで生成し直す）"""
+    prompt = build_prompt(parsed_log, previous_scores)
+    return await _validated_result(prompt, text)
+
+
+async def stream_analyze_commits(
+    parsed_log: str, previous_scores: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """GeminiのストリーミングAPIで生成途中のテキストを順にyield"""
+    prompt = build_prompt(parsed_log, previous_scores)
+
+    async for text in gemini_caller.stream(
+        lambda: llm_backend.stream(
+            prompt, RESPONSE_SCHEMA, system_instruction=SYSTEM_INSTRUCTION
+        )
+    ):
+        yield text
@@ -0,0 +1,300 @@
+# app/services/git_fetcher.py
+import asyncio
+import base64
+import hashlib
+import os
+import shutil
+import socket
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.exceptions import AppException, ErrorCode
+from app.logger import logger
+from app.services.commit_filter import CommitFilter
+from app.shared_state import PROCESS_ID, shared_lock, shared_state
+
+# git logの区切り（commitの先頭 / ヘッダー項目）
+_RECORD_SEP = "\x1e"
+_FIELD_SEP = "\x1f"
+_LOG_FORMAT = "%x1e%H%x1f%an%x1f%ad%x1f%B%x1f"
+# GitHub APIのcommit.author.dateと同じUTCのISO 8601形式
+_DATE_FORMAT = "format-local:%Y-%m-%dT%H:%M:%SZ"
+# 最終利用日時の記録用（LRUの判定に使う）
+_LAST_USED_FILE = "analyzer-last-used"
+# 削除時のロックの持ち主（同じプロセスのfetchとも排他にするため、PROCESS_IDとは分ける）
+_EVICT_OWNER = f"{PROCESS_ID}:evict"
+
+
+def _clone_url(repo_url: str) -> str:
+    """repo_urlからclone用のURL（GitHub以外はそのまま。テストのfile://など）"""
+    if repo_url.startswith("https://github.com/"):
+        return repo_url.rstrip("/") + ".git"
+    return repo_url
+
+
+def _auth_config(url: str, access_token: str) -> List[str]:
+    """
+    HTTPS用の認証ヘッダー（コマンドごとに渡し、configやURLには残さない）
+    """
+    if not url.startswith("https://") or not access_token:
+        return []
+    credentials = base64.b64encode(f"x-access-token:{access_token}".encode()).decode()
+    return ["-c", f"http.extraHeader=Authorization: Basic {credentials}"]
+
+
+async def _run_git(*args: str, cwd: Optional[Path] = None) -> str:
+    """gitを実行して標準出力を返す（失敗したらGITHUB_API_ERROR）"""
+    process = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        # 認証プロンプトで止まらないようにし、日付はUTCで出す
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0", "TZ": "UTC"},
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(), timeout=settings.git_timeout_seconds
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise AppException(400, ErrorCode.GITHUB_API_ERROR, "git command timed out")
+
+    if process.returncode != 0:
+        message = stderr.decode("utf-8", "replace").strip().splitlines()
+        error_msg = message[-1] if message else f"exit code {process.returncode}"
+        logger.warning(f"git | Error | {args[0]} | {error_msg}")
+        raise AppException(400, ErrorCode.GITHUB_API_ERROR, f"git error: {error_msg}")
+
+    return stdout.decode("utf-8", "replace")
+
+
+def parse_git_log(output: str) -> List[dict]:
+    """
+    git log --numstat -p の出力をGitHub APIのcommit詳細と同じ形に変換
+    - format_commit_log にそのまま渡せる
+    """
+    details = []
+    for record in output.split(_RECORD_SEP)[1:]:
+        sha, author, date, message, body = record.split(_FIELD_SEP, 4)
+
+        numstat, _, patch_text = body.partition("\ndiff --git ")
+        files = []
+        for line in numstat.strip().splitlines():
+            additions, deletions, filename = line.split("\t", 2)
+            files.append(
+                {
+                    "filename": filename,
+                    # バイナリは "-"（GitHub APIでは0）
+                    "additions": int(additions) if additions.isdigit() else 0,
+                    "deletions": int(deletions) if deletions.isdigit() else 0,
+                }
+            )
+
+        # numstatとpatchは同じ順で並ぶ。patchは最初の@@以降（GitHub APIのpatchと同じ）
+        patches = patch_text.split("\ndiff --git ") if patch_text else []
+        for file, section in zip(files, patches):
+            hunk_start = section.find("\n@@")
+            if hunk_start != -1:
+                file["patch"] = section[hunk_start + 1 :].rstrip("\n")
+
+        details.append(
+            {
+                "sha": sha,
+                "commit": {
+                    "author": {"name": author, "date": date},
+                    "message": message.strip("\n"),
+                },
+                "files": files,
+            }
+        )
+    return details
+
+
+class GitRepoCache:
+    """
+    bare cloneのディスクキャッシュ
+    - リポジトリごとに1つのbareリポジトリを持ち、必要な深さだけshallow fetchする
+    - commit・numstat・patchはローカルのpackfileからgit logで読む
+    - 合計サイズがmax_bytesを超えたら、最後に使ってから長いものから削除（LRU）
+      サイズの集計・削除はディスクI/Oなので、イベントループを止めないようスレッドで行う
+    - 同じホストの複数ワーカーが同じcloneを同時に触らないよう、共有ロックも取る
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._locks: Dict[Path, asyncio.Lock] = {}
+        # 削除の走査は同時に1つだけ（fetchのたびにスレッドを積まない）
+        self._evicting = threading.Lock()
+
+    @staticmethod
+    def _lock_key(path: Path) -> str:
+        # cloneはホストのローカルディスクにあるので、ロックもホスト単位
+        return f"git:{socket.gethostname()}:{path}"
+
+    def repo_dir(self, url: str) -> Path:
+        owner_repo = "__".join(url.rstrip("/").removesuffix(".git").split("/")[-2:])
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+        return self.root / f"{owner_repo}-{digest}.git"
+
+    async def fetch_commits(
+        self,
+        repo_url: str,
+        ref: str,
+        limit: int,
+        access_token: str,
+        base_sha: Optional[str] = None,
+        commit_filter: Optional[CommitFilter] = None,
+    ) -> List[dict]:
+        """
+        refの先頭からlimit件（base_shaがあればそれ以降だけ）のcommit詳細を新しい順に返す
+        - commit_filterがあれば、sinceより後（無ければgit_filter_depth件まで）を取得して絞り込む
+        """
+        commit_filter = commit_filter or CommitFilter()
+        url = _clone_url(repo_url)
+        path = self.repo_dir(url)
+        lock = self._locks.setdefault(path, asyncio.Lock())
+
+        timeout = settings.git_timeout_seconds
+        async with (
+            lock,
+            shared_lock(
+                self._lock_key(path), PROCESS_ID, ttl=timeout * 3, timeout=timeout
+            ),
+        ):
+            if not path.exists():
+                self.root.mkdir(parents=True, exist_ok=True)
+                try:
+                    await _run_git("init", "--quiet", "--bare", str(path))
+                    await _run_git("remote", "add", "origin", url, cwd=path)
+                except AppException:
+                    # 作りかけのリポジトリを残さない
+                    shutil.rmtree(path, ignore_errors=True)
+                    raise
+
+            if commit_filter.since is not None:
+                depth = f"--shallow-since={commit_filter.since.isoformat()}"
+            elif commit_filter:
+                # 作者・パスで絞るとlimit件より深くさかのぼる必要がある
+                depth = f"--depth={max(limit + 1, settings.git_filter_depth)}"
+            else:
+                # 最古のcommitの差分も出せるよう、親を1つ余分に取得する
+                depth = f"--depth={limit + 1}"
+            await _run_git(
+                *_auth_config(url, access_token),
+                "fetch",
+                "--quiet",
+                "--no-tags",
+                depth,
+                # refをオプションとして解釈させない
+                "--end-of-options",
+                "origin",
+                ref,
+                cwd=path,
+            )
+
+            revision = "FETCH_HEAD"
+            if base_sha and await self._has_commit(path, base_sha):
+                revision = f"{base_sha}..FETCH_HEAD"
+
+            output = await _run_git(
+                "-c",
+                "core.quotePath=false",
+                # パスをpathspecの記法として解釈させない
+                "--literal-pathspecs",
+                "log",
+                f"--max-count={limit}",
+                "--no-color",
+                "--no-ext-diff",
+                "--no-renames",
+                "--diff-merges=first-parent",
+                f"--format={_LOG_FORMAT}",
+                f"--date={_DATE_FORMAT}",
+                "--numstat",
+                "--patch",
+                revision,
+                *commit_filter.git_log_args(),
+                cwd=path,
+            )
+            (path / _LAST_USED_FILE).touch()
+
+        await asyncio.to_thread(self.evict, keep=path)
+        return parse_git_log(output)
+
+    async def _has_commit(self, path: Path, sha: str) -> bool:
+        try:
+            await _run_git("cat-file", "-e", f"{sha}^{{commit}}", cwd=path)
+        except AppException:
+            return False
+        return True
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """キャッシュ内のリポジトリ（最終利用日時, バイト数, パス）"""
+        entries = []
+        if not self.root.exists():
+            return entries
+        for path in self.root.iterdir():
+            if not path.is_dir():
+                continue
+            size = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+            marker = path / _LAST_USED_FILE
+            last_used = marker.stat().st_mtime if marker.exists() else 0.0
+            entries.append((last_used, size, path))
+        return entries
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """ディスク予算を超えていれば古いものから削除（使用中のkeepは残す）"""
+        if not self._evicting.acquire(blocking=False):
+            return
+        try:
+            self._evict(keep)
+        finally:
+            self._evicting.release()
+
+    def _evict(self, keep: Optional[Path]) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep or (path in self._locks and self._locks[path].locked()):
+                continue
+            # 使用中なら飛ばす（スレッドで動くので、ローカルのロックの確認だけでは足りない）
+            # asyncio.Lockはfetch中のものと入れ替わらないよう残す
+            key = self._lock_key(path)
+            if not shared_state.acquire_lock(
+                key, _EVICT_OWNER, settings.git_timeout_seconds
+            ):
+                continue
+            try:
+                logger.info(f"git | Evict clone | {path.name} | {size} bytes")
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+            finally:
+                shared_state.release_lock(key, _EVICT_OWNER)
+
+
+async def fetch_head_sha_via_git(repo_url: str, branch: str, access_token: str) -> str:
+    """ls-remoteでブランチ先頭のSHAを取得（cloneは不要）"""
+    url = _clone_url(repo_url)
+    output = await _run_git(
+        *_auth_config(url, access_token),
+        "ls-remote",
+        "--end-of-options",
+        url,
+        f"refs/heads/{branch}",
+    )
+    if not output.strip():
+        raise AppException(
+            400, ErrorCode.GITHUB_API_ERROR, f"git error: branch not found: {branch}"
+        )
+    return output.split()[0]
+
+
+# アプリ全体で共有するキャッシュ
+repo_cache = GitRepoCache(settings.git_cache_dir, settings.git_cache_max_bytes)
@@ -0,0 +1,109 @@
+# app/services/github_client.py
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from app.config import settings
+from app.exceptions import AppException, ErrorCode
+from app.logger import logger
+from app.shared_state import shared_state
+
+
+class GitHubClient:
+    """
+    GitHub APIクライアント
+    - 1つのhttpx.AsyncClientを複数リポジトリの取得で共有
+    - 同時リクエスト数とレート制限の残量も共有する
+    - レート制限を使い切ったことは共有の保存先にも記録し、他のワーカーも待たせる
+    """
+
+    def __init__(self, access_token: str, max_concurrency: Optional[int] = None):
+        token_hash = hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:16]
+        self._exhausted_key = f"github:rate_limit_exhausted:{token_hash}"
+        self._client = httpx.AsyncClient(
+            base_url=settings.github_api_base_url,
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Accept": "application/vnd.github.v3+json",
+            },
+        )
+        self._semaphore = asyncio.Semaphore(
+            max_concurrency or settings.github_max_concurrency
+        )
+        # GitHubが返すX-RateLimit-Remaining（未取得ならNone）
+        # 他のワーカーが使い切っていればリセットまで0として扱う（最初のリクエストの前に確認）
+        self.rate_limit_remaining: Optional[int] = None
+        self._shared_checked = False
+
+    async def get(
+        self,
+        path: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+    ) -> httpx.Response:
+        """レート制限の残量を確認してからGETする"""
+        await self._check_rate_limit()
+
+        async with self._semaphore:
+            response = await self._client.get(path, params=params, headers=headers)
+
+        await self._record_rate_limit(response)
+        return response
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        path: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        getのストリーミング版（ボディは読まずに渡す。大きなレスポンスを途中まで読む用）
+        - ボディを読み終えるまで同時リクエスト数の枠を持つ
+        """
+        await self._check_rate_limit()
+
+        async with self._semaphore:
+            async with self._client.stream(
+                "GET", path, params=params, headers=headers
+            ) as response:
+                await self._record_rate_limit(response)
+                yield response
+
+    async def _check_rate_limit(self) -> None:
+        if not self._shared_checked:
+            self._shared_checked = True
+            if await shared_state.aget(self._exhausted_key) is not None:
+                self.rate_limit_remaining = 0
+        if self.rate_limit_remaining is not None and self.rate_limit_remaining <= 0:
+            logger.warning("GitHub API | Rate limit exhausted")
+            raise AppException(
+                429, ErrorCode.GITHUB_API_ERROR, "GitHub API rate limit exceeded"
+            )
+
+    async def _record_rate_limit(self, response: httpx.Response) -> None:
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.isdigit():
+            self.rate_limit_remaining = int(remaining)
+            if self.rate_limit_remaining <= 0:
+                await self._mark_exhausted(response.headers.get("X-RateLimit-Reset"))
+
+    async def _mark_exhausted(self, reset: Optional[str]) -> None:
+        """リセット時刻（UNIX秒）まで使い切ったことを共有する"""
+        ttl = 60.0
+        if reset is not None and reset.isdigit():
+            ttl = max(1.0, int(reset) - time.time())
+        await shared_state.aset(self._exhausted_key, b"1", ttl=ttl)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "GitHubClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -0,0 +1,193 @@
+# app/services/llm_backends.py
+import abc
+import asyncio
+import hashlib
+import json
+import time
+from typing import AsyncIterator, List, Optional
+
+from google import genai
+from google.genai import types
+
+from app.config import settings
+from app.models.analysis import SCORE_KEYS
+
+
+class TokenUsage:
+    """
+    LLM呼び出しのトークン数と、最初のトークンまでの時間の集計（ワーカーごと）
+    - cached_tokensはGemini側のキャッシュから読まれたと報告された入力トークン（割引料金になる分）
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.first_token_count = 0
+        self.first_token_seconds = 0.0
+
+    def record(self, usage) -> None:
+        self.calls += 1
+        if usage is None:
+            return
+        self.prompt_tokens += usage.prompt_token_count or 0
+        self.cached_tokens += usage.cached_content_token_count or 0
+        self.output_tokens += usage.candidates_token_count or 0
+
+    def record_first_token(self, seconds: float) -> None:
+        self.first_token_count += 1
+        self.first_token_seconds += seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4)
+            if self.prompt_tokens
+            else 0.0,
+            "avg_first_token_ms": round(
+                self.first_token_seconds / self.first_token_count * 1000, 2
+            )
+            if self.first_token_count
+            else None,
+        }
+
+
+# アプリ全体の集計（GET /admin/llm-usage）
+llm_usage = TokenUsage()
+
+
+class LLMBackend(abc.ABC):
+    """
+    分析に使うLLMの呼び出し先
+    - gemini: Gemini API
+    - stub:   オフライン用のスタブ（テスト・ベンチマーク・ローカル開発）
+    """
+
+    @abc.abstractmethod
+    async def generate(
+        self, prompt: str, schema: dict, system_instruction: Optional[str] = None
+    ) -> str:
+        """JSONの文字列を返す（system_instructionは呼び出しによらない固定の指示）"""
+
+    @abc.abstractmethod
+    def stream(
+        self, prompt: str, schema: dict, system_instruction: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """生成途中のテキストを順にyield（async generatorで実装する）"""
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Gemini API
+    - 固定の指示はsystem_instructionとして、呼び出しごとに変わるプロンプトより前に置く
+    """
+
+    def __init__(self, client: Optional[genai.Client] = None):
+        self.client = client or genai.Client(api_key=settings.gemini_api_key)
+
+    @staticmethod
+    def _config(
+        schema: dict, system_instruction: Optional[str]
+    ) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+            system_instruction=system_instruction,
+        )
+
+    async def generate(
+        self, prompt: str, schema: dict, system_instruction: Optional[str] = None
+    ) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=settings.gemini_model,
+            contents=prompt,
+            config=self._config(schema, system_instruction),
+        )
+        llm_usage.record(response.usage_metadata)
+        return response.text
+
+    async def stream(
+        self, prompt: str, schema: dict, system_instruction: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        stream = await self.client.aio.models.generate_content_stream(
+            model=settings.gemini_model,
+            contents=prompt,
+            config=self._config(schema, system_instruction),
+        )
+        usage = None
+        first = True
+        async for chunk in stream:
+            if first:
+                llm_usage.record_first_token(time.perf_counter() - start)
+                first = False
+            # 使用量は最後のチャンクに入る
+            usage = chunk.usage_metadata or usage
+            if chunk.text:
+                yield chunk.text
+        llm_usage.record(usage)
+
+
+class StubBackend(LLMBackend):
+    """
+    ネットワークを使わないスタブ
+    - プロンプトのハッシュから決まったスコアを返す（同じ入力なら同じ結果）
+    - delays / errors で呼び出しごとの遅延・例外を指定できる（障害の再現用）
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        delays: Optional[List[float]] = None,
+        errors: Optional[List[Optional[Exception]]] = None,
+    ):
+        self.latency = latency
+        self.delays = list(delays or [])
+        self.errors = list(errors or [])
+        self.calls = 0
+
+    @staticmethod
+    def result_for(prompt: str) -> dict:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return {
+            "scores": {key: digest[i] * 100 // 255 for i, key in enumerate(SCORE_KEYS)},
+            "report": {key: f"{key}: スタブによる評価です。" for key in SCORE_KEYS},
+        }
+
+    async def _next_call(self) -> None:
+        self.calls += 1
+        delay = self.delays.pop(0) if self.delays else self.latency
+        error = self.errors.pop(0) if self.errors else None
+        if delay:
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+
+    async def generate(
+        self, prompt: str, schema: dict, system_instruction: Optional[str] = None
+    ) -> str:
+        await self._next_call()
+        return json.dumps(self.result_for(prompt), ensure_ascii=False)
+
+    async def stream(
+        self, prompt: str, schema: dict, system_instruction: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        await self._next_call()
+        text = json.dumps(self.result_for(prompt), ensure_ascii=False)
+        for i in range(0, len(text), 64):
+            yield text[i : i + 64]
+
+
+def create_llm_backend(name: str) -> LLMBackend:
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "stub":
+        return StubBackend(latency=settings.llm_stub_latency_seconds)
+    raise ValueError(f"Unknown LLM backend: {name}")
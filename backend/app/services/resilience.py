@@ -0,0 +1,240 @@
+# app/services/resilience.py
+import asyncio
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple, TypeVar
+
+import httpx
+from google.genai import errors as genai_errors
+
+from app.logger import logger
+
+T = TypeVar("T")
+
+# 一時的な障害とみなすHTTPステータス
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いている（呼び出し先が劣化中なので即座に失敗させる）"""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """再試行すれば成功しうる例外か（タイムアウト・通信エラー・429/5xx）"""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code in RETRYABLE_STATUS
+    return False
+
+
+class CircuitBreaker:
+    """
+    連続失敗がfailure_threshold回に達したら開き、reset_timeout秒は即座に失敗させる
+    - 時間が経ったら半開状態にして1回だけ試し、成功したら閉じる・失敗したら再び開く
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            if self.clock() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("circuit is open")
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                raise CircuitOpenError("circuit is half-open")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """状態は変えずに半開の試行枠だけ返す（結果が成否の判断材料にならなかった呼び出し用）"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit breaker | Open | failures: {self.failures}")
+            self.state = "open"
+            self.opened_at = self.clock()
+        self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """直近の成功した呼び出しの所要時間（ヘッジを出す閾値の算出用）"""
+
+    def __init__(self, window: int = 100):
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class ResilientCaller:
+    """
+    外部APIの呼び出しにタイムアウト・再試行・ヘッジ・サーキットブレーカーをかける
+    - 再試行は一時的な障害（is_retryable）だけ、指数バックオフ＋ジッターで待つ
+    - hedge=Trueなら、p95を過ぎても返らない呼び出しと並行してもう1本出し、先に返った方を使う
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        breaker: CircuitBreaker,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2**attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _retry(self, attempt_fn: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            try:
+                result = await attempt_fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    # 入力起因のエラーは呼び出し先の劣化でも回復でもない
+                    self.breaker.release_trial()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"{self.name} | Retry {attempt + 1}/{self.max_retries} "
+                    f"in {delay:.2f}s | {type(e).__name__}: {e}"
+                )
+                await asyncio.sleep(delay)
+            except BaseException:
+                # キャンセル等で結果が出なかった試行も枠は返す（半開のまま詰まらないように）
+                self.breaker.release_trial()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        return await self._retry(lambda: self._attempt(fn))
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        hedge_after = (
+            self.latency.percentile(0.95, self.hedge_min_samples)
+            if self.hedge
+            else None
+        )
+        if hedge_after is None:
+            result = await asyncio.wait_for(fn(), self.timeout)
+        else:
+            result = await self._hedged(fn, start, hedge_after)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    async def _hedged(
+        self, fn: Callable[[], Awaitable[T]], start: float, hedge_after: float
+    ) -> T:
+        deadline = start + self.timeout
+        primary = asyncio.ensure_future(fn())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=min(hedge_after, self.timeout))
+            if not done:
+                logger.info(f"{self.name} | Hedge | after {hedge_after:.2f}s")
+                tasks.add(asyncio.ensure_future(fn()))
+
+            error: Optional[BaseException] = None
+            pending = tasks
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            if error is not None and not pending:
+                raise error
+            raise asyncio.TimeoutError()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream(
+        self, open_stream: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """
+        ストリーミング版（再試行は最初のチャンクが届くまで。以降はチャンク間のタイムアウトのみ）
+        """
+
+        async def first_chunk() -> Tuple[AsyncIterator[str], Optional[str]]:
+            iterator = open_stream()
+            try:
+                first = await asyncio.wait_for(anext(iterator), self.timeout)
+            except StopAsyncIteration:
+                return iterator, None
+            except BaseException:
+                await iterator.aclose()
+                raise
+            return iterator, first
+
+        iterator, first = await self._retry(first_chunk)
+        if first is None:
+            return
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(anext(iterator), self.timeout)
+                except StopAsyncIteration:
+                    break
+                except Exception as e:
+                    if is_retryable(e):
+                        self.breaker.record_failure()
+                    raise
+                yield chunk
+        finally:
+            await iterator.aclose()
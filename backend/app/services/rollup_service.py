@@ -0,0 +1,196 @@
+# app/services/rollup_service.py
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Literal, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import Analysis, ScoreRollup
+from app.models.analysis import SCORE_KEYS
+
+Bucket = Literal["day", "week", "month"]
+
+
+def _bucket_start(day: date, bucket: Bucket) -> date:
+    """日付を集計単位の先頭日に丸める（週は月曜始まり）"""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _apply_scores(rollup: ScoreRollup, scores: dict) -> None:
+    """1件分のスコアを集計行に加算"""
+    rollup.count = (rollup.count or 0) + 1
+    for key in SCORE_KEYS:
+        value = scores[key]
+        setattr(rollup, f"{key}_sum", (getattr(rollup, f"{key}_sum") or 0) + value)
+        current_min = getattr(rollup, f"{key}_min")
+        current_max = getattr(rollup, f"{key}_max")
+        setattr(
+            rollup,
+            f"{key}_min",
+            value if current_min is None else min(current_min, value),
+        )
+        setattr(
+            rollup,
+            f"{key}_max",
+            value if current_max is None else max(current_max, value),
+        )
+
+
+def _find_rollup(
+    db: Session, user_id: str, repo_url: str, branch: str, bucket_date: date
+) -> Optional[ScoreRollup]:
+    return (
+        db.query(ScoreRollup)
+        .filter(
+            ScoreRollup.user_id == user_id,
+            ScoreRollup.repo_url == repo_url,
+            ScoreRollup.branch == branch,
+            ScoreRollup.bucket_date == bucket_date,
+        )
+        .with_for_update()
+        .first()
+    )
+
+
+def add_to_rollup(db: Session, analysis: Analysis) -> None:
+    """
+    保存する分析のスコアを日次集計に加算（commitは呼び出し側）
+    """
+    bucket_date = analysis.created_at.date()
+    rollup = _find_rollup(
+        db, analysis.user_id, analysis.repo_url, analysis.branch, bucket_date
+    )
+
+    if rollup is None:
+        rollup = ScoreRollup(
+            user_id=analysis.user_id,
+            repo_url=analysis.repo_url,
+            branch=analysis.branch,
+            bucket_date=bucket_date,
+        )
+        _apply_scores(rollup, analysis.scores)
+        try:
+            # 同じ日の集計行が並行して作られた場合に備えてSAVEPOINTで試す
+            with db.begin_nested():
+                db.add(rollup)
+            return
+        except IntegrityError:
+            rollup = _find_rollup(
+                db, analysis.user_id, analysis.repo_url, analysis.branch, bucket_date
+            )
+
+    _apply_scores(rollup, analysis.scores)
+
+
+def rebuild_rollup_bucket(
+    db: Session, user_id: str, repo_url: str, branch: str, bucket_date: date
+) -> None:
+    """
+    1日分の集計を分析本体から作り直す（削除時用。min/maxは差分では戻せないため）
+    """
+    day_start = datetime.combine(bucket_date, time.min)
+    analyses = (
+        db.query(Analysis)
+        .filter(
+            Analysis.user_id == user_id,
+            Analysis.repo_url == repo_url,
+            Analysis.branch == branch,
+            Analysis.created_at >= day_start,
+            Analysis.created_at < day_start + timedelta(days=1),
+        )
+        .all()
+    )
+
+    rollup = _find_rollup(db, user_id, repo_url, branch, bucket_date)
+    if not analyses:
+        if rollup is not None:
+            db.delete(rollup)
+        return
+
+    if rollup is None:
+        rollup = ScoreRollup(
+            user_id=user_id,
+            repo_url=repo_url,
+            branch=branch,
+            bucket_date=bucket_date,
+        )
+        db.add(rollup)
+
+    rollup.count = 0
+    for key in SCORE_KEYS:
+        setattr(rollup, f"{key}_sum", 0)
+        setattr(rollup, f"{key}_min", None)
+        setattr(rollup, f"{key}_max", None)
+    for analysis in analyses:
+        _apply_scores(rollup, analysis.scores)
+
+
+def get_score_trends(
+    db: Session,
+    user_id: str,
+    bucket: Bucket = "day",
+    repo_url: Optional[str] = None,
+    branch: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> List[dict]:
+    """
+    日次集計を週・月単位にまとめてスコア推移を返す
+    """
+    query = db.query(ScoreRollup).filter(ScoreRollup.user_id == user_id)
+    if repo_url is not None:
+        query = query.filter(ScoreRollup.repo_url == repo_url)
+    if branch is not None:
+        query = query.filter(ScoreRollup.branch == branch)
+    if since is not None:
+        query = query.filter(ScoreRollup.bucket_date >= since)
+    if until is not None:
+        query = query.filter(ScoreRollup.bucket_date <= until)
+
+    merged: Dict[tuple, dict] = {}
+    for rollup in query.order_by(ScoreRollup.bucket_date).all():
+        start = _bucket_start(rollup.bucket_date, bucket)
+        key = (rollup.repo_url, rollup.branch, start)
+        item = merged.get(key)
+        if item is None:
+            item = merged[key] = {
+                "repo_url": rollup.repo_url,
+                "branch": rollup.branch,
+                "bucket_start": start,
+                "count": 0,
+                "sums": {k: 0 for k in SCORE_KEYS},
+                "mins": {},
+                "maxs": {},
+            }
+        item["count"] += rollup.count
+        for k in SCORE_KEYS:
+            item["sums"][k] += getattr(rollup, f"{k}_sum")
+            low = getattr(rollup, f"{k}_min")
+            high = getattr(rollup, f"{k}_max")
+            item["mins"][k] = min(item["mins"].get(k, low), low)
+            item["maxs"][k] = max(item["maxs"].get(k, high), high)
+
+    return [
+        {
+            "repo_url": item["repo_url"],
+            "branch": item["branch"],
+            "bucket_start": item["bucket_start"].isoformat(),
+            "count": item["count"],
+            "scores": {
+                k: {
+                    "avg": round(item["sums"][k] / item["count"], 2),
+                    "min": item["mins"][k],
+                    "max": item["maxs"][k],
+                }
+                for k in SCORE_KEYS
+            },
+        }
+        for item in sorted(
+            merged.values(),
+            key=lambda i: (i["repo_url"], i["branch"], i["bucket_start"]),
+        )
+    ]
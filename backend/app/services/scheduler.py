@@ -0,0 +1,298 @@
+# app/services/scheduler.py
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.exceptions import AppException, ErrorCode
+from app.logger import logger
+from app.models import SchedulerLock, TrackedRepo, User
+from app.services.analysis_service import SessionFactory, run_analysis
+from app.shared_state import PROCESS_ID
+
+# 定期分析のリース名（スケジューラーは1種類だけ）
+LOCK_NAME = "tracked-repo-refresh"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def acquire_lease(db: Session, owner: str, now: Optional[datetime] = None) -> bool:
+    """
+    リーダーのリースを取得・延長（取れなければFalse）
+    - 自分が持っているか期限切れのリースだけを条件付きUPDATEで奪う
+    - 行が無ければINSERTし、同時に作られたら主キー違反で負けとする
+    """
+    now = now or _now()
+    expires_at = now + timedelta(seconds=settings.scheduler_lease_seconds)
+
+    updated = (
+        db.query(SchedulerLock)
+        .filter(
+            SchedulerLock.name == LOCK_NAME,
+            or_(SchedulerLock.owner == owner, SchedulerLock.expires_at < now),
+        )
+        .update({"owner": owner, "expires_at": expires_at}, synchronize_session=False)
+    )
+    if updated:
+        db.commit()
+        return True
+
+    try:
+        db.add(SchedulerLock(name=LOCK_NAME, owner=owner, expires_at=expires_at))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def release_lease(db: Session, owner: str) -> None:
+    """自分のリースを即座に失効させる（停止時用）"""
+    db.query(SchedulerLock).filter(
+        SchedulerLock.name == LOCK_NAME, SchedulerLock.owner == owner
+    ).update({"expires_at": _now()}, synchronize_session=False)
+    db.commit()
+
+
+def in_offpeak_window(now: datetime) -> bool:
+    """オフピーク時間帯か（開始 == 終了なら終日）"""
+    start = settings.scheduler_offpeak_start_hour
+    end = settings.scheduler_offpeak_end_hour
+    if start == end:
+        return True
+    if start < end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+def find_due_repos(db: Session, now: datetime, limit: int) -> List[TrackedRepo]:
+    """更新間隔を過ぎた（または未実行の）対象を古い順に取得"""
+    threshold = now - timedelta(hours=settings.scheduler_refresh_interval_hours)
+    return (
+        db.query(TrackedRepo)
+        .filter(
+            or_(TrackedRepo.last_run_at.is_(None), TrackedRepo.last_run_at < threshold)
+        )
+        .order_by(TrackedRepo.last_run_at.is_(None).desc(), TrackedRepo.last_run_at)
+        .limit(limit)
+        .all()
+    )
+
+
+def _load_tracked(
+    session_factory: SessionFactory, tracked_id: str
+) -> Tuple[Optional[TrackedRepo], Optional[User]]:
+    with session_factory() as db:
+        tracked = db.get(TrackedRepo, tracked_id)
+        if tracked is None:
+            return None, None
+        return tracked, db.get(User, tracked.user_id)
+
+
+def _record_result(
+    session_factory: SessionFactory,
+    tracked_id: str,
+    analysis_id: Optional[str],
+    last_error: Optional[str],
+) -> None:
+    with session_factory() as db:
+        tracked = db.get(TrackedRepo, tracked_id)
+        if tracked is None:
+            return
+        if analysis_id is not None:
+            tracked.last_analysis_id = analysis_id
+        tracked.last_error = last_error
+        tracked.last_run_at = _now()
+        db.commit()
+
+
+async def refresh_tracked_repo(
+    session_factory: SessionFactory, tracked_id: str
+) -> Optional[AppException]:
+    """
+    1件を差分分析で更新（HEADが変わっていなければGitHub 1リクエストだけで終わる）
+    - 失敗してもlast_run_atは進め、次の更新間隔まで再試行しない
+    """
+    tracked, user = await asyncio.to_thread(_load_tracked, session_factory, tracked_id)
+    if tracked is None:
+        return None
+
+    # 分析中（GitHub・Gemini待ち）はDB接続を持たない
+    error = None
+    last_error = None
+    analysis_id = None
+    try:
+        analysis = await run_analysis(
+            tracked.repo_url,
+            tracked.branch,
+            tracked.limit,
+            user,
+            session_factory,
+            incremental=True,
+        )
+        analysis_id = analysis.id
+    except AppException as e:
+        error = e
+        last_error = e.message
+    except Exception as e:
+        logger.error(f"Scheduler | Error | {type(e).__name__}: {str(e)}")
+        error = AppException(500, ErrorCode.INTERNAL_ERROR, str(e))
+        last_error = f"{type(e).__name__}: {str(e)}"
+
+    await asyncio.to_thread(
+        _record_result, session_factory, tracked_id, analysis_id, last_error
+    )
+    return error
+
+
+def _start_cycle(
+    session_factory: SessionFactory, owner: str, now: datetime
+) -> Optional[List[str]]:
+    """リースを取れたら期限の来た対象のIDを返す（取れなければNone）"""
+    with session_factory() as db:
+        if not acquire_lease(db, owner, now):
+            return None
+        return [t.id for t in find_due_repos(db, now, settings.scheduler_batch_size)]
+
+
+def _renew_lease(session_factory: SessionFactory, owner: str) -> bool:
+    with session_factory() as db:
+        return acquire_lease(db, owner)
+
+
+async def _keep_lease(
+    session_factory: SessionFactory, owner: str, lost: asyncio.Event
+) -> None:
+    """
+    周期の間（最後の分析を待つ間も）リースを延長し続ける
+    - 他のタスクに奪われたらlostを立てて終わる（同じ対象を二重に分析しないよう、呼び出し側で止める）
+    - DBのエラーは次の延長で取り直す（期限内ならまだ自分のリース）
+    """
+    interval = settings.scheduler_lease_seconds / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            renewed = await asyncio.to_thread(_renew_lease, session_factory, owner)
+        except Exception as e:
+            logger.error(f"Scheduler | Lease renew error | {type(e).__name__}: {e}")
+            continue
+        if not renewed:
+            logger.warning(f"Scheduler | Lease lost | owner: {owner}")
+            lost.set()
+            return
+
+
+async def run_refresh_cycle(
+    session_factory: SessionFactory, owner: str, now: Optional[datetime] = None
+) -> int:
+    """
+    リーダーなら期限の来た対象を更新し、処理件数を返す
+    - 同時実行はscheduler_max_concurrency件、開始間隔はscheduler_start_interval_seconds
+      にしてGitHub / Geminiへの負荷を時間帯内に分散する
+    - GitHubのレート制限（429）に当たったら残りは次の周期に回す
+    - 周期の間はリースを延長し続け、奪われたら実行中の分析も止める
+    """
+    now = now or _now()
+    tracked_ids = await asyncio.to_thread(_start_cycle, session_factory, owner, now)
+    if not tracked_ids:
+        return 0
+    logger.info(f"Scheduler | Cycle start | owner: {owner} | due: {len(tracked_ids)}")
+
+    semaphore = asyncio.Semaphore(settings.scheduler_max_concurrency)
+    rate_limited = asyncio.Event()
+    lease_lost = asyncio.Event()
+    tasks = []
+
+    async def refresh(tracked_id: str) -> None:
+        try:
+            error = await refresh_tracked_repo(session_factory, tracked_id)
+        finally:
+            semaphore.release()
+        if error is not None and error.status_code == 429:
+            rate_limited.set()
+
+    keeper = asyncio.create_task(_keep_lease(session_factory, owner, lease_lost))
+    try:
+        for index, tracked_id in enumerate(tracked_ids):
+            await semaphore.acquire()
+            if rate_limited.is_set():
+                semaphore.release()
+                logger.warning("Scheduler | Rate limited | postponing the rest")
+                break
+            if lease_lost.is_set():
+                semaphore.release()
+                break
+            if index > 0:
+                await asyncio.sleep(settings.scheduler_start_interval_seconds)
+            tasks.append(asyncio.create_task(refresh(tracked_id)))
+        if tasks:
+            # 他のタスクがリーダーになったら、実行中の分析も止める（finallyでキャンセル）
+            finished = asyncio.gather(*tasks)
+            lost = asyncio.create_task(lease_lost.wait())
+            try:
+                await asyncio.wait(
+                    [finished, lost], return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                lost.cancel()
+            if finished.done():
+                finished.result()
+    finally:
+        keeper.cancel()
+        for task in tasks:
+            task.cancel()
+
+    logger.info(f"Scheduler | Cycle complete | processed: {len(tasks)}")
+    return len(tasks)
+
+
+class Scheduler:
+    """
+    定期分析のバックグラウンドループ（アプリのlifespanで起動・停止）
+    - 複数タスクで起動しても、DBのリースを持つ1つだけが分析を実行する
+    """
+
+    def __init__(self, session_factory: SessionFactory = SessionLocal):
+        self.session_factory = session_factory
+        self.owner = PROCESS_ID
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        logger.info(f"Scheduler | Start | owner: {self.owner}")
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._release_lease)
+        logger.info(f"Scheduler | Stop | owner: {self.owner}")
+
+    def _release_lease(self) -> None:
+        with self.session_factory() as db:
+            release_lease(db, self.owner)
+
+    async def _loop(self) -> None:
+        while True:
+            now = _now()
+            try:
+                if in_offpeak_window(now):
+                    await run_refresh_cycle(self.session_factory, self.owner, now)
+            except Exception as e:
+                logger.error(f"Scheduler | Error | {type(e).__name__}: {str(e)}")
+            # 複数タスクの周期がそろわないよう少しずらす
+            tick = settings.scheduler_tick_seconds
+            await asyncio.sleep(tick + random.uniform(0, tick / 10))
@@ -0,0 +1,363 @@
+# app/shared_state.py
+import abc
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from sqlalchemy import create_engine, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.logger import logger
+from app.models import SharedStateEntry
+
+# Redis（互換サーバー含む）はライブラリが入っている環境でのみ使う
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+# ロックの持ち主としてのこのプロセスの識別子
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class SharedStateBackend(abc.ABC):
+    """
+    ワーカー間で共有する状態の保存先（キャッシュ・レート制限のカウンター・ロック）
+    - memory: プロセス内のみ（ワーカー1つの場合）
+    - database: 既存のDBの shared_state テーブル
+    - redis: Redis互換サーバー
+    - database・redisはI/Oで待つので、イベントループからは a で始まる非同期版を使う
+      （既定ではスレッドで同期版を呼ぶ）
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None: ...
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abc.abstractmethod
+    def incr(self, key: str, ttl: float, amount: int = 1) -> int:
+        """カウンターをamount増やして新しい値を返す（初回作成時からttl秒で消える固定窓）"""
+
+    @abc.abstractmethod
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        """ロックを取る（他のownerが期限内に持っていればFalse）"""
+
+    @abc.abstractmethod
+    def release_lock(self, key: str, owner: str) -> None: ...
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def adelete(self, key: str) -> None:
+        await asyncio.to_thread(self.delete, key)
+
+    async def aincr(self, key: str, ttl: float, amount: int = 1) -> int:
+        return await asyncio.to_thread(self.incr, key, ttl, amount)
+
+    async def aacquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self.acquire_lock, key, owner, ttl)
+
+    async def arelease_lock(self, key: str, owner: str) -> None:
+        await asyncio.to_thread(self.release_lock, key, owner)
+
+
+class MemoryBackend(SharedStateBackend):
+    def __init__(self):
+        self._entries: Dict[str, Tuple[object, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[object]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    def _set(self, key: str, value: object, ttl: Optional[float]) -> None:
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key: str, ttl: float, amount: int = 1) -> int:
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self._set(key, amount, ttl)
+                return amount
+            _, expires_at = self._entries[key]
+            self._entries[key] = (value + amount, expires_at)
+            return value + amount
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        with self._lock:
+            current = self._get(key)
+            if current is not None and current != owner:
+                return False
+            self._set(key, owner, ttl)
+            return True
+
+    def release_lock(self, key: str, owner: str) -> None:
+        with self._lock:
+            if self._get(key) == owner:
+                del self._entries[key]
+
+    # プロセス内の辞書なので、スレッドに回さずそのまま呼ぶ
+    async def aget(self, key: str) -> Optional[bytes]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.set(key, value, ttl)
+
+    async def adelete(self, key: str) -> None:
+        self.delete(key)
+
+    async def aincr(self, key: str, ttl: float, amount: int = 1) -> int:
+        return self.incr(key, ttl, amount)
+
+    async def aacquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return self.acquire_lock(key, owner, ttl)
+
+    async def arelease_lock(self, key: str, owner: str) -> None:
+        self.release_lock(key, owner)
+
+
+class DatabaseBackend(SharedStateBackend):
+    """
+    shared_state テーブルを使う（追加のミドルウェアなしで複数ワーカー・複数タスクに対応）
+    - 期限切れの行は読むときに無視し、書くときに上書きする
+    - リクエストのセッションを持ったまま呼ばれるので、接続プールはアプリと分ける
+      （同じプールだと、枯渇したときに互いの返却を待って止まる）
+    """
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            engine = create_engine(
+                settings.database_url,
+                connect_args={"check_same_thread": False}
+                if "sqlite" in settings.database_url
+                else {},
+            )
+            session_factory = sessionmaker(autoflush=False, bind=engine)
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[datetime]:
+        return self._now() + timedelta(seconds=ttl) if ttl is not None else None
+
+    def _live(self, db, key: str):
+        return db.query(SharedStateEntry).filter(
+            SharedStateEntry.key == key,
+            or_(
+                SharedStateEntry.expires_at.is_(None),
+                SharedStateEntry.expires_at > self._now(),
+            ),
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.session_factory() as db:
+            entry = self._live(db, key).first()
+            return entry.value if entry is not None else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self.session_factory() as db:
+            db.merge(
+                SharedStateEntry(
+                    key=key, value=value, counter=None, expires_at=self._expires_at(ttl)
+                )
+            )
+            db.commit()
+
+    def delete(self, key: str) -> None:
+        with self.session_factory() as db:
+            db.query(SharedStateEntry).filter(SharedStateEntry.key == key).delete()
+            db.commit()
+
+    def _insert_or_replace_expired(self, db, entry: SharedStateEntry) -> bool:
+        """行が無いか期限切れなら作る（同時に作られたらFalse）"""
+        db.query(SharedStateEntry).filter(
+            SharedStateEntry.key == entry.key,
+            SharedStateEntry.expires_at <= self._now(),
+        ).delete()
+        try:
+            with db.begin_nested():
+                db.add(entry)
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+
+    def incr(self, key: str, ttl: float, amount: int = 1) -> int:
+        with self.session_factory() as db:
+            for _ in range(3):
+                updated = self._live(db, key).update(
+                    {"counter": SharedStateEntry.counter + amount},
+                    synchronize_session=False,
+                )
+                if updated:
+                    db.commit()
+                    return self._live(db, key).first().counter
+                entry = SharedStateEntry(
+                    key=key, counter=amount, expires_at=self._expires_at(ttl)
+                )
+                if self._insert_or_replace_expired(db, entry):
+                    return amount
+        # 競合が続いた場合は数え漏れより過大に数える側に倒す
+        return 1 << 30
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        value = owner.encode("utf-8")
+        with self.session_factory() as db:
+            updated = (
+                db.query(SharedStateEntry)
+                .filter(
+                    SharedStateEntry.key == key,
+                    or_(
+                        SharedStateEntry.value == value,
+                        SharedStateEntry.expires_at <= self._now(),
+                    ),
+                )
+                .update(
+                    {"value": value, "expires_at": self._expires_at(ttl)},
+                    synchronize_session=False,
+                )
+            )
+            if updated:
+                db.commit()
+                return True
+            entry = SharedStateEntry(
+                key=key, value=value, expires_at=self._expires_at(ttl)
+            )
+            return self._insert_or_replace_expired(db, entry)
+
+    def release_lock(self, key: str, owner: str) -> None:
+        with self.session_factory() as db:
+            db.query(SharedStateEntry).filter(
+                SharedStateEntry.key == key,
+                SharedStateEntry.value == owner.encode("utf-8"),
+            ).delete()
+            db.commit()
+
+
+class RedisBackend(SharedStateBackend):
+    # 自分が持っているロックだけを消す
+    _RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+    # 自分が持っているロックだけを延長する（GETとPEXPIREの間に期限が切れて他のownerに取られないよう1回で）
+    _RENEW_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("SHARED_STATE_BACKEND=redis requires the redis package")
+        self._client = redis.Redis.from_url(url)
+        self._release = self._client.register_script(self._RELEASE_SCRIPT)
+        self._renew = self._client.register_script(self._RENEW_SCRIPT)
+
+    @staticmethod
+    def _ms(ttl: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl * 1000)) if ttl is not None else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._client.set(key, value, px=self._ms(ttl))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+    def incr(self, key: str, ttl: float, amount: int = 1) -> int:
+        pipe = self._client.pipeline()
+        pipe.incrby(key, amount)
+        # 初回作成時だけ期限を付ける（NX）
+        pipe.pexpire(key, self._ms(ttl), nx=True)
+        value, _ = pipe.execute()
+        return value
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        value = owner.encode("utf-8")
+        if self._client.set(key, value, px=self._ms(ttl), nx=True):
+            return True
+        return bool(self._renew(keys=[key], args=[value, self._ms(ttl)]))
+
+    def release_lock(self, key: str, owner: str) -> None:
+        self._release(keys=[key], args=[owner.encode("utf-8")])
+
+
+def create_backend(name: str) -> SharedStateBackend:
+    if name == "database":
+        return DatabaseBackend()
+    if name == "redis":
+        return RedisBackend(settings.shared_state_url)
+    if name != "memory":
+        raise ValueError(f"Unknown shared state backend: {name}")
+    if settings.web_concurrency > 1:
+        logger.warning(
+            "Shared state | memory backend with multiple workers: "
+            "caches, rate limits and locks are per worker"
+        )
+    return MemoryBackend()
+
+
+# アプリ全体で共有する保存先（SHARED_STATE_BACKENDで選択）
+shared_state = create_backend(settings.shared_state_backend)
+
+
+@asynccontextmanager
+async def shared_lock(
+    key: str, owner: str, ttl: float, timeout: float
+) -> AsyncIterator[None]:
+    """
+    ワーカー間のsingle-flightロック（取れるまで待ち、timeout秒で諦める）
+    - ttlはロックを持ったままプロセスが落ちた場合の保険
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while not await shared_state.aacquire_lock(key, owner, ttl):
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Timed out waiting for lock: {key}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    try:
+        yield
+    finally:
+        await shared_state.arelease_lock(key, owner)
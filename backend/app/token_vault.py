@@ -0,0 +1,187 @@
+# app/token_vault.py
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.config import settings
+
+# 暗号文の先頭（形式を変えたら上げる）
+PREFIX = "v1"
+NONCE_SIZE = 12
+# 鍵ごとに包んだデータ鍵（32バイト + GCMのタグ16バイト）
+WRAPPED_KEY_SIZE = 48
+# 暗号文を別の用途の値と取り違えないよう、認証の対象に含める
+TOKEN_AAD = b"github_access_token"
+KEY_AAD = b"token_vault:data_key"
+
+
+class TokenVaultError(Exception):
+    """鍵ファイルが無い、または暗号文を復号できない（鍵が違う・壊れている）"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _key_id(key: bytes) -> str:
+    return hashlib.sha256(key).hexdigest()[:8]
+
+
+def generate_key() -> str:
+    """マスター鍵を1つ作る（鍵ファイル・TOKEN_VAULT_KEYSに書く形式）"""
+    return _b64encode(AESGCM.generate_key(bit_length=256))
+
+
+def generate_key_file(path: str) -> None:
+    """
+    マスター鍵を1つ書いた鍵ファイルを作る（python -m app.cli init-token-key）
+    - 本人だけが読める権限で作り、既にあればFileExistsError（鍵を上書きしない）
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(generate_key() + "\n")
+
+
+class TokenVault:
+    """
+    GitHubのアクセストークンの暗号化（エンベロープ暗号化）
+    - トークンごとにデータ鍵を作ってAES-GCMで暗号化し、データ鍵は鍵ファイルのマスター鍵で包む
+      暗号文は "v1.<鍵ID>.<包んだデータ鍵・nonce・暗号文>" の文字列で、そのままカラムに入る
+    - 鍵ファイルは1行1鍵（32バイトをbase64url）。先頭の鍵で暗号化し、残りは復号だけに使う（鍵の入れ替え用）
+      自動では作らない（init-token-keyで作り、各ワーカーに同じ鍵ファイルを配る）
+    - keysを渡すと鍵ファイルの代わりに使う（改行かカンマ区切り。コンテナでSecrets Managerから渡す用）
+    - 復号したトークンはユーザーIDごとにcache_ttl秒だけメモリに置き、分析のたびには復号しない
+      暗号文が変わった（再ログインした）ら使わない。同じワーカーでの再ログインはinvalidateで捨てる
+    - "v1." で始まらない値は暗号化前の平文として読む（移行中の行）
+    """
+
+    def __init__(
+        self,
+        key_file: str,
+        cache_ttl: float,
+        cache_max_entries: int,
+        keys: str = "",
+    ):
+        self.key_file = key_file
+        self.keys = keys
+        self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self._keys: Optional[Dict[str, AESGCM]] = None
+        self._current: Optional[str] = None
+        # ユーザーID → (暗号文, トークン, 期限)
+        self._cache: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_keys(self) -> Dict[str, AESGCM]:
+        with self._lock:
+            if self._keys is None:
+                keys = [_b64decode(line) for line in self._read_keys()]
+                self._keys = {_key_id(key): AESGCM(key) for key in keys}
+                self._current = _key_id(keys[0])
+            return self._keys
+
+    def _read_keys(self) -> List[str]:
+        if self.keys:
+            return [
+                key.strip()
+                for key in self.keys.replace(",", "\n").splitlines()
+                if key.strip()
+            ]
+        # 黙って新しい鍵を作ると、保存済みのトークンがすべて復号できなくなる
+        try:
+            with open(self.key_file, encoding="ascii") as f:
+                lines = [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            raise TokenVaultError(
+                f"Key file not found: {self.key_file} "
+                "(create it with: python -m app.cli init-token-key, "
+                "or set TOKEN_VAULT_KEYS)"
+            )
+        if not lines:
+            raise TokenVaultError(f"Empty key file: {self.key_file}")
+        return lines
+
+    def check(self) -> None:
+        """鍵を読んでおく（起動時に呼び、無い・空なら起動を止める）"""
+        self._load_keys()
+
+    def encrypt(self, token: str) -> str:
+        keys = self._load_keys()
+        data_key = AESGCM.generate_key(bit_length=256)
+        key_nonce = os.urandom(NONCE_SIZE)
+        nonce = os.urandom(NONCE_SIZE)
+        wrapped = keys[self._current].encrypt(key_nonce, data_key, KEY_AAD)
+        ciphertext = AESGCM(data_key).encrypt(nonce, token.encode("utf-8"), TOKEN_AAD)
+        body = _b64encode(key_nonce + wrapped + nonce + ciphertext)
+        return f"{PREFIX}.{self._current}.{body}"
+
+    def _decrypt(self, value: str) -> str:
+        if not value.startswith(PREFIX + "."):
+            return value
+        try:
+            _, key_id, body = value.split(".", 2)
+            raw = _b64decode(body)
+        except ValueError:
+            raise TokenVaultError("Malformed encrypted token")
+        master = self._load_keys().get(key_id)
+        if master is None:
+            raise TokenVaultError(f"Unknown key id: {key_id}")
+        key_nonce = raw[:NONCE_SIZE]
+        wrapped = raw[NONCE_SIZE : NONCE_SIZE + WRAPPED_KEY_SIZE]
+        nonce = raw[NONCE_SIZE + WRAPPED_KEY_SIZE : 2 * NONCE_SIZE + WRAPPED_KEY_SIZE]
+        ciphertext = raw[2 * NONCE_SIZE + WRAPPED_KEY_SIZE :]
+        try:
+            data_key = master.decrypt(key_nonce, wrapped, KEY_AAD)
+            token = AESGCM(data_key).decrypt(nonce, ciphertext, TOKEN_AAD)
+        except (InvalidTag, ValueError):
+            raise TokenVaultError("Failed to decrypt token")
+        return token.decode("utf-8")
+
+    def decrypt(self, value: str, user_id: Optional[str] = None) -> str:
+        """暗号文をトークンに戻す（user_idを渡すとキャッシュを使う）"""
+        if user_id is None:
+            return self._decrypt(value)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None and entry[0] == value and entry[2] > now:
+                self._cache.move_to_end(user_id)
+                return entry[1]
+
+        token = self._decrypt(value)
+        with self._lock:
+            self._cache[user_id] = (value, token, now + self.cache_ttl)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+        return token
+
+    def invalidate(self, user_id: str) -> None:
+        """復号済みのトークンを捨てる（再ログインでトークンが変わったとき）"""
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+# アプリ全体で使う保管庫（鍵は最初に使うときに読む）
+token_vault = TokenVault(
+    key_file=settings.token_vault_key_file,
+    cache_ttl=settings.token_vault_cache_ttl_seconds,
+    cache_max_entries=settings.token_vault_cache_max_entries,
+    keys=settings.token_vault_keys,
+)
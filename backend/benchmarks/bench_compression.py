@@ -0,0 +1,113 @@
+# benchmarks/bench_compression.py
+"""
+レスポンス圧縮の帯域削減とCPU時間を計測
+
+- detail: 日本語レポート6段落の分析詳細（初回圧縮 / キャッシュヒット）
+- list:   一覧1,000件
+
+実行（backend/ で）:
+    python -m benchmarks.bench_compression --rounds 200
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, List
+
+from pydantic_core import to_json
+
+from app.compression import ENCODERS, CompressedCache, compress
+from app.routers.analyses import _list_adapter
+from app.schemas import AnalysisListItem, AnalysisResponse, SuccessResponse
+from benchmarks.bench_list_serialization import make_analyses
+
+PARAGRAPH = (
+    "テストコードは主要な機能に対して継続的に追加されており、"
+    "リファクタリング時の回帰を防ぐ意識が見られる。一方で境界値や異常系のケースは少なく、"
+    "外部APIとの連携部分はモックに頼った検証にとどまっている。"
+)
+
+
+def detail_body() -> bytes:
+    report = {
+        key: f"{key}: {PARAGRAPH}"
+        for key in [
+            "test",
+            "comment",
+            "commit_size",
+            "commit_frequency",
+            "commit_message",
+            "activity",
+        ]
+    }
+    response = AnalysisResponse(
+        id="00000000-0000-0000-0000-000000000000",
+        repo_url="https://github.com/owner/repo",
+        branch="main",
+        scores={
+            "test": 80,
+            "comment": 70,
+            "commit_size": 90,
+            "commit_frequency": 85,
+            "commit_message": 75,
+            "activity": 80,
+        },
+        report=report,
+        created_at="2026-01-01T00:00:00",
+        updated_at="2026-01-01T00:00:00",
+    )
+    return to_json(SuccessResponse[AnalysisResponse](data=response))
+
+
+def list_body(items: int) -> bytes:
+    data = _list_adapter.validate_python(make_analyses(items))
+    return to_json(SuccessResponse[List[AnalysisListItem]](data=data))
+
+
+def cpu_ms(func: Callable[[], object], rounds: int) -> float:
+    func()
+    start = time.process_time()
+    for _ in range(rounds):
+        func()
+    return round((time.process_time() - start) / rounds * 1000, 4)
+
+
+def measure(body: bytes, rounds: int) -> dict:
+    result = {"identity": {"bytes": len(body)}}
+    for encoding in ENCODERS:
+        compressed = compress(body, encoding)
+        result[encoding] = {
+            "bytes": len(compressed),
+            "ratio": round(len(compressed) / len(body), 3),
+            "cpu_ms": cpu_ms(lambda: compress(body, encoding), rounds),
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    detail = detail_body()
+    result = {
+        "benchmark": "compression",
+        "encodings": list(ENCODERS),
+        "detail": measure(detail, args.rounds),
+        "list": measure(list_body(args.items), max(1, args.rounds // 10)),
+    }
+
+    # キャッシュヒット時は (id, updated_at, encoding) の辞書引きだけになる
+    cache = CompressedCache(max_bytes=1024 * 1024)
+    key = ("id", "2026-01-01T00:00:00", "gzip")
+    cache.set(key, compress(detail, "gzip"))
+    result["detail"]["gzip"]["cache_hit_cpu_ms"] = cpu_ms(
+        lambda: cache.get(key), args.rounds
+    )
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
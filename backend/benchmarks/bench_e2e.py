@@ -0,0 +1,204 @@
+# benchmarks/bench_e2e.py
+"""
+エンドツーエンドのレイテンシ（p50/p95/p99）とスループット（req/s）を計測
+
+- GitHubはローカルの代替サーバー（benchmarks.fake_github）、LLMはスタブ（LLM_BACKEND=stub）
+- POST /analyses・GET /analyses・GET /auth/me・ログイン（POST /auth/github/callback）を、
+  同時実行数ごとに一定時間叩き続ける。ログインは100人分のcodeを順に使う（新規作成と再ログイン）
+- GitHubへの呼び出し回数（種類別）も記録する。LLMの呼び出しは成功した分析1件につき1回
+
+実行（backend/ で）:
+    python -m benchmarks.bench_e2e --concurrency 1 8 32 --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import httpx
+from jose import jwt
+
+from app.config import settings
+from benchmarks.bench_workers import free_port, seed, start_server, write_key_file
+
+# (メソッド, パスを作る関数, JSONボディを作る関数)
+Scenario = Tuple[str, Callable[[int], str], Callable[[int], dict]]
+
+
+def scenarios(limit: int) -> dict:
+    return {
+        "create_analysis": (
+            "POST",
+            lambda i: "/analyses",
+            # 毎回別のリポジトリにして、キャッシュが効かない状態を測る
+            lambda i: {
+                "repo_url": f"https://github.com/bench/repo{i}",
+                "branch": "main",
+                "limit": limit,
+            },
+        ),
+        "list_analyses": ("GET", lambda i: "/analyses", lambda i: None),
+        "auth_me": ("GET", lambda i: "/auth/me", lambda i: None),
+        "login": (
+            "POST",
+            lambda i: f"/auth/github/callback?code=bench{i % 100}",
+            lambda i: None,
+        ),
+    }
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+
+async def load(
+    port: int, token: str, scenario: Scenario, concurrency: int, duration: float
+) -> dict:
+    method, make_path, make_body = scenario
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    deadline = time.monotonic() + duration
+    counter = 0
+
+    async def client_loop() -> None:
+        nonlocal counter
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=60,
+        ) as client:
+            while time.monotonic() < deadline:
+                i = counter
+                counter += 1
+                start = time.perf_counter()
+                response = await client.request(method, make_path(i), json=make_body(i))
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] += 1
+
+    start = time.monotonic()
+    await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+    elapsed = time.monotonic() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(n for status, n in statuses.items() if status >= 400),
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def github_calls(port: int) -> Counter:
+    response = httpx.get(f"http://127.0.0.1:{port}/_stats", timeout=5)
+    return Counter(response.json()["calls"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=["create_analysis", "list_analyses", "auth_me", "login"],
+        default=["create_analysis", "list_analyses", "auth_me"],
+    )
+    parser.add_argument("--items", type=int, default=200, help="既存の分析件数")
+    parser.add_argument("--limit", type=int, default=10, help="1分析あたりのcommit数")
+    parser.add_argument("--github-latency", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        key_file = write_key_file(tmp)
+        seed(database_url, args.items)
+        token = jwt.encode(
+            {"sub": "user", "exp": datetime.now(timezone.utc) + timedelta(hours=1)},
+            settings.jwt_secret_key,
+            algorithm="HS256",
+        )
+
+        github_port = free_port()
+        github = start_server(
+            1,
+            github_port,
+            {**os.environ, "FAKE_GITHUB_LATENCY_SECONDS": str(args.github_latency)},
+            app="benchmarks.fake_github:app",
+        )
+        app_port = free_port()
+        app = start_server(
+            args.workers,
+            app_port,
+            {
+                # 受付制御で弾かれないよう上限を上げる（環境変数で上書き可）
+                "ADMISSION_USER_RATE_LIMIT": "100000000",
+                "ADMISSION_USER_MAX_CONCURRENCY": "100000",
+                "ADMISSION_MAX_IN_FLIGHT": "100000",
+                **os.environ,
+                "DATABASE_URL": database_url,
+                "TOKEN_VAULT_KEY_FILE": key_file,
+                "GITHUB_API_BASE_URL": f"http://127.0.0.1:{github_port}",
+                "GITHUB_OAUTH_BASE_URL": f"http://127.0.0.1:{github_port}",
+                "LLM_BACKEND": "stub",
+                "LLM_STUB_LATENCY_SECONDS": str(args.llm_latency),
+                "COMMIT_FETCHER": "api",
+                "SCHEDULER_ENABLED": "false",
+                "WEB_CONCURRENCY": str(args.workers),
+            },
+        )
+
+        results = []
+        try:
+            for name in args.scenarios:
+                scenario = scenarios(args.limit)[name]
+                for concurrency in args.concurrency:
+                    before = github_calls(github_port)
+                    stats = asyncio.run(
+                        load(app_port, token, scenario, concurrency, args.duration)
+                    )
+                    calls = github_calls(github_port) - before
+                    results.append(
+                        {
+                            "scenario": name,
+                            "concurrency": concurrency,
+                            **stats,
+                            "github_calls": dict(calls),
+                            "llm_calls": stats["statuses"].get("200", 0)
+                            if name == "create_analysis"
+                            else 0,
+                        }
+                    )
+        finally:
+            for process in (app, github):
+                process.terminate()
+                process.wait()
+
+    print(
+        json.dumps(
+            {
+                "cpu_count": os.cpu_count(),
+                "workers": args.workers,
+                "duration_sec": args.duration,
+                "commits_per_analysis": args.limit,
+                "github_latency_sec": args.github_latency,
+                "llm_latency_sec": args.llm_latency,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_list_serialization.py
+"""
+GET /analyses のレスポンス組み立てにかかるCPU時間を計測
+
+- legacy: 手組みのスキーマ → FastAPIがresponse_modelで再検証・再シリアライズ
+- fast:   from_attributesで1回だけ検証 → ModelResponseでそのままJSON化
+
+実行（backend/ で）:
+    python -m benchmarks.bench_list_serialization --items 1000 --rounds 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models import Analysis
+from app.responses import ModelResponse
+from app.routers.analyses import _list_adapter
+from app.schemas import AnalysisListItem, Scores, SuccessResponse
+
+
+def make_analyses(count: int) -> List[Analysis]:
+    """DBから読み込んだ状態に近いAnalysisを作成（レポートは一覧では読まない）"""
+    now = datetime(2026, 1, 1)
+    return [
+        Analysis(
+            id=f"analysis-{i}",
+            user_id="user",
+            repo_url=f"https://github.com/owner/repo{i}",
+            branch="main",
+            scores={
+                "test": i % 101,
+                "comment": 70,
+                "commit_size": 90,
+                "commit_frequency": 85,
+                "commit_message": 75,
+                "activity": 80,
+            },
+            memo="memo" if i % 3 == 0 else None,
+            created_at=now + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+
+
+response_field = create_model_field(
+    name="Response_list_analyses",
+    type_=SuccessResponse[List[AnalysisListItem]],
+    mode="serialization",
+)
+
+
+def legacy(analyses: List[Analysis]) -> bytes:
+    content = SuccessResponse(
+        data=[
+            AnalysisListItem(
+                id=a.id,
+                repo_url=a.repo_url,
+                branch=a.branch,
+                scores=Scores(**a.scores),
+                memo=a.memo,
+                created_at=a.created_at.isoformat(),
+            )
+            for a in analyses
+        ]
+    )
+    # FastAPIがresponse_model指定時に行う処理
+    value = asyncio.run(
+        serialize_response(field=response_field, response_content=content)
+    )
+    return JSONResponse(jsonable_encoder(value)).body
+
+
+def fast(analyses: List[Analysis]) -> bytes:
+    return ModelResponse(
+        SuccessResponse[List[AnalysisListItem]](
+            data=_list_adapter.validate_python(analyses)
+        )
+    ).body
+
+
+def measure(func, analyses: List[Analysis], rounds: int) -> dict:
+    func(analyses)  # ウォームアップ
+    start = time.process_time()
+    for _ in range(rounds):
+        body = func(analyses)
+    elapsed = time.process_time() - start
+    return {
+        "cpu_ms_per_response": round(elapsed / rounds * 1000, 3),
+        "bytes": len(body),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    analyses = make_analyses(args.items)
+    assert json.loads(legacy(analyses)) == json.loads(fast(analyses))
+
+    result = {
+        "benchmark": "list_serialization",
+        "items": args.items,
+        "rounds": args.rounds,
+        "legacy": measure(legacy, analyses, args.rounds),
+        "fast": measure(fast, analyses, args.rounds),
+    }
+    result["speedup"] = round(
+        result["legacy"]["cpu_ms_per_response"] / result["fast"]["cpu_ms_per_response"],
+        2,
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
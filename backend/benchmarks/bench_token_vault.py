@@ -0,0 +1,66 @@
+# benchmarks/bench_token_vault.py
+"""
+アクセストークンの暗号化で分析1件あたりに増える時間を計測（マイクロ秒）
+
+- encrypt:     ログイン時の暗号化（データ鍵の生成・包む・暗号化）
+- decrypt:     キャッシュなしの復号
+- cached:      ユーザーごとのキャッシュから読む（分析のたびに通る経路）
+- user_access: user.github_access_token の読み出し（ORMの属性アクセス込み）
+- plaintext:   比較用。暗号化していない属性の読み出し
+
+実行（backend/ で）:
+    python -m benchmarks.bench_token_vault --rounds 100000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+from app.models import User
+from app.token_vault import TokenVault
+from benchmarks.bench_workers import write_key_file
+
+TOKEN = "gho_" + "x" * 36
+
+
+def measure(func, rounds: int) -> float:
+    func()  # ウォームアップ
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return round((time.perf_counter() - start) / rounds * 1_000_000, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vault = TokenVault(write_key_file(tmp), 300, 10000)
+        encrypted = vault.encrypt(TOKEN)
+        user = User(id="user", github_id=1, github_username="bench")
+        user.github_access_token = TOKEN
+
+        result = {
+            "benchmark": "token_vault",
+            "rounds": args.rounds,
+            "us_per_call": {
+                "encrypt": measure(lambda: vault.encrypt(TOKEN), args.rounds),
+                "decrypt": measure(lambda: vault.decrypt(encrypted), args.rounds),
+                "cached": measure(lambda: vault.decrypt(encrypted, "u"), args.rounds),
+                "user_access": measure(lambda: user.github_access_token, args.rounds),
+                "plaintext": measure(lambda: user.github_username, args.rounds),
+            },
+        }
+    calls = result["us_per_call"]
+    # 分析1件で読むのは1回（キャッシュに当たる場合）
+    result["added_us_per_analysis"] = round(
+        calls["user_access"] - calls["plaintext"], 3
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# benchmarks/bench_workers.py
+"""
+uvicornのワーカー数ごとのスループット（req/s）を計測
+
+- 一時SQLiteに分析200件を用意し、GET /analyses（一覧）と GET /analyses/{id}（詳細）を
+  並行クライアントで叩き続ける
+- ワーカー数はCPUコア数まで（--workers で指定可）。1コアの環境では伸びない
+
+実行（backend/ で）:
+    python -m benchmarks.bench_workers --workers 1 2 4 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+import httpx
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Base
+from app.models import User
+from app.token_vault import generate_key_file, token_vault
+from benchmarks.bench_list_serialization import make_analyses
+
+REPORT = {
+    key: "テストコードは主要な機能に対して継続的に追加されている。" * 8
+    for key in [
+        "test",
+        "comment",
+        "commit_size",
+        "commit_frequency",
+        "commit_message",
+        "activity",
+    ]
+}
+
+
+def write_key_file(directory: str) -> str:
+    """アクセストークンの暗号化鍵（seedとサーバーで同じ鍵を使う）"""
+    path = str(Path(directory) / "token_vault.key")
+    generate_key_file(path)
+    token_vault.key_file = path
+    return path
+
+
+def seed(database_url: str, items: int) -> List[str]:
+    """ユーザー1人と分析items件を作成してIDを返す"""
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    analyses = make_analyses(items)
+    ids = [a.id for a in analyses]
+    for analysis in analyses:
+        analysis.report = REPORT
+        analysis.updated_at = analysis.created_at
+    with Session(engine) as db:
+        db.add(
+            User(
+                id="user",
+                github_id=1,
+                github_username="bench",
+                github_access_token="dummy",
+            )
+        )
+        db.add_all(analyses)
+        db.commit()
+    engine.dispose()
+    return ids
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(
+    workers: int, port: int, env: dict, app: str = "app.main:app"
+) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            app,
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("server did not start")
+
+
+async def load(
+    port: int, token: str, ids: List[str], concurrency: int, duration: float
+) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+
+    async def client_loop(worker: int) -> None:
+        nonlocal errors
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", headers=headers, timeout=30
+        ) as client:
+            i = worker
+            while time.monotonic() < deadline:
+                # 一覧1 : 詳細4 の割合
+                path = "/analyses" if i % 5 == 0 else f"/analyses/{ids[i % len(ids)]}"
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+                i += 1
+
+    await asyncio.gather(*[client_loop(w) for w in range(concurrency)])
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_sec": round(len(latencies) / duration, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    cores = os.cpu_count() or 1
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[n for n in (1, 2, 4, 8) if n <= cores] or [1],
+    )
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--backend", choices=["memory", "database", "redis"], default="database"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        key_file = write_key_file(tmp)
+        ids = seed(database_url, args.items)
+        token = jwt.encode(
+            {"sub": "user", "exp": datetime.now(timezone.utc) + timedelta(hours=1)},
+            settings.jwt_secret_key,
+            algorithm="HS256",
+        )
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "TOKEN_VAULT_KEY_FILE": key_file,
+            "SHARED_STATE_BACKEND": args.backend,
+        }
+
+        results = []
+        for workers in args.workers:
+            port = free_port()
+            process = start_server(
+                workers, port, {**env, "WEB_CONCURRENCY": str(workers)}
+            )
+            try:
+                stats = asyncio.run(
+                    load(port, token, ids, args.concurrency, args.duration)
+                )
+            finally:
+                process.terminate()
+                process.wait()
+            results.append({"workers": workers, **stats})
+
+    baseline = results[0]["req_per_sec"] or 1
+    for result in results:
+        result["speedup"] = round(result["req_per_sec"] / baseline, 2)
+
+    print(
+        json.dumps(
+            {
+                "cpu_count": cores,
+                "backend": args.backend,
+                "concurrency": args.concurrency,
+                "duration_sec": args.duration,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# benchmarks/fake_github.py
+"""
+ベンチマーク用のGitHub REST APIの代替サーバー（ネットワークを使わずローカルで起動）
+
+- commit一覧（per_page / page とLinkヘッダー）・commit詳細・compare・HEAD SHA
+- OAuthのトークン交換と /user（トークン・ユーザーはcodeから決まる）
+- どのリポジトリも同じ件数のcommitを持つ（SHAはリポジトリ名と番号から決まる）
+- 応答の遅延とレート制限（X-RateLimit-*）は環境変数で指定
+    FAKE_GITHUB_LATENCY_SECONDS  1リクエストあたりの遅延（既定 0.02）
+    FAKE_GITHUB_COMMITS          リポジトリあたりのcommit数（既定 500）
+    FAKE_GITHUB_RATE_LIMIT       レート制限の総数。使い切ると403（既定 1000000）
+- GET /_stats で種類ごとの呼び出し回数を返す
+
+起動（backend/ で）:
+    python -m uvicorn benchmarks.fake_github:app --port 9000
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+LATENCY = float(os.environ.get("FAKE_GITHUB_LATENCY_SECONDS", "0.02"))
+COMMITS = int(os.environ.get("FAKE_GITHUB_COMMITS", "500"))
+RATE_LIMIT = int(os.environ.get("FAKE_GITHUB_RATE_LIMIT", "1000000"))
+
+app = FastAPI()
+calls: Counter = Counter()
+remaining = RATE_LIMIT
+reset_at = int(time.time()) + 3600
+
+PATCH = "\n".join(f"+    value_{i} = compute({i})" for i in range(20))
+
+
+def sha_for(owner: str, repo: str, index: int) -> str:
+    """index番目（0が最新）のcommitのSHA"""
+    return hashlib.sha1(f"{owner}/{repo}/{index}".encode()).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def _indexes(owner: str, repo: str) -> Dict[str, int]:
+    return {sha_for(owner, repo, i): i for i in range(COMMITS)}
+
+
+def index_for(owner: str, repo: str, ref: str) -> int:
+    """SHAから番号を引く（ブランチ名など未知のrefは最新として扱う）"""
+    return _indexes(owner, repo).get(ref, 0)
+
+
+def commit_summary(owner: str, repo: str, index: int) -> dict:
+    return {"sha": sha_for(owner, repo, index)}
+
+
+def commit_detail(owner: str, repo: str, index: int) -> dict:
+    return {
+        "sha": sha_for(owner, repo, index),
+        "commit": {
+            "author": {"name": "bench", "date": "2026-01-01T00:00:00Z"},
+            "message": f"Update module {index % 17}\n\nRefactor and add tests.",
+        },
+        "files": [
+            {
+                "filename": f"src/module_{index % 17}.py",
+                "additions": 20,
+                "deletions": index % 5,
+                "patch": PATCH,
+            },
+            {
+                "filename": f"tests/test_module_{index % 17}.py",
+                "additions": 8,
+                "deletions": 0,
+                "patch": PATCH,
+            },
+        ],
+    }
+
+
+@app.middleware("http")
+async def upstream(request: Request, call_next) -> Response:
+    """遅延・レート制限ヘッダー・呼び出し回数（/_statsは対象外）"""
+    global remaining
+    if request.url.path.startswith("/_") or request.url.path == "/":
+        return await call_next(request)
+
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    remaining = max(0, remaining - 1)
+    headers = {
+        "X-RateLimit-Limit": str(RATE_LIMIT),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset_at),
+    }
+    if remaining <= 0:
+        calls["rate_limited"] += 1
+        return JSONResponse(
+            {"message": "API rate limit exceeded"}, status_code=403, headers=headers
+        )
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
+
+
+@app.get("/")
+async def root() -> dict:
+    return {"status": "ok"}
+
+
+@app.get("/_stats")
+async def stats() -> dict:
+    return {"calls": dict(calls), "rate_limit_remaining": remaining}
+
+
+@app.get("/repos/{owner}/{repo}/commits")
+async def list_commits(
+    request: Request, owner: str, repo: str, per_page: int = 30, page: int = 1
+) -> Response:
+    calls["list"] += 1
+    per_page = min(per_page, 100)
+    start = (page - 1) * per_page
+    body = [
+        commit_summary(owner, repo, i)
+        for i in range(start, min(start + per_page, COMMITS))
+    ]
+    last = max(1, -(-COMMITS // per_page))
+    links = []
+    if page < last:
+        next_url = request.url.include_query_params(page=page + 1)
+        last_url = request.url.include_query_params(page=last)
+        links.append(f'<{next_url}>; rel="next"')
+        links.append(f'<{last_url}>; rel="last"')
+    headers = {"Link": ", ".join(links)} if links else {}
+    return JSONResponse(body, headers=headers)
+
+
+@app.get("/repos/{owner}/{repo}/commits/{ref}")
+async def get_commit(request: Request, owner: str, repo: str, ref: str) -> Response:
+    index = index_for(owner, repo, ref)
+    if request.headers.get("Accept") == "application/vnd.github.sha":
+        calls["head_sha"] += 1
+        return PlainTextResponse(sha_for(owner, repo, index))
+    calls["detail"] += 1
+    return JSONResponse(commit_detail(owner, repo, index))
+
+
+@app.get("/repos/{owner}/{repo}/compare/{basehead}")
+async def compare(owner: str, repo: str, basehead: str) -> Response:
+    calls["compare"] += 1
+    base, head = basehead.split("...", 1)
+    base_index = index_for(owner, repo, base)
+    head_index = index_for(owner, repo, head)
+    # compareは古い順
+    commits = [
+        commit_summary(owner, repo, i)
+        for i in range(base_index - 1, head_index - 1, -1)
+    ]
+    return JSONResponse({"commits": commits[-250:]})
+
+
+@app.post("/login/oauth/access_token")
+async def access_token(request: Request) -> dict:
+    calls["oauth_token"] += 1
+    code = parse_qs((await request.body()).decode()).get("code", [""])[0]
+    if not code:
+        return {"error": "bad_verification_code"}
+    return {"access_token": f"gho_{code}", "token_type": "bearer", "scope": ""}
+
+
+@app.get("/user")
+async def user(request: Request) -> Response:
+    calls["user"] += 1
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not token.startswith("gho_"):
+        return JSONResponse({"message": "Bad credentials"}, status_code=401)
+    github_id = int(hashlib.sha1(token.encode()).hexdigest()[:8], 16)
+    return JSONResponse({"id": github_id, "login": f"bench-{github_id}"})
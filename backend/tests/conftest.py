@@ -9,9 +9,12 @@ from datetime import datetime, timedelta
 
 from app.main import app
 from app.database import Base
-from app.dependencies.database import get_db
+from app.dependencies.database import get_db, get_session_factory
 from app.models import User, Analysis
 from app.config import settings
+from app.admission import AdmissionController
+from app.shared_state import MemoryBackend
+from app.token_vault import generate_key_file, token_vault
 
 
 # テスト用インメモリDB
@@ -24,6 +27,14 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@pytest.fixture(scope="session", autouse=True)
+def token_vault_key(tmp_path_factory):
+    """アクセストークンの暗号化鍵（リポジトリの下に鍵ファイルを作らない）"""
+    key_file = str(tmp_path_factory.mktemp("vault") / "token_vault.key")
+    generate_key_file(key_file)
+    token_vault.key_file = key_file
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """テスト用DBセッション（各テストで初期化）"""
@@ -46,11 +57,28 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def admission(monkeypatch):
+    """受付制御（テストごとに同時実行数・回数のカウンターを初期化）"""
+    controller = AdmissionController(
+        max_in_flight=settings.admission_max_in_flight,
+        queue_size=settings.admission_queue_size,
+        queue_timeout=settings.admission_queue_timeout_seconds,
+        user_max_concurrency=settings.admission_user_max_concurrency,
+        user_rate_limit=settings.admission_user_rate_limit,
+        user_rate_window=settings.admission_user_rate_window_seconds,
+    )
+    monkeypatch.setattr("app.dependencies.admission.admission", controller)
+    monkeypatch.setattr("app.admission.shared_state", MemoryBackend())
+    return controller
+
+
 @pytest.fixture
 def test_user(db_session):
     """テスト用ユーザー"""
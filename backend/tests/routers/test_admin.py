@@ -0,0 +1,141 @@
+# tests/routers/test_admin.py
+import pytest
+
+from app.config import settings
+from app.profiler import ProfileStore, profiler
+from app.services.llm_backends import TokenUsage
+
+PROFILE_ID = "0" * 31 + "1"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """プロファイルの保存先（テストごとに空のディレクトリ）"""
+    store = ProfileStore(str(tmp_path), max_profiles=10)
+    monkeypatch.setattr(profiler, "store", store)
+    return store
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(settings, "admin_github_usernames", "admin, testuser")
+
+
+def saved_profile(store):
+    store.save(
+        {
+            "id": PROFILE_ID,
+            "method": "POST",
+            "path": "/analyses",
+            "status_code": 200,
+            "started_at": "2026-01-01T00:00:00+00:00",
+            "duration_ms": 1500.0,
+            "reason": "slow",
+            "interval_ms": 5.0,
+            "samples": 3,
+            "by_state": {"running": 1, "waiting": 2},
+            "by_module": {"json": 1},
+            "stacks": [
+                {"stack": "[waiting];app.x;<Future>", "count": 2},
+                {"stack": "[running];app.x;json.loads", "count": 1},
+            ],
+        }
+    )
+
+
+class TestGetProfiles:
+    """
+    GET /admin/profiles
+    保存されたプロファイルの一覧
+    """
+
+    def test_success(self, client, auth_header, store, admin):
+        """正常系：管理者は一覧を取得できる（スタックは含まない）"""
+        saved_profile(store)
+
+        response = client.get("/admin/profiles", headers=auth_header)
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data[0]["id"] == PROFILE_ID
+        assert data[0]["by_module"] == {"json": 1}
+        assert "stacks" not in data[0]
+
+    def test_not_admin_403(self, client, auth_header, store):
+        """異常系：管理者以外は403"""
+        response = client.get("/admin/profiles", headers=auth_header)
+
+        assert response.status_code == 403
+        assert response.json()["code"] == "FORBIDDEN"
+
+    def test_no_token_401(self, client):
+        """異常系：トークンなし"""
+        response = client.get("/admin/profiles")
+
+        assert response.status_code == 401
+
+
+class TestDownloadProfile:
+    """
+    GET /admin/profiles/{id}
+    プロファイルのダウンロード
+    """
+
+    def test_json(self, client, auth_header, store, admin):
+        """正常系：JSONでダウンロード"""
+        saved_profile(store)
+
+        response = client.get(f"/admin/profiles/{PROFILE_ID}", headers=auth_header)
+
+        assert response.status_code == 200
+        assert "attachment" in response.headers["content-disposition"]
+        assert response.json()["stacks"][0]["count"] == 2
+
+    def test_folded(self, client, auth_header, store, admin):
+        """正常系：flamegraph用の形式でダウンロード"""
+        saved_profile(store)
+
+        response = client.get(
+            f"/admin/profiles/{PROFILE_ID}?format=folded", headers=auth_header
+        )
+
+        assert response.status_code == 200
+        assert response.text.splitlines() == [
+            "[waiting];app.x;<Future> 2",
+            "[running];app.x;json.loads 1",
+        ]
+
+    def test_not_found_404(self, client, auth_header, store, admin):
+        """異常系：存在しないID"""
+        response = client.get(f"/admin/profiles/{'f' * 32}", headers=auth_header)
+
+        assert response.status_code == 404
+        assert response.json()["code"] == "PROFILE_NOT_FOUND"
+
+
+class TestGetLLMUsage:
+    """
+    GET /admin/llm-usage
+    LLM呼び出しのトークン数
+    """
+
+    def test_success(self, client, auth_header, admin, monkeypatch):
+        """正常系：管理者は集計を取得できる"""
+        usage = TokenUsage()
+        usage.calls = 2
+        usage.prompt_tokens = 200
+        usage.cached_tokens = 150
+        monkeypatch.setattr("app.routers.admin.llm_usage", usage)
+
+        response = client.get("/admin/llm-usage", headers=auth_header)
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["calls"] == 2
+        assert data["cached_ratio"] == 0.75
+
+    def test_not_admin_403(self, client, auth_header):
+        """異常系：管理者以外は403"""
+        response = client.get("/admin/llm-usage", headers=auth_header)
+
+        assert response.status_code == 403
@@ -2,8 +2,12 @@
 """
 /analyses エンドポイントのテスト
 """
+import json
+import pytest
 from unittest.mock import patch
 
+from app.models.analysis import SCORE_KEYS
+
 
 class TestGetAnalyses:
     """
@@ -28,6 +32,139 @@ class TestGetAnalyses:
         assert response.status_code == 200
         assert response.json()["data"] == []
 
+    def test_report_not_loaded(self, client, auth_header, test_analysis, db_session):
+        """正常系：一覧ではレポート本文（遅延ロード）を読み込まない"""
+        from sqlalchemy import inspect
+        from app.models import Analysis
+
+        analysis_id = test_analysis.id
+        db_session.expunge_all()
+        client.get("/analyses", headers=auth_header)
+
+        analysis = db_session.query(Analysis).filter(
+            Analysis.id == analysis_id
+        ).first()
+        assert "report_compressed" in inspect(analysis).unloaded
+
+    @staticmethod
+    def add_analysis(db_session, user, repo, test_score, activity_score):
+        from app.models import Analysis
+
+        analysis = Analysis(
+            user_id=user.id,
+            repo_url=f"https://github.com/testuser/{repo}",
+            branch="main",
+            scores={
+                "test": test_score, "comment": 70, "commit_size": 90,
+                "commit_frequency": 85, "commit_message": 75,
+                "activity": activity_score
+            },
+            report={
+                "test": "G", "comment": "G", "commit_size": "G",
+                "commit_frequency": "G", "commit_message": "G", "activity": "G"
+            },
+        )
+        db_session.add(analysis)
+        db_session.commit()
+
+    def test_filter_by_score(self, client, auth_header, test_user, db_session):
+        """正常系：スコアで絞り込み（max_test=49 → test < 50）"""
+        self.add_analysis(db_session, test_user, "low", 30, 50)
+        self.add_analysis(db_session, test_user, "high", 90, 60)
+
+        response = client.get(
+            "/analyses", headers=auth_header, params={"max_test": 49}
+        )
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert [a["repo_url"] for a in data] == ["https://github.com/testuser/low"]
+
+    def test_sort_by_score(self, client, auth_header, test_user, db_session):
+        """正常系：スコアで並び替え（activityの高い順）"""
+        self.add_analysis(db_session, test_user, "a", 50, 40)
+        self.add_analysis(db_session, test_user, "b", 50, 95)
+        self.add_analysis(db_session, test_user, "c", 50, 70)
+
+        response = client.get(
+            "/analyses", headers=auth_header, params={"sort_by": "activity"}
+        )
+
+        data = response.json()["data"]
+        assert [a["scores"]["activity"] for a in data] == [95, 70, 40]
+
+    def test_invalid_sort_by_422(self, client, auth_header):
+        """異常系：不正な並び替えキー"""
+        response = client.get(
+            "/analyses", headers=auth_header, params={"sort_by": "memo"}
+        )
+
+        assert response.status_code == 422
+
+    def test_score_filter_over_100_422(self, client, auth_header):
+        """異常系：スコアの範囲外（境界値）"""
+        response = client.get(
+            "/analyses", headers=auth_header, params={"min_test": 101}
+        )
+
+        assert response.status_code == 422
+
+    def test_window_limit_success(self, client, auth_header):
+        """正常系：sinceを指定するとlimit=300（境界値）まで、絞り込みは取得に渡る"""
+        with patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits") as mock_gem:
+            mock_gh.return_value = "commit"
+            mock_gem.return_value = {
+                "scores": {"test": 80, "comment": 70, "commit_size": 90,
+                          "commit_frequency": 85, "commit_message": 75, "activity": 80},
+                "report": {"test": "G", "comment": "G", "commit_size": "G",
+                          "commit_frequency": "G", "commit_message": "G", "activity": "G"}
+            }
+
+            response = client.post(
+                "/analyses",
+                headers=auth_header,
+                json={
+                    "repo_url": "https://github.com/user/repo",
+                    "limit": 300,
+                    "since": "2026-01-01T00:00:00",
+                    "until": "2026-02-01T09:00:00+09:00",
+                    "author": "dev",
+                    "path": "src/app",
+                }
+            )
+
+            assert response.status_code == 200
+            commit_filter = mock_gh.call_args.kwargs["commit_filter"]
+            assert mock_gh.call_args.args[2] == 300
+            assert commit_filter.api_params() == {
+                "since": "2026-01-01T00:00:00Z",
+                "until": "2026-02-01T00:00:00Z",
+                "author": "dev",
+                "path": "src/app",
+            }
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {"limit": 301, "since": "2026-01-01T00:00:00Z"},
+            {"since": "2026-02-01T00:00:00Z", "until": "2026-01-01T00:00:00Z"},
+            {"incremental": True, "author": "dev"},
+            {"path": "../etc"},
+            {"path": "-p"},
+            {"author": "dev\nx"},
+        ],
+    )
+    def test_invalid_window_422(self, client, auth_header, body):
+        """異常系：limitの上限超過・逆転した期間・差分分析との併用・不正なパスや作者"""
+        response = client.post(
+            "/analyses",
+            headers=auth_header,
+            json={"repo_url": "https://github.com/user/repo", **body},
+        )
+
+        assert response.status_code == 422
+
     def test_no_token_401(self, client):
         """異常系：未認証"""
         response = client.get("/analyses")
@@ -53,6 +190,26 @@ class TestGetAnalysisDetail:
         assert data["id"] == test_analysis.id
         assert data["scores"]["test"] == 80
 
+    def test_datetime_format(self, client, auth_header, test_analysis):
+        """正常系：日時はisoformatの文字列で返る"""
+        response = client.get(
+            f"/analyses/{test_analysis.id}",
+            headers=auth_header
+        )
+
+        data = response.json()["data"]
+        assert data["created_at"] == test_analysis.created_at.isoformat()
+        assert data["updated_at"] == test_analysis.updated_at.isoformat()
+
+    def test_report_decompressed(self, client, auth_header, test_analysis):
+        """正常系：圧縮保存したレポートが展開されて返る"""
+        response = client.get(
+            f"/analyses/{test_analysis.id}",
+            headers=auth_header
+        )
+
+        assert response.json()["data"]["report"]["test"] == "Good test coverage"
+
     def test_not_found_404(self, client, auth_header):
         """異常系：存在しないID"""
         response = client.get(
@@ -242,6 +399,50 @@ class TestCreateAnalysis:
 
         assert response.status_code == 422
 
+    @pytest.mark.parametrize(
+        "branch",
+        [
+            "--upload-pack=touch /tmp/x",
+            "-x",
+            "main?ref=x",
+            "main#x",
+            "a..b",
+            "feature branch",
+            "main\t",
+            "main.lock",
+            "refs/.hidden",
+            "main@{1}",
+            "main;rm",
+        ],
+    )
+    def test_invalid_branch_422(self, client, auth_header, branch):
+        """異常系：gitのref名として不正なブランチ名"""
+        response = client.post(
+            "/analyses",
+            headers=auth_header,
+            json={"repo_url": "https://github.com/user/repo", "branch": branch},
+        )
+
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize("path", ["/analyses", "/analyses/stream", "/analyses/batch"])
+    def test_unreadable_github_token_401(
+        self, client, auth_header, db_session, test_user, path
+    ):
+        """異常系：保存したトークンを復号できない（鍵が違う）→ 401で再ログインを求める"""
+        test_user.github_access_token_encrypted = "v1.00000000.AAAA"
+        db_session.commit()
+        item = {"repo_url": "https://github.com/user/repo", "branch": "main"}
+
+        response = client.post(
+            path,
+            headers=auth_header,
+            json={"items": [item]} if path.endswith("/batch") else item,
+        )
+
+        assert response.status_code == 401
+        assert response.json()["code"] == "GITHUB_REAUTH_REQUIRED"
+
     def test_limit_boundary_min_success(self, client, auth_header):
         """正常系：limit=1（境界値）"""
         with patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
@@ -310,4 +511,724 @@ class TestCreateAnalysis:
         )
 
         assert response.status_code == 500
-        assert response.json()["code"] == "GEMINI_API_ERROR"
\ No newline at end of file
+        assert response.json()["code"] == "GEMINI_API_ERROR"
+
+    @patch("app.services.analysis_service.fetch_commits_from_github")
+    @patch("app.services.analysis_service.analyze_commits")
+    def test_gemini_circuit_open_503(self, mock_gemini, mock_github, client, auth_header):
+        """異常系：Geminiが劣化中（サーキットブレーカーが開いている）→ 503で即座に失敗"""
+        from app.services.resilience import CircuitOpenError
+
+        mock_github.return_value = "=== Commit: abc1234 ===\nMessage: test"
+        mock_gemini.side_effect = CircuitOpenError("circuit is open")
+
+        response = client.post(
+            "/analyses",
+            headers=auth_header,
+            json={"repo_url": "https://github.com/testuser/testrepo"},
+        )
+
+        assert response.status_code == 503
+        assert response.json()["code"] == "GEMINI_API_UNAVAILABLE"
+
+class TestCreateBatchAnalysis:
+    """
+    POST /analyses/batch
+    複数リポジトリを一括分析
+    """
+
+    @patch("app.services.analysis_service.fetch_commits_from_github")
+    @patch("app.services.analysis_service.analyze_commits")
+    def test_success_with_partial_error(
+        self, mock_gemini, mock_github, client, auth_header, db_session
+    ):
+        """正常系：成功と失敗が混在（失敗分は行単位でエラー）"""
+        from app.exceptions import AppException, ErrorCode
+        from app.models import Analysis
+
+        def fake_github(repo_url, branch, limit, access_token, **kwargs):
+            if repo_url.endswith("/broken"):
+                raise AppException(400, ErrorCode.GITHUB_API_ERROR, "Not Found")
+            return "=== Commit: abc1234 ===\nMessage: test"
+
+        mock_github.side_effect = fake_github
+        mock_gemini.return_value = {
+            "scores": {
+                "test": 80, "comment": 70, "commit_size": 90,
+                "commit_frequency": 85, "commit_message": 75, "activity": 80
+            },
+            "report": {
+                "test": "Good", "comment": "OK", "commit_size": "Small",
+                "commit_frequency": "Regular", "commit_message": "Clear",
+                "activity": "Active"
+            }
+        }
+
+        response = client.post(
+            "/analyses/batch",
+            headers=auth_header,
+            json={
+                "items": [
+                    {"repo_url": "https://github.com/testuser/repo1"},
+                    {"repo_url": "https://github.com/testuser/broken"},
+                    {"repo_url": "https://github.com/testuser/repo2"},
+                ]
+            }
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        items = sorted(lines[:-1], key=lambda item: item["index"])
+        assert [item["status"] for item in items] == ["success", "error", "success"]
+        assert items[1]["code"] == "GITHUB_API_ERROR"
+        assert lines[-1] == {"status": "done", "succeeded": 2, "failed": 1}
+
+        # 成功分だけがDBに保存されていることを確認
+        saved = db_session.query(Analysis).all()
+        assert {a.id for a in saved} == {items[0]["data"]["id"], items[2]["data"]["id"]}
+
+    def test_empty_items_422(self, client, auth_header):
+        """異常系：itemsが空"""
+        response = client.post(
+            "/analyses/batch",
+            headers=auth_header,
+            json={"items": []}
+        )
+
+        assert response.status_code == 422
+
+    def test_no_token_401(self, client):
+        """異常系：未認証"""
+        response = client.post(
+            "/analyses/batch",
+            json={"items": [{"repo_url": "https://github.com/user/repo"}]}
+        )
+
+        assert response.status_code == 401
+
+
+class TestCreateAnalysisStream:
+    """
+    POST /analyses/stream
+    分析を実行して進捗をSSEで返す
+    """
+
+    @staticmethod
+    def parse_events(text):
+        events = []
+        for block in text.strip().split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in block.splitlines())
+            events.append((lines["event"], json.loads(lines["data"])))
+        return events
+
+    @patch("app.services.analysis_service.fetch_commits_from_github")
+    def test_success(self, mock_github, client, auth_header):
+        """正常系：進捗イベント → token → result"""
+        mock_github.return_value = "=== Commit: abc1234 ===\nMessage: test"
+        result = json.dumps({
+            "scores": {
+                "test": 80, "comment": 70, "commit_size": 90,
+                "commit_frequency": 85, "commit_message": 75, "activity": 80
+            },
+            "report": {
+                "test": "Good", "comment": "OK", "commit_size": "Small",
+                "commit_frequency": "Regular", "commit_message": "Clear",
+                "activity": "Active"
+            }
+        })
+
+        async def fake_stream(parsed_log, previous_scores=None):
+            yield result[:20]
+            yield result[20:]
+
+        with patch(
+            "app.services.analysis_service.stream_analyze_commits", new=fake_stream
+        ):
+            response = client.post(
+                "/analyses/stream",
+                headers=auth_header,
+                json={
+                    "repo_url": "https://github.com/testuser/testrepo",
+                    "branch": "main",
+                    "limit": 10
+                }
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = self.parse_events(response.text)
+        assert [name for name, _ in events] == ["prompt", "token", "token", "result"]
+        assert "".join(data["text"] for name, data in events if name == "token") == result
+        assert events[-1][1]["scores"]["test"] == 80
+
+    @patch("app.services.analysis_service.fetch_commits_from_github")
+    def test_result_validated(self, mock_github, client, auth_header):
+        """正常系：生成された出力は検証してから保存（範囲外のスコアは0〜100に収める）"""
+        mock_github.return_value = "=== Commit: abc1234 ===\nMessage: test"
+        result = json.dumps({
+            "scores": {
+                "test": 120, "comment": 70, "commit_size": 90,
+                "commit_frequency": 85, "commit_message": 75, "activity": -3
+            },
+            "report": {
+                "test": "Good", "comment": "OK", "commit_size": "Small",
+                "commit_frequency": "Regular", "commit_message": "Clear",
+                "activity": "Active"
+            }
+        })
+
+        async def fake_stream(parsed_log, previous_scores=None):
+            yield "```json\n"
+            yield result
+            yield "\n```"
+
+        with patch(
+            "app.services.analysis_service.stream_analyze_commits", new=fake_stream
+        ):
+            response = client.post(
+                "/analyses/stream",
+                headers=auth_header,
+                json={"repo_url": "https://github.com/testuser/testrepo"}
+            )
+
+        events = self.parse_events(response.text)
+        assert events[-1][0] == "result"
+        assert events[-1][1]["scores"]["test"] == 100
+        assert events[-1][1]["scores"]["activity"] == 0
+
+    @patch("app.services.analysis_service.fetch_commits_from_github")
+    def test_gemini_error_event(self, mock_github, client, auth_header):
+        """異常系：Geminiのエラーはerrorイベントで通知"""
+        mock_github.return_value = "=== Commit: abc1234 ===\nMessage: test"
+
+        async def fake_stream(parsed_log, previous_scores=None):
+            yield '{"scores": '
+            raise TimeoutError("Gemini API timeout")
+
+        with patch(
+            "app.services.analysis_service.stream_analyze_commits", new=fake_stream
+        ):
+            response = client.post(
+                "/analyses/stream",
+                headers=auth_header,
+                json={"repo_url": "https://github.com/testuser/testrepo"}
+            )
+
+        events = self.parse_events(response.text)
+        assert events[-1][0] == "error"
+        assert events[-1][1]["code"] == "GEMINI_API_ERROR"
+
+    @patch("app.services.analysis_service.fetch_commits_from_github")
+    def test_unexpected_error_event(self, mock_github, client, auth_header):
+        """異常系：想定外の例外（保存の失敗など）もINTERNAL_ERRORのerrorイベントで終える"""
+        mock_github.return_value = "=== Commit: abc1234 ===\nMessage: test"
+        result = json.dumps({
+            "scores": {key: 50 for key in SCORE_KEYS},
+            "report": {key: "OK" for key in SCORE_KEYS},
+        })
+
+        async def fake_stream(parsed_log, previous_scores=None):
+            yield result
+
+        with patch(
+            "app.services.analysis_service.stream_analyze_commits", new=fake_stream
+        ), patch(
+            "app.services.analysis_service._save_analysis",
+            side_effect=RuntimeError("database is locked"),
+        ):
+            response = client.post(
+                "/analyses/stream",
+                headers=auth_header,
+                json={"repo_url": "https://github.com/testuser/testrepo"}
+            )
+
+        events = self.parse_events(response.text)
+        assert events[-1] == (
+            "error", {"code": "INTERNAL_ERROR", "message": "Internal server error"}
+        )
+
+    def test_no_token_401(self, client):
+        """異常系：未認証"""
+        response = client.post(
+            "/analyses/stream",
+            json={"repo_url": "https://github.com/user/repo"}
+        )
+
+        assert response.status_code == 401
+
+
+class TestGetTrends:
+    """
+    GET /analyses/trends
+    スコア推移を取得
+    """
+
+    @staticmethod
+    def create(client, auth_header, test_score):
+        with patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits") as mock_gem:
+            mock_gh.return_value = "commit"
+            mock_gem.return_value = {
+                "scores": {"test": test_score, "comment": 70, "commit_size": 90,
+                          "commit_frequency": 85, "commit_message": 75, "activity": 80},
+                "report": {"test": "G", "comment": "G", "commit_size": "G",
+                          "commit_frequency": "G", "commit_message": "G", "activity": "G"}
+            }
+            response = client.post(
+                "/analyses",
+                headers=auth_header,
+                json={"repo_url": "https://github.com/user/repo", "branch": "main"}
+            )
+        return response.json()["data"]["id"]
+
+    def test_success(self, client, auth_header):
+        """正常系：作成時に集計され、平均・最小・最大が返る"""
+        self.create(client, auth_header, 40)
+        self.create(client, auth_header, 80)
+
+        response = client.get(
+            "/analyses/trends",
+            headers=auth_header,
+            params={"repo_url": "https://github.com/user/repo", "bucket": "month"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert len(data) == 1
+        assert data[0]["count"] == 2
+        assert data[0]["bucket_start"].endswith("-01")
+        assert data[0]["scores"]["test"] == {"avg": 60.0, "min": 40, "max": 80}
+
+    def test_rebuilt_after_delete(self, client, auth_header):
+        """正常系：削除後は残りの分析から集計し直す"""
+        self.create(client, auth_header, 40)
+        analysis_id = self.create(client, auth_header, 80)
+
+        client.delete(f"/analyses/{analysis_id}", headers=auth_header)
+
+        data = client.get("/analyses/trends", headers=auth_header).json()["data"]
+        assert data[0]["count"] == 1
+        assert data[0]["scores"]["test"] == {"avg": 40.0, "min": 40, "max": 40}
+
+    def test_other_user_empty(self, client, auth_header, other_auth_header):
+        """認可：他人の集計は見えない"""
+        self.create(client, auth_header, 40)
+
+        response = client.get("/analyses/trends", headers=other_auth_header)
+
+        assert response.status_code == 200
+        assert response.json()["data"] == []
+
+    def test_invalid_bucket_422(self, client, auth_header):
+        """異常系：不正な集計単位"""
+        response = client.get(
+            "/analyses/trends", headers=auth_header, params={"bucket": "year"}
+        )
+
+        assert response.status_code == 422
+
+    def test_no_token_401(self, client):
+        """異常系：未認証"""
+        response = client.get("/analyses/trends")
+
+        assert response.status_code == 401
+
+
+class TestHttpCache:
+    """
+    GET /analyses, GET /analyses/{id}
+    ETag / Last-Modified による条件付きリクエスト
+    """
+
+    def test_detail_304(self, client, auth_header, test_analysis):
+        """正常系：同じETagなら304（ボディなし）"""
+        first = client.get(f"/analyses/{test_analysis.id}", headers=auth_header)
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+        assert "last-modified" in first.headers
+
+        second = client.get(
+            f"/analyses/{test_analysis.id}",
+            headers={**auth_header, "If-None-Match": etag}
+        )
+
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+
+    def test_detail_changed_after_update(self, client, auth_header, test_analysis):
+        """正常系：メモ更新後は古いETagでも200"""
+        etag = client.get(
+            f"/analyses/{test_analysis.id}", headers=auth_header
+        ).headers["etag"]
+
+        client.patch(
+            f"/analyses/{test_analysis.id}",
+            headers=auth_header,
+            json={"memo": "changed"}
+        )
+        response = client.get(
+            f"/analyses/{test_analysis.id}",
+            headers={**auth_header, "If-None-Match": etag}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["data"]["memo"] == "changed"
+
+    def test_detail_if_modified_since(self, client, auth_header, test_analysis):
+        """正常系：If-Modified-Since が最終更新以降なら304"""
+        last_modified = client.get(
+            f"/analyses/{test_analysis.id}", headers=auth_header
+        ).headers["last-modified"]
+
+        response = client.get(
+            f"/analyses/{test_analysis.id}",
+            headers={**auth_header, "If-Modified-Since": last_modified}
+        )
+
+        assert response.status_code == 304
+
+    def test_list_304_and_changed_after_delete(
+        self, client, auth_header, test_analysis
+    ):
+        """正常系：一覧も304になり、削除後は版が変わる"""
+        etag = client.get("/analyses", headers=auth_header).headers["etag"]
+
+        response = client.get(
+            "/analyses", headers={**auth_header, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        client.delete(f"/analyses/{test_analysis.id}", headers=auth_header)
+        response = client.get(
+            "/analyses", headers={**auth_header, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.json()["data"] == []
+
+    def test_list_etag_depends_on_query(self, client, auth_header, test_analysis):
+        """正常系：絞り込み条件が違えば別のETag"""
+        etag = client.get("/analyses", headers=auth_header).headers["etag"]
+
+        response = client.get(
+            "/analyses",
+            headers={**auth_header, "If-None-Match": etag},
+            params={"sort_by": "test"}
+        )
+
+        assert response.status_code == 200
+
+    def test_other_user_etag_not_shared(
+        self, client, auth_header, other_auth_header, test_analysis
+    ):
+        """認可：他人のETagを送っても中身は返らない"""
+        etag = client.get(
+            f"/analyses/{test_analysis.id}", headers=auth_header
+        ).headers["etag"]
+
+        response = client.get(
+            f"/analyses/{test_analysis.id}",
+            headers={**other_auth_header, "If-None-Match": etag}
+        )
+
+        assert response.status_code == 404
+
+
+class TestCompression:
+    """
+    GET /analyses, GET /analyses/{id}
+    Accept-Encodingに応じたレスポンス圧縮
+    """
+
+    @staticmethod
+    def add_large_analysis(db_session, user):
+        from app.models import Analysis
+
+        paragraph = "テストコードが継続的に追加されており、品質への意識が高い。" * 20
+        analysis = Analysis(
+            id="large-analysis-id",
+            user_id=user.id,
+            repo_url="https://github.com/testuser/large",
+            branch="main",
+            scores={
+                "test": 80, "comment": 70, "commit_size": 90,
+                "commit_frequency": 85, "commit_message": 75, "activity": 80
+            },
+            report={
+                "test": paragraph, "comment": paragraph, "commit_size": paragraph,
+                "commit_frequency": paragraph, "commit_message": paragraph,
+                "activity": paragraph
+            },
+        )
+        db_session.add(analysis)
+        db_session.commit()
+        return analysis
+
+    def test_detail_gzip_cached(self, client, auth_header, test_user, db_session):
+        """正常系：大きい詳細はgzipで返り、圧縮済みボディがキャッシュされる"""
+        from app.compression import report_cache
+
+        analysis = self.add_large_analysis(db_session, test_user)
+        headers = {**auth_header, "Accept-Encoding": "gzip"}
+
+        response = client.get(f"/analyses/{analysis.id}", headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.headers["etag"].endswith('-gzip"')
+        assert response.json()["data"]["report"]["test"] == analysis.report["test"]
+        key = (analysis.id, analysis.updated_at.isoformat(), "gzip")
+        assert report_cache.get(key) is not None
+
+        # 圧縮表現のETagでも304
+        response = client.get(
+            f"/analyses/{analysis.id}",
+            headers={**headers, "If-None-Match": response.headers["etag"]}
+        )
+        assert response.status_code == 304
+
+    def test_identity_not_compressed(
+        self, client, auth_header, test_user, db_session
+    ):
+        """正常系：Accept-Encodingが無ければ圧縮しない"""
+        analysis = self.add_large_analysis(db_session, test_user)
+
+        response = client.get(
+            f"/analyses/{analysis.id}",
+            headers={**auth_header, "Accept-Encoding": "identity"}
+        )
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+
+    def test_list_compressed_by_middleware(
+        self, client, auth_header, test_user, db_session
+    ):
+        """正常系：一覧はミドルウェアで圧縮される"""
+        for i in range(10):
+            TestGetAnalyses.add_analysis(db_session, test_user, f"repo{i}", 50, 50)
+
+        response = client.get(
+            "/analyses", headers={**auth_header, "Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["data"]) == 10
+
+    def test_small_body_not_compressed(self, client, auth_header):
+        """正常系：最小サイズ未満は圧縮しない"""
+        response = client.get(
+            "/analyses", headers={**auth_header, "Accept-Encoding": "gzip"}
+        )
+
+        assert "content-encoding" not in response.headers
+
+
+class TestIncrementalAnalysis:
+    """
+    POST /analyses（incremental=true）
+    前回の分析以降のcommitだけを分析
+    """
+
+    RESULT = {
+        "scores": {
+            "test": 60, "comment": 70, "commit_size": 90,
+            "commit_frequency": 85, "commit_message": 75, "activity": 80
+        },
+        "report": {
+            "test": "G", "comment": "G", "commit_size": "G",
+            "commit_frequency": "G", "commit_message": "G", "activity": "G"
+        }
+    }
+
+    def post(self, client, auth_header, head_sha):
+        with patch("app.services.analysis_service.fetch_head_sha") as mock_head, \
+             patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits") as mock_gem:
+            mock_head.return_value = head_sha
+            mock_gh.return_value = "=== Commit: abc1234 ===\nMessage: test"
+            mock_gem.return_value = self.RESULT
+            response = client.post(
+                "/analyses",
+                headers=auth_header,
+                json={
+                    "repo_url": "https://github.com/testuser/testrepo",
+                    "branch": "main",
+                    "incremental": True
+                }
+            )
+        return response, mock_gh, mock_gem
+
+    def test_first_run_records_head_sha(self, client, auth_header, db_session):
+        """正常系：初回はHEADに固定して全件取得し、HEAD SHAを記録"""
+        from app.models import Analysis
+
+        response, mock_gh, mock_gem = self.post(client, auth_header, "sha-1")
+
+        assert response.status_code == 200
+        args, kwargs = mock_gh.call_args
+        assert args[1] == "sha-1"
+        assert kwargs["base_sha"] is None
+        assert mock_gem.call_args.args[1] is None
+        saved = db_session.query(Analysis).one()
+        assert saved.head_sha == "sha-1"
+
+    def test_only_new_commits_with_previous_scores(self, client, auth_header):
+        """正常系：2回目は前回のSHA以降だけを、前回スコアと一緒に渡す"""
+        first, _, _ = self.post(client, auth_header, "sha-1")
+
+        response, mock_gh, mock_gem = self.post(client, auth_header, "sha-2")
+
+        assert response.status_code == 200
+        assert response.json()["data"]["id"] != first.json()["data"]["id"]
+        assert mock_gh.call_args.kwargs["base_sha"] == "sha-1"
+        assert mock_gem.call_args.args[1] == self.RESULT["scores"]
+
+    def test_no_new_commits_returns_previous(self, client, auth_header, db_session):
+        """正常系：HEADが変わっていなければGeminiを呼ばず前回の分析を返す"""
+        from app.models import Analysis
+
+        first, _, _ = self.post(client, auth_header, "sha-1")
+
+        response, mock_gh, mock_gem = self.post(client, auth_header, "sha-1")
+
+        assert response.status_code == 200
+        assert response.json()["data"]["id"] == first.json()["data"]["id"]
+        mock_gh.assert_not_called()
+        mock_gem.assert_not_called()
+        assert db_session.query(Analysis).count() == 1
+
+
+class TestRescoreAnalysis:
+    """
+    POST /analyses/{analysis_id}/rescore
+    保存したcommitのアーカイブで分析し直す
+    """
+
+    RESULT = {
+        "scores": {
+            "test": 10, "comment": 20, "commit_size": 30,
+            "commit_frequency": 40, "commit_message": 50, "activity": 60
+        },
+        "report": {
+            "test": "R", "comment": "R", "commit_size": "R",
+            "commit_frequency": "R", "commit_message": "R", "activity": "R"
+        }
+    }
+
+    def archive(self, db_session, analysis):
+        from app.services.commit_archive import pack_commits
+
+        analysis.commits_compressed = pack_commits([
+            {
+                "sha": "a" * 40,
+                "commit": {
+                    "author": {"name": "dev", "date": "2026-01-01T00:00:00Z"},
+                    "message": "archived commit",
+                },
+                "files": [{"filename": "app.py", "additions": 1, "deletions": 0}],
+            }
+        ])
+        db_session.commit()
+
+    def test_success(self, client, auth_header, db_session, test_analysis):
+        """正常系：アーカイブのcommitで分析し直し、スコアとレポートを更新"""
+        self.archive(db_session, test_analysis)
+
+        with patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits") as mock_gem:
+            mock_gem.return_value = self.RESULT
+            response = client.post(
+                f"/analyses/{test_analysis.id}/rescore", headers=auth_header
+            )
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["id"] == test_analysis.id
+        assert data["scores"]["test"] == 10
+        assert data["report"]["test"] == "R"
+        assert "Message: archived commit" in mock_gem.call_args.args[0]
+        mock_gh.assert_not_called()
+
+    def test_no_archive_404(self, client, auth_header, test_analysis):
+        """異常系：アーカイブの無い分析"""
+        response = client.post(
+            f"/analyses/{test_analysis.id}/rescore", headers=auth_header
+        )
+
+        assert response.status_code == 404
+        assert response.json()["code"] == "COMMIT_ARCHIVE_NOT_FOUND"
+
+    def test_other_user_404(
+        self, client, other_auth_header, db_session, test_analysis
+    ):
+        """異常系：他人の分析"""
+        self.archive(db_session, test_analysis)
+
+        response = client.post(
+            f"/analyses/{test_analysis.id}/rescore", headers=other_auth_header
+        )
+
+        assert response.status_code == 404
+        assert response.json()["code"] == "ANALYSIS_NOT_FOUND"
+
+
+class TestAdmission:
+    """
+    POST /analyses, /analyses/batch
+    受付制御（429 + Retry-After）
+    """
+
+    def test_rate_limit_429(self, client, auth_header, admission):
+        """異常系：回数制限を超えたら429"""
+        admission.user_rate_limit = 1
+        with patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits") as mock_gem:
+            mock_gh.return_value = "commit"
+            mock_gem.return_value = {
+                "scores": {"test": 80, "comment": 70, "commit_size": 90,
+                          "commit_frequency": 85, "commit_message": 75, "activity": 80},
+                "report": {"test": "G", "comment": "G", "commit_size": "G",
+                          "commit_frequency": "G", "commit_message": "G", "activity": "G"}
+            }
+            body = {"repo_url": "https://github.com/user/repo", "branch": "main"}
+            assert client.post("/analyses", headers=auth_header, json=body).status_code == 200
+
+            response = client.post("/analyses", headers=auth_header, json=body)
+
+        assert response.status_code == 429
+        assert response.json()["code"] == "RATE_LIMIT_EXCEEDED"
+        assert int(response.headers["Retry-After"]) >= 1
+        # 受付後は枠が返されている
+        assert admission.in_flight == 0
+
+    def test_server_busy_429(self, client, auth_header, admission):
+        """異常系：全体の上限に達していて待ち行列も無ければ429 SERVER_BUSY"""
+        admission.max_in_flight = 0
+        admission.queue_size = 0
+
+        response = client.post(
+            "/analyses/stream",
+            headers=auth_header,
+            json={"repo_url": "https://github.com/user/repo", "branch": "main"},
+        )
+
+        assert response.status_code == 429
+        assert response.json()["code"] == "SERVER_BUSY"
+        assert "Retry-After" in response.headers
+
+    def test_batch_counts_items(self, client, auth_header, admission):
+        """異常系：一括分析は件数分を回数に数える"""
+        admission.user_rate_limit = 2
+        item = {"repo_url": "https://github.com/user/repo", "branch": "main"}
+
+        response = client.post(
+            "/analyses/batch", headers=auth_header, json={"items": [item] * 3}
+        )
+
+        assert response.status_code == 429
+        assert response.json()["code"] == "RATE_LIMIT_EXCEEDED"
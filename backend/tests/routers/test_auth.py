@@ -2,9 +2,13 @@
 """
 /auth エンドポイントのテスト
 """
+from unittest.mock import AsyncMock, patch
+
 from jose import jwt
 from datetime import datetime, timedelta
 from app.config import settings
+from app.models import User
+from app.services.auth_service import github_oauth
 
 
 class TestGetAuthMe:
@@ -49,4 +53,65 @@ class TestGetAuthMe:
             headers={"Authorization": f"Bearer {token}"}
         )
         
-        assert response.status_code == 401
\ No newline at end of file
+        assert response.status_code == 401
+
+
+class TestGitHubCallback:
+    """
+    POST /auth/github/callback
+    GitHub OAuthのcodeでログイン
+    """
+
+    @staticmethod
+    def login(client, access_token="gho_new", github_user=None):
+        github_user = github_user or {"id": 12345, "login": "testuser"}
+        with patch.object(
+            github_oauth, "exchange_code", AsyncMock(return_value=access_token)
+        ), patch.object(
+            github_oauth, "fetch_user", AsyncMock(return_value=github_user)
+        ):
+            return client.post("/auth/github/callback?code=abc")
+
+    def test_new_user(self, client, db_session):
+        """正常系：初回はユーザーを作成してJWTを返す"""
+        response = self.login(client, github_user={"id": 777, "login": "newuser"})
+
+        assert response.status_code == 200
+        token = response.json()["data"]["access_token"]
+        user_id = jwt.decode(token, settings.jwt_secret_key, algorithms=["HS256"])["sub"]
+        user = db_session.get(User, user_id)
+        assert user.github_id == 777
+        assert user.github_username == "newuser"
+        assert user.github_access_token == "gho_new"
+        # DBには暗号化して保存
+        assert user.github_access_token_encrypted.startswith("v1.")
+
+    def test_existing_user(self, client, db_session, test_user):
+        """正常系：2回目以降は同じユーザーの名前・トークンを更新する"""
+        response = self.login(
+            client, github_user={"id": test_user.github_id, "login": "renamed"}
+        )
+
+        assert response.status_code == 200
+        token = response.json()["data"]["access_token"]
+        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=["HS256"])
+        assert payload["sub"] == test_user.id
+        db_session.expire_all()
+        assert db_session.query(User).count() == 1
+        user = db_session.get(User, test_user.id)
+        assert user.github_username == "renamed"
+        assert user.github_access_token == "gho_new"
+
+    def test_token_exchange_failed_400(self, client):
+        """異常系：codeをトークンに交換できない"""
+        response = self.login(client, access_token=None)
+
+        assert response.status_code == 400
+        assert response.json()["code"] == "GITHUB_AUTH_FAILED"
+
+    def test_user_info_failed_400(self, client):
+        """異常系：GitHubのユーザー情報を取得できない"""
+        response = self.login(client, github_user={"message": "Bad credentials"})
+
+        assert response.status_code == 400
+        assert response.json()["code"] == "GITHUB_AUTH_FAILED"
@@ -0,0 +1,119 @@
+# tests/routers/test_tracked_repos.py
+"""
+/tracked-repos エンドポイントのテスト
+"""
+
+
+class TestCreateTrackedRepo:
+    """
+    POST /tracked-repos
+    定期分析の対象に登録
+    """
+
+    def test_success(self, client, auth_header, db_session):
+        """正常系：登録してDBに保存"""
+        from app.models import TrackedRepo
+
+        response = client.post(
+            "/tracked-repos",
+            headers=auth_header,
+            json={"repo_url": "https://github.com/testuser/testrepo/", "limit": 10},
+        )
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["repo_url"] == "https://github.com/testuser/testrepo"
+        assert data["branch"] == "main"
+        assert data["limit"] == 10
+        assert data["last_run_at"] is None
+        assert db_session.query(TrackedRepo).count() == 1
+
+    def test_duplicate(self, client, auth_header):
+        """異常系：同じリポジトリ・ブランチの二重登録 → 409"""
+        body = {"repo_url": "https://github.com/testuser/testrepo"}
+        client.post("/tracked-repos", headers=auth_header, json=body)
+
+        response = client.post("/tracked-repos", headers=auth_header, json=body)
+
+        assert response.status_code == 409
+        assert response.json()["code"] == "TRACKED_REPO_ALREADY_EXISTS"
+
+    def test_invalid_url(self, client, auth_header):
+        """異常系：GitHub以外のURL → 422"""
+        response = client.post(
+            "/tracked-repos",
+            headers=auth_header,
+            json={"repo_url": "https://example.com/user/repo"},
+        )
+
+        assert response.status_code == 422
+
+    def test_no_token(self, client):
+        """異常系：トークンなし → 401"""
+        response = client.post(
+            "/tracked-repos",
+            json={"repo_url": "https://github.com/testuser/testrepo"},
+        )
+
+        assert response.status_code == 401
+
+
+class TestGetTrackedRepos:
+    """
+    GET /tracked-repos
+    """
+
+    def test_only_own(self, client, auth_header, other_auth_header):
+        """正常系：自分の登録だけを返す"""
+        client.post(
+            "/tracked-repos",
+            headers=other_auth_header,
+            json={"repo_url": "https://github.com/otheruser/repo"},
+        )
+        client.post(
+            "/tracked-repos",
+            headers=auth_header,
+            json={"repo_url": "https://github.com/testuser/testrepo"},
+        )
+
+        response = client.get("/tracked-repos", headers=auth_header)
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert [d["repo_url"] for d in data] == ["https://github.com/testuser/testrepo"]
+
+
+class TestDeleteTrackedRepo:
+    """
+    DELETE /tracked-repos/{id}
+    """
+
+    def test_success(self, client, auth_header, db_session):
+        """正常系：削除してDBから消える"""
+        from app.models import TrackedRepo
+
+        created = client.post(
+            "/tracked-repos",
+            headers=auth_header,
+            json={"repo_url": "https://github.com/testuser/testrepo"},
+        ).json()["data"]
+
+        response = client.delete(f"/tracked-repos/{created['id']}", headers=auth_header)
+
+        assert response.status_code == 200
+        assert db_session.query(TrackedRepo).count() == 0
+
+    def test_other_user(self, client, auth_header, other_auth_header):
+        """異常系：他人の登録 → 404"""
+        created = client.post(
+            "/tracked-repos",
+            headers=auth_header,
+            json={"repo_url": "https://github.com/testuser/testrepo"},
+        ).json()["data"]
+
+        response = client.delete(
+            f"/tracked-repos/{created['id']}", headers=other_auth_header
+        )
+
+        assert response.status_code == 404
+        assert response.json()["code"] == "TRACKED_REPO_NOT_FOUND"
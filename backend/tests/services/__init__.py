@@ -0,0 +1 @@
+# tests/services/__init__.py
@@ -0,0 +1,594 @@
+# tests/services/test_analysis_service.py
+"""
+analysis_service のテスト（GitHub APIはGitHubClient.get / streamを差し替え）
+"""
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base
+from app.exceptions import AppException
+from app.models import Analysis, ScoreRollup, User
+from app.models.analysis import SCORE_KEYS
+from app.schemas import AnalysisRequest
+from app.services.analysis_service import (
+    fetch_commits_from_github,
+    fetch_head_sha,
+    rescore_analysis,
+    rescore_archived_analyses,
+    run_analysis,
+    run_batch_analysis,
+)
+from app.services.commit_archive import pack_commits
+from app.services.commit_filter import CommitFilter
+
+
+def commit_detail(sha, message):
+    return {
+        "sha": sha,
+        "commit": {
+            "author": {"name": "dev", "date": "2026-01-01T00:00:00Z"},
+            "message": message,
+        },
+        "files": [{"filename": "app.py", "additions": 1, "deletions": 0}],
+    }
+
+
+class FakeGitHub:
+    """パスごとに決まったレスポンスを返す"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.paths = []
+        self.params = {}
+
+    async def get(self, path, params=None, headers=None):
+        self.paths.append(path)
+        self.params[path] = params
+        status, body, *rest = self.routes[path]
+        response_headers = rest[0] if rest else None
+        if isinstance(body, str):
+            return httpx.Response(status, text=body, headers=response_headers)
+        return httpx.Response(status, json=body, headers=response_headers)
+
+    @asynccontextmanager
+    async def stream(self, path, params=None, headers=None):
+        yield await self.get(path, params, headers)
+
+    def installed(self):
+        return patch.multiple(
+            "app.services.github_client.GitHubClient", get=self.get, stream=self.stream
+        )
+
+
+class TestFetchCommits:
+    """
+    fetch_commits_from_github / fetch_head_sha
+    """
+
+    @pytest.mark.asyncio
+    async def test_compare_since_base_sha(self):
+        """正常系：base_sha以降だけをcompare APIで取得（新しい順・limit件）"""
+        fake = FakeGitHub(
+            {
+                "/repos/o/r/compare/base...head": (
+                    200,
+                    {"commits": [{"sha": "c1"}, {"sha": "c2"}, {"sha": "c3"}]},
+                ),
+                "/repos/o/r/commits/c2": (200, commit_detail("c2" * 10, "second")),
+                "/repos/o/r/commits/c3": (200, commit_detail("c3" * 10, "third")),
+            }
+        )
+
+        with fake.installed():
+            log = await fetch_commits_from_github(
+                "https://github.com/o/r", "head", 2, "token", base_sha="base"
+            )
+
+        assert "/repos/o/r/commits/c1" not in fake.paths
+        assert log.index("Message: third") < log.index("Message: second")
+
+    @pytest.mark.asyncio
+    async def test_follow_pages_with_filter(self):
+        """正常系：絞り込みをクエリに渡し、Linkヘッダーのnextをたどってlimit件まで取得"""
+        page2 = f"{settings.github_api_base_url}/repositories/1/commits?page=2"
+        page3 = f"{settings.github_api_base_url}/repositories/1/commits?page=3"
+        fake = FakeGitHub(
+            {
+                "/repos/o/r/commits": (
+                    200,
+                    [{"sha": "c1"}, {"sha": "c2"}],
+                    {"Link": f'<{page2}>; rel="next"'},
+                ),
+                page2: (
+                    200,
+                    [{"sha": "c3"}, {"sha": "c4"}],
+                    {"Link": f'<{page3}>; rel="next"'},
+                ),
+                **{
+                    f"/repos/o/r/commits/{sha}": (200, commit_detail(sha * 10, sha))
+                    for sha in ("c1", "c2", "c3")
+                },
+            }
+        )
+        commit_filter = CommitFilter(
+            since=datetime(2026, 1, 1, 9, tzinfo=timezone(timedelta(hours=9))),
+            author="dev",
+            path="src/app.py",
+        )
+
+        with fake.installed(), patch.object(settings, "github_commits_per_page", 2):
+            log = await fetch_commits_from_github(
+                "https://github.com/o/r",
+                "main",
+                3,
+                "token",
+                commit_filter=commit_filter,
+            )
+
+        assert fake.params["/repos/o/r/commits"] == {
+            "sha": "main",
+            "per_page": 2,
+            "since": "2026-01-01T00:00:00Z",
+            "author": "dev",
+            "path": "src/app.py",
+        }
+        messages = [line for line in log.splitlines() if line.startswith("Message")]
+        assert messages == ["Message: c1", "Message: c2", "Message: c3"]
+        # 3件目までで足りるので3ページ目は取得しない
+        assert page3 not in fake.paths
+        assert "/repos/o/r/commits/c4" not in fake.paths
+
+    @pytest.mark.asyncio
+    async def test_prefetch_next_page(self):
+        """正常系：次のページの取得を、前のページの詳細の取得より先に始める"""
+        page2 = f"{settings.github_api_base_url}/repositories/1/commits?page=2"
+        fake = FakeGitHub(
+            {
+                "/repos/o/r/commits": (
+                    200,
+                    [{"sha": "c1"}, {"sha": "c2"}],
+                    {"Link": f'<{page2}>; rel="next"'},
+                ),
+                page2: (200, [{"sha": "c3"}]),
+                **{
+                    f"/repos/o/r/commits/{sha}": (200, commit_detail(sha * 10, sha))
+                    for sha in ("c1", "c2", "c3")
+                },
+            }
+        )
+
+        with fake.installed(), patch.object(settings, "github_commits_per_page", 2):
+            await fetch_commits_from_github("https://github.com/o/r", "main", 30, "t")
+
+        assert fake.paths.index(page2) < fake.paths.index("/repos/o/r/commits/c1")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "next_url",
+        [
+            "https://evil.example.com/commits?page=2",
+            "https://api.github.com.evil.example/commits?page=2",
+            "https://api.github.com@evil.example/commits?page=2",
+            "http://api.github.com/commits?page=2",
+            "https://api.github.com:8443/commits?page=2",
+        ],
+    )
+    async def test_next_page_other_host_ignored(self, next_url):
+        """異常系：別のスキーム・ホスト・ポートを指すnextはたどらない（トークンを送らない）"""
+        fake = FakeGitHub(
+            {
+                "/repos/o/r/commits": (
+                    200,
+                    [{"sha": "c1"}],
+                    {"Link": f'<{next_url}>; rel="next"'},
+                ),
+                "/repos/o/r/commits/c1": (200, commit_detail("c1" * 10, "c1")),
+            }
+        )
+
+        with fake.installed(), patch.object(settings, "github_commits_per_page", 1):
+            log = await fetch_commits_from_github("https://github.com/o/r", "main", 2, "t")
+
+        assert "Message: c1" in log
+        assert fake.paths == ["/repos/o/r/commits", "/repos/o/r/commits/c1"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "status, headers, expected",
+        [
+            (403, {"X-RateLimit-Remaining": "0"}, 429),
+            (403, {"Retry-After": "30"}, 429),
+            (429, {}, 429),
+            (403, {"X-RateLimit-Remaining": "10"}, 400),
+            (404, {}, 400),
+        ],
+    )
+    async def test_rate_limit_error(self, status, headers, expected):
+        """異常系：GitHubのレート制限（403/429）は429、それ以外のエラーは400"""
+        fake = FakeGitHub(
+            {"/repos/o/r/commits": (status, {"message": "limited"}, headers)}
+        )
+
+        with fake.installed():
+            with pytest.raises(AppException) as exc:
+                await fetch_commits_from_github("https://github.com/o/r", "main", 2, "t")
+
+        assert exc.value.status_code == expected
+        assert exc.value.code.value == "GITHUB_API_ERROR"
+        if expected == 429:
+            assert int(exc.value.headers["Retry-After"]) >= 1
+
+    @pytest.mark.asyncio
+    async def test_head_sha(self):
+        """正常系：ブランチ先頭のSHAを取得"""
+        fake = FakeGitHub({"/repos/o/r/commits/main": (200, "abc123\n")})
+
+        with fake.installed():
+            sha = await fetch_head_sha("https://github.com/o/r", "main", "token")
+
+        assert sha == "abc123"
+
+    @pytest.mark.asyncio
+    async def test_compare_error(self):
+        """異常系：compare APIのエラーはGITHUB_API_ERROR"""
+        from app.exceptions import AppException
+
+        fake = FakeGitHub(
+            {
+                "/repos/o/r/compare/base...head": (404, {"message": "Not Found"}),
+            }
+        )
+
+        with fake.installed():
+            with pytest.raises(AppException) as exc:
+                await fetch_commits_from_github(
+                    "https://github.com/o/r", "head", 2, "token", base_sha="base"
+                )
+
+        assert exc.value.code.value == "GITHUB_API_ERROR"
+
+
+class TestConnectionUsage:
+    """
+    run_analysis
+    GitHub・Geminiを待つ間はDB接続を持たず、DBの読み書きでイベントループを止めない
+    """
+
+    @pytest.mark.asyncio
+    async def test_pool_bounded_by_inserts(self, tmp_path):
+        """正常系：接続プールが1本でも、並行する分析はすべて保存でき、DBはループの外で使う"""
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=1,
+        )
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(autoflush=False, bind=engine)
+        with session_factory() as db:
+            db.add(
+                User(
+                    id="user",
+                    github_id=1,
+                    github_username="dev",
+                    github_access_token="token",
+                )
+            )
+            db.commit()
+        with session_factory() as db:
+            user = db.get(User, "user")
+
+        checked_out = 0
+        max_checked_out = 0
+        loop_thread = threading.get_ident()
+        checkout_threads = []
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(*args):
+            nonlocal checked_out, max_checked_out
+            checked_out += 1
+            max_checked_out = max(max_checked_out, checked_out)
+            checkout_threads.append(threading.get_ident())
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(*args):
+            nonlocal checked_out
+            checked_out -= 1
+
+        async def slow_fetch(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return "commit"
+
+        async def slow_analyze(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return {
+                "scores": {key: 50 for key in SCORE_KEYS},
+                "report": {key: "ok" for key in SCORE_KEYS},
+            }
+
+        async def head_sha(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return "a" * 40
+
+        with patch(
+            "app.services.analysis_service.fetch_commits_from_github", slow_fetch
+        ), patch(
+            "app.services.analysis_service.analyze_commits", slow_analyze
+        ), patch("app.services.analysis_service.fetch_head_sha", head_sha):
+            analyses = await asyncio.gather(
+                *[
+                    run_analysis(
+                        f"https://github.com/dev/repo{i}",
+                        "main",
+                        10,
+                        user,
+                        session_factory,
+                        incremental=True,
+                    )
+                    for i in range(10)
+                ]
+            )
+
+        assert max_checked_out == 1
+        assert checked_out == 0
+        # 前回の分析の読み込み・保存はどちらもイベントループのスレッドでは行わない
+        assert checkout_threads
+        assert loop_thread not in checkout_threads
+        # 切り離された後もレスポンスに必要な値は読める
+        assert all(a.report["test"] == "ok" and a.memo is None for a in analyses)
+        with session_factory() as db:
+            assert db.query(Analysis).count() == 10
+        engine.dispose()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rescore.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(autoflush=False, bind=engine)
+    with factory() as db:
+        db.add(
+            User(
+                id="user",
+                github_id=1,
+                github_username="dev",
+                github_access_token="token",
+            )
+        )
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def llm_result(score):
+    return {
+        "scores": {key: score for key in SCORE_KEYS},
+        "report": {key: f"score {score}" for key in SCORE_KEYS},
+    }
+
+
+class TestRescore:
+    """
+    取得したcommitのアーカイブ / rescore_analysis / rescore_archived_analyses
+    """
+
+    @pytest.mark.asyncio
+    async def test_rescore_without_github(self, session_factory):
+        """正常系：アーカイブを保存し、GitHubを呼ばずに同じcommitで分析し直す"""
+        fake = FakeGitHub(
+            {
+                "/repos/o/r/commits": (200, [{"sha": "c1"}, {"sha": "c2"}]),
+                "/repos/o/r/commits/c1": (200, commit_detail("c1" * 20, "first")),
+                "/repos/o/r/commits/c2": (200, commit_detail("c2" * 20, "second")),
+            }
+        )
+        with session_factory() as db:
+            user = db.get(User, "user")
+
+        with fake.installed(), patch.object(
+            settings, "commit_archive_enabled", True
+        ), patch(
+            "app.services.analysis_service.analyze_commits",
+            return_value=llm_result(50),
+        ) as first:
+            analysis = await run_analysis(
+                "https://github.com/o/r", "main", 2, user, session_factory
+            )
+
+        # アーカイブからの分析ではGitHubに1件も問い合わせない
+        offline = FakeGitHub({})
+        with offline.installed(), patch(
+            "app.services.analysis_service.analyze_commits",
+            return_value=llm_result(80),
+        ) as second:
+            rescored = await rescore_analysis(analysis.id, session_factory)
+
+        assert offline.paths == []
+        assert second.call_args.args[0] == first.call_args.args[0]
+        assert rescored.scores["test"] == 80
+        assert rescored.report["test"] == "score 80"
+        with session_factory() as db:
+            rollup = db.query(ScoreRollup).one()
+            assert (rollup.count, rollup.test_sum) == (1, 80)
+
+    @pytest.mark.asyncio
+    async def test_no_archive(self, session_factory):
+        """異常系：アーカイブの無い分析 → COMMIT_ARCHIVE_NOT_FOUND"""
+        with session_factory() as db:
+            db.add(
+                Analysis(
+                    id="plain",
+                    user_id="user",
+                    repo_url="https://github.com/o/r",
+                    scores=llm_result(50)["scores"],
+                    report=llm_result(50)["report"],
+                )
+            )
+            db.commit()
+
+        with pytest.raises(AppException) as exc:
+            await rescore_analysis("plain", session_factory)
+
+        assert exc.value.code.value == "COMMIT_ARCHIVE_NOT_FOUND"
+
+    @pytest.mark.asyncio
+    async def test_bulk_rescore(self, session_factory):
+        """正常系：アーカイブがあり、before より前に更新された分析だけを分析し直す"""
+        archive = pack_commits([commit_detail("c1" * 20, "first")])
+        cutoff = datetime(2026, 6, 1, tzinfo=timezone.utc)
+        with session_factory() as db:
+            for analysis_id, commits, updated_at in [
+                ("old", archive, datetime(2026, 1, 1, tzinfo=timezone.utc)),
+                ("done", archive, datetime(2026, 7, 1, tzinfo=timezone.utc)),
+                ("plain", None, datetime(2026, 1, 1, tzinfo=timezone.utc)),
+            ]:
+                db.add(
+                    Analysis(
+                        id=analysis_id,
+                        user_id="user",
+                        repo_url="https://github.com/o/r",
+                        scores=llm_result(50)["scores"],
+                        report=llm_result(50)["report"],
+                        commits_compressed=commits,
+                        created_at=updated_at,
+                        updated_at=updated_at,
+                    )
+                )
+            db.commit()
+
+        with patch(
+            "app.services.analysis_service.analyze_commits",
+            return_value=llm_result(90),
+        ):
+            results = [
+                result
+                async for result in rescore_archived_analyses(
+                    session_factory, before=cutoff, concurrency=2
+                )
+            ]
+
+        assert [(analysis_id, error) for analysis_id, _, error in results] == [
+            ("old", None)
+        ]
+        with session_factory() as db:
+            scores = {a.id: a.score_test for a in db.query(Analysis)}
+        assert scores == {"old": 90, "done": 50, "plain": 50}
+
+
+    @pytest.mark.asyncio
+    async def test_incremental_not_rescored(self, session_factory):
+        """異常系：前回の分析に積み上げた差分分析は分析し直さない（一括でも対象外）"""
+        archive = pack_commits([commit_detail("c1" * 20, "first")])
+        with session_factory() as db:
+            for analysis_id, head_sha, day in [
+                ("base", "a" * 40, 1),
+                ("delta", "b" * 40, 2),
+            ]:
+                created_at = datetime(2026, 1, day, tzinfo=timezone.utc)
+                db.add(
+                    Analysis(
+                        id=analysis_id,
+                        user_id="user",
+                        repo_url="https://github.com/o/r",
+                        branch="main",
+                        scores=llm_result(50)["scores"],
+                        report=llm_result(50)["report"],
+                        head_sha=head_sha,
+                        commits_compressed=archive,
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+                )
+            db.commit()
+
+        with patch(
+            "app.services.analysis_service.analyze_commits",
+            return_value=llm_result(90),
+        ):
+            with pytest.raises(AppException) as exc:
+                await rescore_analysis("delta", session_factory)
+            results = [
+                result
+                async for result in rescore_archived_analyses(session_factory)
+            ]
+
+        assert exc.value.status_code == 409
+        assert exc.value.code.value == "INCREMENTAL_RESCORE_UNSUPPORTED"
+        assert [analysis_id for analysis_id, _, _ in results] == ["base"]
+        with session_factory() as db:
+            assert db.get(Analysis, "delta").score_test == 50
+
+class TestBatch:
+    """
+    run_batch_analysis の保存と1件ごとのエラー
+    """
+
+    @staticmethod
+    def fake_fetch(repo_url, branch, limit, access_token, **kwargs):
+        if repo_url.endswith("/boom"):
+            raise RuntimeError("unexpected")
+        return "=== Commit: abc1234 ===\nMessage: test"
+
+    @pytest.mark.asyncio
+    async def test_unexpected_error_per_item(self, session_factory):
+        """異常系：想定外の例外はその1件のINTERNAL_ERRORにし、他は保存して返す"""
+        requests = [
+            AnalysisRequest(repo_url="https://github.com/o/boom"),
+            AnalysisRequest(repo_url="https://github.com/o/r"),
+        ]
+        with session_factory() as db:
+            user = db.get(User, "user")
+
+        with patch(
+            "app.services.analysis_service.fetch_commits_from_github",
+            side_effect=self.fake_fetch,
+        ), patch(
+            "app.services.analysis_service.analyze_commits",
+            return_value=llm_result(60),
+        ):
+            results = {
+                index: (analysis, error)
+                async for index, analysis, error in run_batch_analysis(
+                    requests, user, session_factory
+                )
+            }
+
+        assert results[0][0] is None
+        assert results[0][1].code.value == "INTERNAL_ERROR"
+        assert results[1][1] is None
+        with session_factory() as db:
+            assert [a.id for a in db.query(Analysis)] == [results[1][0].id]
+
+    @pytest.mark.asyncio
+    async def test_saved_before_yield(self, session_factory):
+        """正常系：返した分析は、途中で読むのをやめてもDBに保存されている"""
+        requests = [
+            AnalysisRequest(repo_url=f"https://github.com/o/r{i}") for i in range(3)
+        ]
+        with session_factory() as db:
+            user = db.get(User, "user")
+
+        with patch(
+            "app.services.analysis_service.fetch_commits_from_github",
+            side_effect=self.fake_fetch,
+        ), patch(
+            "app.services.analysis_service.analyze_commits",
+            return_value=llm_result(60),
+        ):
+            batch = run_batch_analysis(requests, user, session_factory)
+            _, first, error = await batch.__anext__()
+            await batch.aclose()
+
+        assert error is None
+        with session_factory() as db:
+            assert db.get(Analysis, first.id) is not None
@@ -0,0 +1,46 @@
+# tests/services/test_auth_service.py
+"""
+ログイン時のユーザー保存のテスト
+"""
+import pytest
+
+from app.models import User
+from app.services import auth_service
+from app.services.auth_service import upsert_user
+
+
+@pytest.fixture(params=["upsert", "fallback"])
+def dialects(request, monkeypatch):
+    """ON CONFLICTの1文と、使えないDB向けのSELECT→INSERT/UPDATEの両方で確認する"""
+    if request.param == "fallback":
+        monkeypatch.setattr(auth_service, "_UPSERT_DIALECTS", {})
+    return request.param
+
+
+class TestUpsertUser:
+    """
+    GitHubユーザーの作成・更新
+    """
+
+    def test_insert(self, db_session, dialects):
+        """正常系：いなければ作成してIDを返す"""
+        user_id = upsert_user(db_session, 777, "newuser", "gho_a")
+        db_session.commit()
+
+        user = db_session.get(User, user_id)
+        assert (user.github_id, user.github_username) == (777, "newuser")
+
+    def test_update(self, db_session, test_user, dialects):
+        """正常系：いれば名前・トークン・更新日時を更新して同じIDを返す"""
+        updated_at = test_user.updated_at
+
+        user_id = upsert_user(db_session, test_user.github_id, "renamed", "gho_b")
+        db_session.commit()
+
+        assert user_id == test_user.id
+        db_session.expire_all()
+        user = db_session.get(User, user_id)
+        assert user.github_username == "renamed"
+        assert user.github_access_token == "gho_b"
+        assert user.updated_at > updated_at
+        assert db_session.query(User).count() == 1
@@ -0,0 +1,69 @@
+# tests/services/test_commit_archive.py
+import json
+import zlib
+
+import pytest
+
+from app.services.analysis_service import format_commit_log
+from app.services.commit_archive import pack_commits, unpack_commits
+from app.services.commit_detail_reader import PATCH_PREVIEW_CHARS
+
+
+def record(i, files):
+    return {
+        "sha": f"{i:040x}",
+        "html_url": f"https://github.com/o/r/commit/{i:040x}",
+        "commit": {
+            "author": {"name": "開発者", "date": f"2026-01-{i + 1:02d}T00:00:00Z"},
+            "message": f"Fix #{i}\n\n日本語の説明",
+        },
+        "files": files,
+    }
+
+
+def file(i, patch="@@ -1 +1 @@\n-a\n+b"):
+    entry = {"filename": f"src/module_{i}.py", "additions": i, "deletions": 1}
+    if patch is not None:
+        entry["patch"] = patch
+    return entry
+
+
+class TestCommitArchive:
+    """
+    pack_commits / unpack_commits
+    """
+
+    def test_round_trip(self):
+        """正常系：戻したcommitから同じgit logのテキストが作れる"""
+        records = [
+            record(0, [file(1), file(2, patch=None)]),
+            record(1, []),
+            record(2, [file(3, patch="+" * (PATCH_PREVIEW_CHARS * 3))]),
+        ]
+
+        restored = unpack_commits(pack_commits(records))
+
+        assert format_commit_log(restored) == format_commit_log(records)
+        assert [r["sha"] for r in restored] == [r["sha"] for r in records]
+        # 使わない項目とpatchの先頭以外は残さない
+        assert "html_url" not in restored[0]
+        assert len(restored[2]["files"][0]["patch"]) == PATCH_PREVIEW_CHARS
+
+    def test_smaller_than_records(self):
+        """正常系：commitごとのJSONより小さい"""
+        records = [record(i, [file(i), file(i + 1)]) for i in range(30)]
+
+        packed = pack_commits(records)
+
+        assert len(packed) < len(zlib.compress(json.dumps(records).encode()))
+
+    def test_empty(self):
+        """正常系：commit 0件"""
+        assert unpack_commits(pack_commits([])) == []
+
+    def test_unknown_version(self):
+        """異常系：知らない形式は読まない"""
+        data = zlib.compress(json.dumps({"version": 99}).encode())
+
+        with pytest.raises(ValueError):
+            unpack_commits(data)
@@ -0,0 +1,125 @@
+# tests/services/test_commit_detail_reader.py
+import json
+
+import httpx
+import pytest
+
+from app.services.commit_detail_reader import (
+    PATCH_PREVIEW_CHARS,
+    CommitDetailReader,
+    read_commit_detail,
+)
+
+
+def detail(files):
+    return {
+        "sha": "abc123",
+        "commit": {
+            "author": {"name": "開発者", "date": "2026-01-01T00:00:00Z"},
+            "message": 'Fix "quoted" \\ path\n\n日本語の説明',
+        },
+        "stats": {"total": 3, "additions": 2, "deletions": 1},
+        "files": files,
+    }
+
+
+def file(i, patch="@@ -1 +1 @@\n-a\n+b"):
+    return {
+        "sha": f"blob{i}",
+        "filename": f"src/ファイル{i}.py",
+        "status": "modified",
+        "additions": i,
+        "deletions": 1,
+        "patch": patch,
+    }
+
+
+def feed_in_chunks(reader, body: bytes, size: int):
+    for i in range(0, len(body), size):
+        reader.feed(body[i : i + size])
+        if reader.done:
+            break
+    return reader.close()
+
+
+class TestCommitDetailReader:
+    """
+    CommitDetailReader
+    commit詳細を少しずつ読む
+    """
+
+    @pytest.mark.parametrize("size", [1, 7, 4096])
+    def test_same_as_json(self, size):
+        """正常系：どこで区切って届いても、必要な項目はjson.loadsと同じ"""
+        body = json.dumps(detail([file(i) for i in range(3)]), ensure_ascii=False)
+
+        result = feed_in_chunks(CommitDetailReader(max_files=10), body.encode(), size)
+
+        expected = json.loads(body)
+        assert result["sha"] == expected["sha"]
+        assert result["commit"] == expected["commit"]
+        assert result["stats"] == expected["stats"]
+        assert result["files"] == [
+            {k: f[k] for k in ("filename", "additions", "deletions", "patch")}
+            for f in expected["files"]
+        ]
+
+    def test_patch_trimmed(self):
+        """正常系：patchは先頭だけを残す"""
+        body = json.dumps(detail([file(0, patch="+x" * 100_000)])).encode()
+
+        result = feed_in_chunks(CommitDetailReader(max_files=10), body, 8192)
+
+        assert result["files"][0]["patch"] == ("+x" * 100_000)[:PATCH_PREVIEW_CHARS]
+
+    def test_stops_at_max_files(self):
+        """正常系：filesが上限に達したら残りは読まない"""
+        body = json.dumps(detail([file(i) for i in range(1000)])).encode()
+        reader = CommitDetailReader(max_files=5)
+
+        for i in range(0, len(body), 256):
+            reader.feed(body[i : i + 256])
+            if reader.done:
+                break
+        result = reader.close()
+
+        assert len(result["files"]) == 5
+        assert reader.truncated
+        assert i < len(body) // 10
+
+    def test_truncated_body(self):
+        """異常系：途中で終わっても、そこまでのfilesを返す"""
+        body = json.dumps(detail([file(i) for i in range(10)]), ensure_ascii=False)
+        cut = body.encode().index("ファイル5".encode())
+
+        result = feed_in_chunks(
+            CommitDetailReader(max_files=100), body.encode()[:cut], 64
+        )
+
+        assert [f["additions"] for f in result["files"]] == [0, 1, 2, 3, 4]
+
+    def test_truncated_before_commit(self):
+        """異常系：commitまで読めなければNone"""
+        body = json.dumps(detail([])).encode()
+
+        result = feed_in_chunks(CommitDetailReader(max_files=10), body[:30], 64)
+
+        assert result is None
+
+
+class TestReadCommitDetail:
+    """
+    read_commit_detail
+    バイト数の上限
+    """
+
+    @pytest.mark.asyncio
+    async def test_byte_cap(self):
+        """正常系：max_bytesで読むのをやめる"""
+        body = json.dumps(detail([file(i, patch="+y" * 5000) for i in range(100)]))
+        response = httpx.Response(200, content=body.encode())
+
+        result = await read_commit_detail(response, max_bytes=50_000, max_files=1000)
+
+        assert result["sha"] == "abc123"
+        assert 0 < len(result["files"]) < 100
@@ -0,0 +1,116 @@
+# tests/services/test_gemini_client.py
+"""
+LLMの出力の検証（スコアの範囲・修復・生成し直し）のテスト
+"""
+import json
+
+import pytest
+
+from app.config import settings
+from app.services import gemini_client
+from app.services.gemini_client import InvalidOutputError, parse_result
+
+SCORES = {
+    "test": 80,
+    "comment": 70,
+    "commit_size": 90,
+    "commit_frequency": 85,
+    "commit_message": 75,
+    "activity": 80,
+}
+REPORT = {key: f"{key}の評価" for key in SCORES}
+
+
+def output(**scores):
+    return json.dumps({"scores": {**SCORES, **scores}, "report": REPORT})
+
+
+class FakeBackend:
+    """呼ばれるたびに決まった出力を順に返す"""
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.calls = 0
+
+    async def generate(self, prompt, schema, system_instruction=None):
+        self.calls += 1
+        return self.texts.pop(0)
+
+
+class TestParseResult:
+    """
+    出力の検証
+    """
+
+    def test_success(self):
+        """正常系：scoresとreportのdictを返す"""
+        assert parse_result(output()) == {"scores": SCORES, "report": REPORT}
+
+    def test_clamped(self):
+        """正常系：範囲外のスコアは0〜100に収め、小数は四捨五入する"""
+        result = parse_result(output(test=120, comment=-5, activity=79.6))
+
+        assert result["scores"]["test"] == 100
+        assert result["scores"]["comment"] == 0
+        assert result["scores"]["activity"] == 80
+
+    def test_repaired(self):
+        """正常系：コードブロックや前後の文は取り除く"""
+        text = f"結果です。\n```json\n{output()}\n```"
+
+        assert parse_result(text)["scores"] == SCORES
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            '{"scores": {',
+            json.dumps({"scores": SCORES}),
+            output(test="高い"),
+            json.dumps({"scores": {**SCORES, "test": None}, "report": REPORT}),
+        ],
+    )
+    def test_invalid(self, text):
+        """異常系：直せない出力はInvalidOutputError"""
+        with pytest.raises(InvalidOutputError):
+            parse_result(text)
+
+
+class TestAnalyzeCommits:
+    """
+    スキーマに合わない出力の生成し直し
+    """
+
+    @pytest.mark.asyncio
+    async def test_regenerated(self, monkeypatch):
+        """正常系：合わない出力は生成し直す"""
+        backend = FakeBackend(['{"scores": {}}', output(test=60)])
+        monkeypatch.setattr(gemini_client, "llm_backend", backend)
+
+        result = await gemini_client.analyze_commits("git log")
+
+        assert result["scores"]["test"] == 60
+        assert backend.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_retries_exhausted(self, monkeypatch):
+        """異常系：GEMINI_OUTPUT_RETRIES回生成し直しても合わなければInvalidOutputError"""
+        monkeypatch.setattr(settings, "gemini_output_retries", 2)
+        backend = FakeBackend(["not json"] * 3)
+        monkeypatch.setattr(gemini_client, "llm_backend", backend)
+
+        with pytest.raises(InvalidOutputError):
+            await gemini_client.analyze_commits("git log")
+        assert backend.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_streamed_output_regenerated(self, monkeypatch):
+        """正常系：ストリーミングで受け取った出力が合わなければ、ストリーミングなしで生成し直す"""
+        backend = FakeBackend([output()])
+        monkeypatch.setattr(gemini_client, "llm_backend", backend)
+
+        result = await gemini_client.validate_streamed_result(
+            '{"scores": ', "git log"
+        )
+
+        assert result["scores"] == SCORES
+        assert backend.calls == 1
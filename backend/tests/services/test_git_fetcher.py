@@ -0,0 +1,215 @@
+# tests/services/test_git_fetcher.py
+"""
+git取得バックエンドのテスト（ローカルのfixtureリポジトリをfile://で取得）
+"""
+import subprocess
+from datetime import datetime, timezone
+
+import pytest
+
+from app.config import settings
+from app.services import analysis_service
+from app.services.analysis_service import fetch_commits_from_github, fetch_head_sha
+from app.services.commit_filter import CommitFilter
+from app.services.git_fetcher import GitRepoCache
+
+
+def git(cwd, *args):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit(repo, filename, content, message, date="2026-01-02T03:04:05+09:00"):
+    (repo / filename).write_text(content)
+    git(repo, "add", filename)
+    git(
+        repo,
+        "-c", "user.name=Dev", "-c", "user.email=dev@example.com",
+        "commit", "-q", "-m", message, "--date", date,
+    )
+    return git(repo, "rev-parse", "HEAD")
+
+
+def make_repo(path, count):
+    path.mkdir(parents=True)
+    git(path, "init", "-q", "-b", "main")
+    for i in range(count):
+        commit(path, "app.py", "".join(f"line {n}\n" for n in range(i + 1)), f"c{i}")
+    return path
+
+
+@pytest.fixture
+def git_backend(tmp_path, monkeypatch):
+    """commit_fetcher=git にし、キャッシュをテスト用ディレクトリに向ける"""
+    cache = GitRepoCache(str(tmp_path / "cache"), 1024 * 1024 * 1024)
+    monkeypatch.setattr(settings, "commit_fetcher", "git")
+    monkeypatch.setattr(analysis_service, "repo_cache", cache)
+    return cache
+
+
+class TestGitFetcher:
+    """
+    fetch_commits_from_github（commit_fetcher="git"）
+    """
+
+    @pytest.mark.asyncio
+    async def test_same_format_as_api(self, tmp_path, git_backend):
+        """正常系：REST APIと同じparsed_log形式（UTCの日時・numstat・patch）"""
+        repo = make_repo(tmp_path / "owner" / "repo", 1)
+        sha = commit(repo, "new.py", "print(1)\n", "add new\n\nbody")
+
+        log = await fetch_commits_from_github(f"file://{repo}", "main", 1, "")
+
+        assert log.splitlines() == [
+            f"=== Commit: {sha[:7]} ===",
+            "Author: Dev",
+            "Date: 2026-01-01T18:04:05Z",
+            "Message: add new",
+            "",
+            "body",
+            "Files:",
+            "  - new.py (+1, -0)",
+            "    Diff: @@ -0,0 +1 @@",
+            "+print(1)...",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_limit_and_order(self, tmp_path, git_backend):
+        """正常系：新しい順にlimit件（最古のcommitも親との差分になる）"""
+        repo = make_repo(tmp_path / "owner" / "repo", 5)
+
+        log = await fetch_commits_from_github(f"file://{repo}", "main", 2, "")
+
+        messages = [line for line in log.splitlines() if line.startswith("Message")]
+        assert messages == ["Message: c4", "Message: c3"]
+        assert log.count("(+1, -0)") == 2
+
+    @pytest.mark.asyncio
+    async def test_incremental_fetch(self, tmp_path, git_backend):
+        """正常系：base_sha以降のcommitだけを取得（既存のcloneにfetch）"""
+        repo = make_repo(tmp_path / "owner" / "repo", 3)
+        url = f"file://{repo}"
+        base = await fetch_head_sha(url, "main", "")
+        await fetch_commits_from_github(url, "main", 30, "")
+        commit(repo, "b.py", "b\n", "after base")
+        head = await fetch_head_sha(url, "main", "")
+
+        log = await fetch_commits_from_github(url, head, 30, "", base_sha=base)
+
+        messages = [line for line in log.splitlines() if line.startswith("Message")]
+        assert messages == ["Message: after base"]
+        assert head == git(repo, "rev-parse", "HEAD")
+
+    @pytest.mark.asyncio
+    async def test_filter(self, tmp_path, git_backend, monkeypatch):
+        """正常系：期間（コミット日時）・パスで絞り込む（作者は部分一致）"""
+        repo = make_repo(tmp_path / "owner" / "repo", 2)
+        for filename, message, date in [
+            ("docs.md", "old docs", "2025-06-01T00:00:00Z"),
+            ("docs.md", "new docs", "2026-03-01T00:00:00Z"),
+            ("app.py", "new app", "2026-03-02T00:00:00Z"),
+        ]:
+            monkeypatch.setenv("GIT_COMMITTER_DATE", date)
+            commit(repo, filename, message, message, date=date)
+
+        log = await fetch_commits_from_github(
+            f"file://{repo}",
+            "main",
+            30,
+            "",
+            commit_filter=CommitFilter(
+                since=datetime(2026, 2, 1, tzinfo=timezone.utc),
+                author="Dev",
+                path="docs.md",
+            ),
+        )
+
+        messages = [line for line in log.splitlines() if line.startswith("Message")]
+        assert messages == ["Message: new docs"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_branch(self, tmp_path, git_backend):
+        """異常系：存在しないブランチ → GITHUB_API_ERROR"""
+        from app.exceptions import AppException
+
+        repo = make_repo(tmp_path / "owner" / "repo", 1)
+
+        with pytest.raises(AppException) as exc:
+            await fetch_commits_from_github(f"file://{repo}", "nope", 1, "")
+
+        assert exc.value.code.value == "GITHUB_API_ERROR"
+
+
+    @pytest.mark.asyncio
+    async def test_branch_not_parsed_as_option(self, tmp_path, git_backend):
+        """異常系：オプションに見えるブランチ名もrefとして扱う（--upload-packは実行されない）"""
+        from app.exceptions import AppException
+
+        repo = make_repo(tmp_path / "owner" / "repo", 1)
+        marker = tmp_path / "pwned"
+        branch = f"--upload-pack=touch {marker}"
+
+        with pytest.raises(AppException):
+            await fetch_commits_from_github(f"file://{repo}", branch, 1, "")
+        with pytest.raises(AppException):
+            await fetch_head_sha(f"file://{repo}", branch, "")
+
+        assert not marker.exists()
+
+
+class TestGitRepoCache:
+    """
+    bare cloneキャッシュのLRU削除
+    """
+
+    @pytest.mark.asyncio
+    async def test_evict_least_recently_used(self, tmp_path):
+        """正常系：予算を超えたら最後に使ってから長いcloneを削除"""
+        cache = GitRepoCache(str(tmp_path / "cache"), 1024 * 1024 * 1024)
+        urls = [f"file://{make_repo(tmp_path / 'o' / name, 2)}" for name in "abc"]
+        for url in urls:
+            await cache.fetch_commits(url, "main", 2, "")
+        # a を使い直して b を一番古くする
+        await cache.fetch_commits(urls[0], "main", 2, "")
+        sizes = {path: size for _, size, path in cache._entries()}
+
+        cache.max_bytes = sum(sizes.values()) - 1
+        cache.evict()
+
+        assert not cache.repo_dir(urls[1]).exists()
+        assert cache.repo_dir(urls[0]).exists()
+        assert cache.repo_dir(urls[2]).exists()
+
+    @pytest.mark.asyncio
+    async def test_evict_off_event_loop(self, tmp_path, monkeypatch):
+        """正常系：fetch後の削除はイベントループ外のスレッドで行う"""
+        import threading
+
+        cache = GitRepoCache(str(tmp_path / "cache"), 1024 * 1024 * 1024)
+        url = f"file://{make_repo(tmp_path / 'o' / 'a', 2)}"
+        threads = []
+        monkeypatch.setattr(
+            cache, "evict", lambda keep=None: threads.append(threading.get_ident())
+        )
+
+        await cache.fetch_commits(url, "main", 2, "")
+
+        assert threads and threads[0] != threading.get_ident()
+
+    def test_evict_skips_clone_in_use(self, tmp_path):
+        """正常系：同じプロセスのfetchが共有ロックを持っているcloneは削除しない"""
+        from app.shared_state import PROCESS_ID, shared_state
+
+        cache = GitRepoCache(str(tmp_path / "cache"), 0)
+        path = cache.root / "o__a-000000000000.git"
+        path.mkdir(parents=True)
+        (path / "HEAD").write_text("ref: refs/heads/main\n")
+        key = cache._lock_key(path)
+        assert shared_state.acquire_lock(key, PROCESS_ID, 10)
+        try:
+            cache.evict()
+        finally:
+            shared_state.release_lock(key, PROCESS_ID)
+
+        assert path.exists()
@@ -0,0 +1,141 @@
+# tests/services/test_llm_backends.py
+"""
+GeminiBackendの呼び出しとトークン数の集計のテスト
+- Gemini APIは偽のクライアントに置き換える
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import llm_backends
+from app.services.llm_backends import GeminiBackend, LLMBackend, TokenUsage
+
+SYSTEM = "固定の指示"
+
+
+def usage(prompt, cached=0, output=10):
+    return SimpleNamespace(
+        prompt_token_count=prompt,
+        cached_content_token_count=cached,
+        candidates_token_count=output,
+    )
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FakeGenAI:
+    """client.aio.models の代わり（呼び出しの記録）"""
+
+    def __init__(self):
+        self.calls = []
+        self.cached_tokens = 0
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self.generate_content,
+                generate_content_stream=self.generate_content_stream,
+            ),
+        )
+
+    async def generate_content(self, model, contents, config):
+        self.calls.append((contents, config))
+        return SimpleNamespace(
+            text="{}", usage_metadata=usage(120, cached=self.cached_tokens)
+        )
+
+    async def generate_content_stream(self, model, contents, config):
+        self.calls.append((contents, config))
+        return FakeStream(
+            [
+                SimpleNamespace(text='{"a"', usage_metadata=None),
+                SimpleNamespace(text=": 1}", usage_metadata=usage(120)),
+            ]
+        )
+
+
+@pytest.fixture
+def genai_client(monkeypatch):
+    monkeypatch.setattr(llm_backends, "llm_usage", TokenUsage())
+    return FakeGenAI()
+
+
+class TestLLMBackend:
+    """
+    呼び出し先の基底クラス
+    """
+
+    def test_missing_override(self):
+        """異常系：streamを実装していない呼び出し先は作れない"""
+
+        class GenerateOnly(LLMBackend):
+            async def generate(self, prompt, schema, system_instruction=None):
+                return "{}"
+
+        with pytest.raises(TypeError):
+            GenerateOnly()
+
+
+class TestGeminiBackend:
+    """
+    固定の指示の渡し方
+    """
+
+    @pytest.mark.asyncio
+    async def test_system_instruction(self, genai_client):
+        """正常系：固定の指示はsystem_instructionで送り、プロンプトには含めない"""
+        backend = GeminiBackend(client=genai_client)
+
+        await backend.generate("git log", {}, system_instruction=SYSTEM)
+
+        contents, config = genai_client.calls[0]
+        assert contents == "git log"
+        assert config.system_instruction == SYSTEM
+        assert config.response_mime_type == "application/json"
+
+
+class TestTokenUsage:
+    """
+    トークン数と最初のトークンまでの時間の集計
+    """
+
+    @pytest.mark.asyncio
+    async def test_generate(self, genai_client):
+        """正常系：入力・キャッシュから読まれた・出力のトークン数を集計する"""
+        genai_client.cached_tokens = 100
+        backend = GeminiBackend(client=genai_client)
+
+        await backend.generate("git log", {}, system_instruction=SYSTEM)
+        await backend.generate("git log", {}, system_instruction=SYSTEM)
+
+        snapshot = llm_backends.llm_usage.snapshot()
+        assert snapshot["calls"] == 2
+        assert snapshot["prompt_tokens"] == 240
+        assert snapshot["cached_tokens"] == 200
+        assert snapshot["output_tokens"] == 20
+        assert snapshot["cached_ratio"] == round(200 / 240, 4)
+        assert snapshot["avg_first_token_ms"] is None
+
+    @pytest.mark.asyncio
+    async def test_stream(self, genai_client):
+        """正常系：ストリーミングでは最後のチャンクの使用量と、最初のチャンクまでの時間を集計する"""
+        backend = GeminiBackend(client=genai_client)
+
+        chunks = [
+            text
+            async for text in backend.stream("git log", {}, system_instruction=SYSTEM)
+        ]
+
+        assert "".join(chunks) == '{"a": 1}'
+        snapshot = llm_backends.llm_usage.snapshot()
+        assert snapshot["calls"] == 1
+        assert snapshot["output_tokens"] == 10
+        assert snapshot["avg_first_token_ms"] is not None
@@ -0,0 +1,220 @@
+# tests/services/test_resilience.py
+"""
+Gemini呼び出しの耐障害（タイムアウト・再試行・ヘッジ・サーキットブレーカー）のテスト
+- 呼び出し先はオフラインのStubBackend
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from google.genai import errors as genai_errors
+
+from app.services.llm_backends import StubBackend
+from app.services.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+PROMPT = "git log"
+
+
+def server_error():
+    return genai_errors.ServerError(503, {"error": {"message": "overloaded"}})
+
+
+def client_error():
+    return genai_errors.ClientError(400, {"error": {"message": "bad request"}})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_caller(breaker=None, **kwargs):
+    options = {
+        "timeout": 0.2,
+        "max_retries": 3,
+        "base_delay": 0.001,
+        "max_delay": 0.01,
+        **kwargs,
+    }
+    return ResilientCaller(
+        "Stub",
+        breaker=breaker or CircuitBreaker(failure_threshold=100, reset_timeout=30),
+        **options,
+    )
+
+
+class TestRetry:
+    """
+    タイムアウトと再試行
+    """
+
+    @pytest.mark.asyncio
+    async def test_timeout_then_success(self):
+        """正常系：応答しない呼び出しはタイムアウトで打ち切って再試行"""
+        stub = StubBackend(delays=[5.0, 0.0])
+
+        text = await make_caller().call(lambda: stub.generate(PROMPT, {}))
+
+        assert json.loads(text) == StubBackend.result_for(PROMPT)
+        assert stub.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_server_errors(self):
+        """正常系：5xxは指数バックオフで再試行"""
+        stub = StubBackend(errors=[server_error(), server_error()])
+
+        await make_caller().call(lambda: stub.generate(PROMPT, {}))
+
+        assert stub.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_no_retry_client_error(self):
+        """異常系：4xx（入力起因）は再試行しない"""
+        stub = StubBackend(errors=[client_error()])
+
+        with pytest.raises(genai_errors.ClientError):
+            await make_caller().call(lambda: stub.generate(PROMPT, {}))
+
+        assert stub.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_exhausted(self):
+        """異常系：再試行回数を使い切ったら最後のエラー"""
+        stub = StubBackend(errors=[server_error()] * 3)
+
+        with pytest.raises(genai_errors.ServerError):
+            await make_caller(max_retries=2).call(lambda: stub.generate(PROMPT, {}))
+
+        assert stub.calls == 3
+
+
+class TestHedge:
+    """
+    p95を過ぎた呼び出しのヘッジ
+    """
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins(self):
+        """正常系：遅い1本目を待たず、後から出した2本目の結果を使う"""
+        stub = StubBackend(delays=[1.0, 0.0])
+        caller = make_caller(timeout=2.0, hedge=True, hedge_min_samples=5)
+        for _ in range(5):
+            caller.latency.record(0.01)
+
+        start = time.monotonic()
+        await caller.call(lambda: stub.generate(PROMPT, {}))
+
+        assert time.monotonic() - start < 0.5
+        assert stub.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_samples(self):
+        """正常系：遅延の実績が少ないうちはヘッジしない"""
+        stub = StubBackend(delays=[0.05])
+        caller = make_caller(hedge=True, hedge_min_samples=5)
+
+        await caller.call(lambda: stub.generate(PROMPT, {}))
+
+        assert stub.calls == 1
+
+
+class TestCircuitBreaker:
+    """
+    サーキットブレーカー
+    """
+
+    @pytest.mark.asyncio
+    async def test_open_and_fail_fast(self):
+        """異常系：連続失敗で開き、呼び出し先を呼ばずに失敗する"""
+        stub = StubBackend(errors=[server_error()] * 3)
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        caller = make_caller(breaker=breaker, max_retries=5)
+
+        with pytest.raises(CircuitOpenError):
+            await caller.call(lambda: stub.generate(PROMPT, {}))
+
+        assert stub.calls == 3
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await caller.call(lambda: stub.generate(PROMPT, {}))
+        assert stub.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_half_open_recovers(self):
+        """正常系：一定時間後に1回だけ試し、成功したら閉じる"""
+        clock = FakeClock()
+        stub = StubBackend(errors=[server_error()])
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+        caller = make_caller(breaker=breaker, max_retries=0)
+        with pytest.raises(genai_errors.ServerError):
+            await caller.call(lambda: stub.generate(PROMPT, {}))
+
+        clock.now = 31
+        await caller.call(lambda: stub.generate(PROMPT, {}))
+
+        assert breaker.state == "closed"
+        assert stub.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_half_open_trial_cancelled(self):
+        """異常系：半開の試行がキャンセルされても枠を返し、次の呼び出しで回復できる"""
+        clock = FakeClock()
+        stub = StubBackend(errors=[server_error()], delays=[0.0, 5.0])
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+        caller = make_caller(breaker=breaker, max_retries=0, timeout=10)
+        with pytest.raises(genai_errors.ServerError):
+            await caller.call(lambda: stub.generate(PROMPT, {}))
+
+        clock.now = 31
+        trial = asyncio.create_task(caller.call(lambda: stub.generate(PROMPT, {})))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        await caller.call(lambda: stub.generate(PROMPT, {}))
+        assert breaker.state == "closed"
+        assert stub.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_half_open_client_error_keeps_state(self):
+        """異常系：半開の試行が4xxなら閉じずに枠だけ返す"""
+        clock = FakeClock()
+        stub = StubBackend(errors=[server_error(), client_error()])
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+        caller = make_caller(breaker=breaker, max_retries=0)
+        with pytest.raises(genai_errors.ServerError):
+            await caller.call(lambda: stub.generate(PROMPT, {}))
+
+        clock.now = 31
+        with pytest.raises(genai_errors.ClientError):
+            await caller.call(lambda: stub.generate(PROMPT, {}))
+        assert breaker.state == "half_open"
+
+        await caller.call(lambda: stub.generate(PROMPT, {}))
+        assert breaker.state == "closed"
+
+
+class TestStream:
+    """
+    ストリーミングの再試行
+    """
+
+    @pytest.mark.asyncio
+    async def test_retry_before_first_chunk(self):
+        """正常系：最初のチャンクが来るまでの失敗は再試行し、全文を返す"""
+        # 1回目はタイムアウト、2回目は503、3回目で成功
+        stub = StubBackend(delays=[5.0, 0.0, 0.0], errors=[None, server_error()])
+
+        chunks = [
+            chunk
+            async for chunk in make_caller().stream(lambda: stub.stream(PROMPT, {}))
+        ]
+
+        assert json.loads("".join(chunks)) == StubBackend.result_for(PROMPT)
+        assert stub.calls == 3
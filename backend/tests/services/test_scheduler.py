@@ -0,0 +1,281 @@
+# tests/services/test_scheduler.py
+"""
+定期分析スケジューラーのテスト（GitHub / Geminiは差し替え）
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base
+from app.exceptions import AppException, ErrorCode
+from app.models import Analysis, TrackedRepo, User
+from app.services.scheduler import (
+    acquire_lease,
+    in_offpeak_window,
+    run_refresh_cycle,
+)
+from tests.conftest import TestingSessionLocal
+
+RESULT = {
+    "scores": {
+        "test": 60, "comment": 70, "commit_size": 90,
+        "commit_frequency": 85, "commit_message": 75, "activity": 80
+    },
+    "report": {
+        "test": "G", "comment": "G", "commit_size": "G",
+        "commit_frequency": "G", "commit_message": "G", "activity": "G"
+    }
+}
+
+
+@pytest.fixture
+def no_spacing(monkeypatch):
+    """開始間隔の待ち時間をなくす"""
+    monkeypatch.setattr(settings, "scheduler_start_interval_seconds", 0)
+
+
+@pytest.fixture
+def file_session_factory(tmp_path):
+    """スレッドから並行して使うテスト用のファイルDB（ユーザーと対象1件）"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'scheduler.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(autoflush=False, bind=engine)
+    with factory() as db:
+        user = User(
+            id="user",
+            github_id=1,
+            github_username="dev",
+            github_access_token="token",
+        )
+        db.add(user)
+        db.commit()
+        add_tracked(db, user, "repo")
+    yield factory
+    engine.dispose()
+
+
+def add_tracked(db_session, user, repo, last_run_at=None):
+    tracked = TrackedRepo(
+        user_id=user.id,
+        repo_url=f"https://github.com/testuser/{repo}",
+        branch="main",
+        limit=30,
+        last_run_at=last_run_at,
+    )
+    db_session.add(tracked)
+    db_session.commit()
+    return tracked
+
+
+class TestLease:
+    """
+    リーダー選出（DBのリース）
+    """
+
+    def test_single_leader(self, db_session):
+        """正常系：期限内は他のownerが取れず、自分は延長できる"""
+        now = datetime.now(timezone.utc)
+
+        assert acquire_lease(db_session, "task-a", now)
+        assert not acquire_lease(db_session, "task-b", now)
+        assert acquire_lease(db_session, "task-a", now)
+
+    def test_takeover_after_expiry(self, db_session):
+        """正常系：期限切れのリースは他のownerが引き継ぐ"""
+        now = datetime.now(timezone.utc)
+        acquire_lease(db_session, "task-a", now)
+
+        later = now + timedelta(seconds=settings.scheduler_lease_seconds + 1)
+
+        assert acquire_lease(db_session, "task-b", later)
+        assert not acquire_lease(db_session, "task-a", later)
+
+
+class TestOffpeakWindow:
+    """
+    オフピーク時間帯の判定
+    """
+
+    def test_across_midnight(self, monkeypatch):
+        """正常系：開始 > 終了 なら日をまたぐ"""
+        monkeypatch.setattr(settings, "scheduler_offpeak_start_hour", 22)
+        monkeypatch.setattr(settings, "scheduler_offpeak_end_hour", 4)
+
+        assert in_offpeak_window(datetime(2026, 1, 1, 23))
+        assert in_offpeak_window(datetime(2026, 1, 1, 3))
+        assert not in_offpeak_window(datetime(2026, 1, 1, 4))
+        assert not in_offpeak_window(datetime(2026, 1, 1, 12))
+
+
+class TestRefreshCycle:
+    """
+    run_refresh_cycle
+    """
+
+    @pytest.mark.asyncio
+    async def test_refresh_due_repos(self, db_session, test_user, no_spacing):
+        """正常系：期限の来た対象だけを差分分析し、結果を記録"""
+        now = datetime.now(timezone.utc)
+        due = add_tracked(db_session, test_user, "due")
+        fresh = add_tracked(db_session, test_user, "fresh", last_run_at=now)
+
+        with patch("app.services.analysis_service.fetch_head_sha") as mock_head, \
+             patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits") as mock_gem:
+            mock_head.return_value = "sha-1"
+            mock_gh.return_value = "=== Commit: abc1234 ==="
+            mock_gem.return_value = RESULT
+            processed = await run_refresh_cycle(TestingSessionLocal, "task-a", now)
+
+        assert processed == 1
+        db_session.expire_all()
+        analysis = db_session.query(Analysis).one()
+        assert analysis.repo_url == due.repo_url
+        assert analysis.head_sha == "sha-1"
+        assert db_session.get(TrackedRepo, due.id).last_analysis_id == analysis.id
+        assert db_session.get(TrackedRepo, fresh.id).last_analysis_id is None
+
+    @pytest.mark.asyncio
+    async def test_skip_unchanged_head(self, db_session, test_user, no_spacing):
+        """正常系：HEADが前回と同じならGitHubのcommit取得もGeminiも呼ばない"""
+        tracked = add_tracked(db_session, test_user, "repo")
+        previous = Analysis(
+            user_id=test_user.id,
+            repo_url=tracked.repo_url,
+            branch="main",
+            scores=RESULT["scores"],
+            report=RESULT["report"],
+            head_sha="sha-1",
+        )
+        db_session.add(previous)
+        db_session.commit()
+
+        with patch("app.services.analysis_service.fetch_head_sha") as mock_head, \
+             patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits") as mock_gem:
+            mock_head.return_value = "sha-1"
+            await run_refresh_cycle(TestingSessionLocal, "task-a")
+
+        mock_gh.assert_not_called()
+        mock_gem.assert_not_called()
+        db_session.expire_all()
+        assert db_session.query(Analysis).count() == 1
+        assert db_session.get(TrackedRepo, tracked.id).last_analysis_id == previous.id
+
+    @pytest.mark.asyncio
+    async def test_not_leader(self, db_session, test_user, no_spacing):
+        """正常系：他のタスクがリースを持っていれば何もしない"""
+        add_tracked(db_session, test_user, "repo")
+        acquire_lease(db_session, "task-b")
+
+        with patch("app.services.analysis_service.fetch_head_sha") as mock_head:
+            processed = await run_refresh_cycle(TestingSessionLocal, "task-a")
+
+        assert processed == 0
+        mock_head.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stop_on_rate_limit(self, db_session, test_user, no_spacing, monkeypatch):
+        """異常系：GitHubのレート制限に当たったら残りは次の周期に回す"""
+        monkeypatch.setattr(settings, "scheduler_max_concurrency", 1)
+        for i in range(3):
+            add_tracked(db_session, test_user, f"repo{i}")
+
+        with patch("app.services.analysis_service.fetch_head_sha") as mock_head:
+            mock_head.side_effect = AppException(
+                429, ErrorCode.GITHUB_API_ERROR, "GitHub API rate limit exceeded"
+            )
+            processed = await run_refresh_cycle(TestingSessionLocal, "task-a")
+
+        assert processed == 1
+        db_session.expire_all()
+        errors = [t.last_error for t in db_session.query(TrackedRepo).all()]
+        assert errors.count("GitHub API rate limit exceeded") == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_on_github_403_rate_limit(
+        self, db_session, test_user, no_spacing, monkeypatch
+    ):
+        """異常系：GitHubが403で返すレート制限（二次レート制限）でも残りは次の周期に回す"""
+        import httpx
+
+        monkeypatch.setattr(settings, "scheduler_max_concurrency", 1)
+        for i in range(3):
+            add_tracked(db_session, test_user, f"repo{i}")
+
+        async def limited(self, path, params=None, headers=None):
+            return httpx.Response(
+                403,
+                json={"message": "You have exceeded a secondary rate limit"},
+                headers={"Retry-After": "60"},
+            )
+
+        with patch("app.services.github_client.GitHubClient.get", new=limited):
+            processed = await run_refresh_cycle(TestingSessionLocal, "task-a")
+
+        assert processed == 1
+
+
+class TestLeaseDuringCycle:
+    """
+    run_refresh_cycle のリース延長
+    """
+
+    @pytest.mark.asyncio
+    async def test_renew_while_waiting(
+        self, file_session_factory, no_spacing, monkeypatch
+    ):
+        """正常系：最後の分析を待つ間もリースを延長し、他のタスクはリーダーになれない"""
+        monkeypatch.setattr(settings, "scheduler_lease_seconds", 0.3)
+        takeovers = []
+
+        async def slow_analyze(*args, **kwargs):
+            await asyncio.sleep(0.5)
+            with file_session_factory() as db:
+                takeovers.append(acquire_lease(db, "task-b"))
+            return RESULT
+
+        with patch("app.services.analysis_service.fetch_head_sha") as mock_head, \
+             patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits", slow_analyze):
+            mock_head.return_value = "sha-1"
+            mock_gh.return_value = "=== Commit: abc1234 ==="
+            processed = await run_refresh_cycle(file_session_factory, "task-a")
+
+        assert processed == 1
+        assert takeovers == [False]
+        with file_session_factory() as db:
+            assert db.query(Analysis).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_when_lease_lost(
+        self, file_session_factory, no_spacing, monkeypatch
+    ):
+        """異常系：リースを奪われたら実行中の分析を止め、結果を保存しない"""
+        monkeypatch.setattr(settings, "scheduler_lease_seconds", 0.3)
+        analyzing = asyncio.Event()
+
+        async def slow_analyze(*args, **kwargs):
+            analyzing.set()
+            await asyncio.sleep(5)
+            return RESULT
+
+        with patch("app.services.analysis_service.fetch_head_sha") as mock_head, \
+             patch("app.services.analysis_service.fetch_commits_from_github") as mock_gh, \
+             patch("app.services.analysis_service.analyze_commits", slow_analyze), \
+             patch("app.services.scheduler._renew_lease", return_value=False):
+            mock_head.return_value = "sha-1"
+            mock_gh.return_value = "=== Commit: abc1234 ==="
+            processed = await asyncio.wait_for(
+                run_refresh_cycle(file_session_factory, "task-a"), 2
+            )
+
+        assert analyzing.is_set()
+        assert processed == 1
+        with file_session_factory() as db:
+            assert db.query(Analysis).count() == 0
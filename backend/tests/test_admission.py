@@ -0,0 +1,165 @@
+# tests/test_admission.py
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController
+from app.exceptions import AppException, ErrorCode
+
+
+def make_controller(**overrides) -> AdmissionController:
+    options = dict(
+        max_in_flight=2,
+        queue_size=2,
+        queue_timeout=1.0,
+        user_max_concurrency=10,
+        user_rate_limit=100,
+        user_rate_window=3600,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+class TestAdmissionController:
+    """
+    AdmissionController
+    ユーザーごと・全体の受付制御
+    """
+
+    @pytest.mark.asyncio
+    async def test_user_concurrency_429(self):
+        """異常系：ユーザーの同時実行数を超えたら429（Retry-Afterあり）"""
+        controller = make_controller(user_max_concurrency=1)
+        ticket = await controller.acquire("user")
+
+        with pytest.raises(AppException) as exc_info:
+            await controller.acquire("user")
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.code == ErrorCode.RATE_LIMIT_EXCEEDED
+        assert int(exc_info.value.headers["Retry-After"]) >= 1
+
+        # 他のユーザーは影響を受けない
+        other = await controller.acquire("other")
+        controller.release(ticket)
+        controller.release(other)
+        controller.release(await controller.acquire("user"))
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_counts_cost(self):
+        """異常系：一定時間あたりの回数（cost分）を超えたら429"""
+        controller = make_controller(user_rate_limit=3)
+        controller.release(await controller.acquire("user", cost=3))
+
+        with pytest.raises(AppException) as exc_info:
+            await controller.acquire("user")
+        assert exc_info.value.code == ErrorCode.RATE_LIMIT_EXCEEDED
+        assert 1 <= int(exc_info.value.headers["Retry-After"]) <= 3600
+
+    @pytest.mark.asyncio
+    async def test_user_concurrency_with_slow_shared_state(self, monkeypatch):
+        """異常系：回数の確認を待つ間に来た同じユーザーのリクエストも同時実行数で止める"""
+        from app.shared_state import MemoryBackend
+
+        class SlowBackend(MemoryBackend):
+            async def aincr(self, key, ttl, amount=1):
+                await asyncio.sleep(0.01)
+                return self.incr(key, ttl, amount)
+
+        monkeypatch.setattr("app.admission.shared_state", SlowBackend())
+        controller = make_controller(user_max_concurrency=1)
+
+        results = await asyncio.gather(
+            controller.acquire("user"), controller.acquire("user"),
+            return_exceptions=True,
+        )
+
+        assert sum(isinstance(r, AppException) for r in results) == 1
+
+    @pytest.mark.asyncio
+    async def test_queued_request_admitted_in_order(self):
+        """正常系：上限を超えた分は待ち、空いた順に受け付ける"""
+        controller = make_controller(max_in_flight=1)
+        first = await controller.acquire("a")
+        order = []
+
+        async def wait(user_id: str):
+            ticket = await controller.acquire(user_id)
+            order.append(user_id)
+            return ticket
+
+        second = asyncio.create_task(wait("b"))
+        third = asyncio.create_task(wait("c"))
+        await asyncio.sleep(0)
+        assert controller.in_flight == 1
+        assert order == []
+
+        controller.release(first)
+        controller.release(await second)
+        controller.release(await third)
+        assert order == ["b", "c"]
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_full_server_busy(self):
+        """異常系：待ち行列がいっぱいなら即座に429 SERVER_BUSY"""
+        controller = make_controller(max_in_flight=1, queue_size=1)
+        ticket = await controller.acquire("a")
+        waiting = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AppException) as exc_info:
+            await controller.acquire("c")
+        assert exc_info.value.code == ErrorCode.SERVER_BUSY
+
+        controller.release(ticket)
+        controller.release(await waiting)
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_server_busy_not_counted(self, monkeypatch):
+        """異常系：混雑で断ったリクエストは回数に数えない（出直したクライアントが429にならない）"""
+        from app.shared_state import MemoryBackend
+
+        monkeypatch.setattr("app.admission.shared_state", MemoryBackend())
+        controller = make_controller(max_in_flight=1, queue_size=0, user_rate_limit=2)
+        ticket = await controller.acquire("a")
+
+        for _ in range(3):
+            with pytest.raises(AppException) as exc_info:
+                await controller.acquire("a")
+            assert exc_info.value.code == ErrorCode.SERVER_BUSY
+
+        controller.release(ticket)
+        controller.release(await controller.acquire("a"))
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_server_busy(self):
+        """異常系：待ち時間の上限を過ぎたら429 SERVER_BUSY（ユーザーの枠も返す）"""
+        controller = make_controller(
+            max_in_flight=1, queue_timeout=0.05, user_max_concurrency=1
+        )
+        ticket = await controller.acquire("a")
+
+        with pytest.raises(AppException) as exc_info:
+            await controller.acquire("b")
+        assert exc_info.value.code == ErrorCode.SERVER_BUSY
+
+        controller.release(ticket)
+        controller.release(await controller.acquire("b"))
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_gives_up_slot(self):
+        """正常系：待ちの途中で切断されたら、その分は次に回る"""
+        controller = make_controller(max_in_flight=1)
+        ticket = await controller.acquire("a")
+        cancelled = asyncio.create_task(controller.acquire("b"))
+        waiting = asyncio.create_task(controller.acquire("c"))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        controller.release(ticket)
+        controller.release(await waiting)
+        assert controller.in_flight == 0
@@ -0,0 +1,252 @@
+# tests/test_cli.py
+"""
+python -m app.cli のテスト
+"""
+import asyncio
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app import cli
+from app.models.analysis import SCORE_KEYS
+from app.services.rollup_service import add_to_rollup
+from app.services.commit_archive import pack_commits
+from app.token_vault import TokenVault
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def archived_analysis(db_session, test_analysis):
+    test_analysis.commits_compressed = pack_commits([
+        {
+            "sha": "a" * 40,
+            "commit": {
+                "author": {"name": "dev", "date": "2026-01-01T00:00:00Z"},
+                "message": "archived commit",
+            },
+            "files": [],
+        }
+    ])
+    db_session.commit()
+    return test_analysis
+
+
+class TestRescoreCommand:
+    """
+    python -m app.cli rescore
+    """
+
+    RESULT = {
+        "scores": {key: 42 for key in SCORE_KEYS},
+        "report": {key: "R" for key in SCORE_KEYS},
+    }
+
+    def run(self, capsys, *argv):
+        with patch.object(cli, "SessionLocal", TestingSessionLocal), \
+             patch("app.services.analysis_service.analyze_commits") as mock_gem:
+            mock_gem.return_value = self.RESULT
+            code = cli.main(["rescore", *argv])
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        return code, lines
+
+    def test_ids(self, capsys, archived_analysis):
+        """正常系・異常系：IDごとに1行、失敗があれば終了コード1"""
+        code, lines = self.run(capsys, archived_analysis.id, "missing")
+
+        assert code == 1
+        assert lines[0]["id"] == archived_analysis.id
+        assert lines[0]["status"] == "success"
+        assert lines[0]["scores"]["test"] == 42
+        assert lines[1] == {
+            "id": "missing",
+            "status": "error",
+            "code": "ANALYSIS_NOT_FOUND",
+            "message": "Analysis not found",
+        }
+
+    def test_all(self, capsys, archived_analysis):
+        """正常系：--all でアーカイブのある分析をすべて分析し直す"""
+        code, lines = self.run(capsys, "--all", "--user-id", archived_analysis.user_id)
+
+        assert code == 0
+        assert [line["id"] for line in lines] == [archived_analysis.id]
+
+    def test_requires_target(self, capsys):
+        """異常系：IDも --all も無い"""
+        with pytest.raises(SystemExit):
+            cli.main(["rescore"])
+
+
+class TestAnalyzeCommand:
+    """
+    python -m app.cli analyze
+    """
+
+    RESULT = {
+        "scores": {key: 70 for key in SCORE_KEYS},
+        "report": {key: "A" for key in SCORE_KEYS},
+    }
+
+    def run(self, capsys, *argv, fetch=None):
+        async def default_fetch(*args, **kwargs):
+            return "=== Commit: abc1234 ==="
+
+        with patch.object(cli, "SessionLocal", TestingSessionLocal), \
+             patch.object(cli, "fetch_commits_from_github", fetch or default_fetch), \
+             patch.object(cli, "analyze_commits") as mock_gem:
+            mock_gem.return_value = self.RESULT
+            code = cli.main(["analyze", *argv])
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        return code, lines
+
+    def test_save_to_db(self, capsys, tmp_path, db_session, test_user):
+        """正常系・異常系：成功分はまとめてDBに保存、不正な行はエラー行を出して続ける"""
+        from app.models import Analysis, ScoreRollup
+
+        repos = tmp_path / "repos.txt"
+        repos.write_text(
+            "# backfill\n"
+            "https://github.com/o/a\n"
+            "\n"
+            "https://example.com/o/b\n"
+            '{"repo_url": "https://github.com/o/c", "branch": "dev", "limit": 5}\n'
+        )
+
+        code, lines = self.run(
+            capsys, str(repos), "--user-id", test_user.id, "--batch-size", "1"
+        )
+
+        assert code == 1
+        by_line = {line["line"]: line for line in lines}
+        assert by_line[4]["status"] == "error"
+        assert by_line[4]["code"] == "INVALID_REQUEST"
+        assert by_line[2]["status"] == "success"
+        assert by_line[5]["branch"] == "dev"
+        db_session.expire_all()
+        saved = db_session.query(Analysis).order_by(Analysis.repo_url).all()
+        assert [(a.repo_url, a.branch) for a in saved] == [
+            ("https://github.com/o/a", "main"),
+            ("https://github.com/o/c", "dev"),
+        ]
+        assert {by_line[2]["id"], by_line[5]["id"]} == {a.id for a in saved}
+        assert sum(r.count for r in db_session.query(ScoreRollup)) == 2
+
+    def test_save_failure(self, capsys, tmp_path, db_session, test_user):
+        """異常系：保存に失敗した分は次の保存でやり直し、保存できるまでidを出力しない"""
+        from app.models import Analysis
+
+        repos = tmp_path / "repos.txt"
+        repos.write_text("https://github.com/o/a\nhttps://github.com/o/b\n")
+        failures = iter([True])
+
+        def flaky_rollup(db, analysis):
+            if next(failures, False):
+                raise RuntimeError("database is locked")
+            return add_to_rollup(db, analysis)
+
+        with patch.object(cli, "add_to_rollup", flaky_rollup):
+            code, lines = self.run(
+                capsys, str(repos), "--user-id", test_user.id, "--concurrency", "1",
+                "--batch-size", "1",
+            )
+
+        assert code == 0
+        db_session.expire_all()
+        saved = {a.id for a in db_session.query(Analysis)}
+        assert [line["status"] for line in lines] == ["success", "success"]
+        assert {line["id"] for line in lines} == saved
+        assert len(saved) == 2
+
+    def test_save_failure_reported(self, capsys, tmp_path, db_session, test_user):
+        """異常系：最後まで保存できなかった分はidなしのエラー行にする（例外で止めない）"""
+        from app.models import Analysis
+
+        repos = tmp_path / "repos.txt"
+        repos.write_text("https://github.com/o/a\n")
+
+        with patch.object(cli, "add_to_rollup", side_effect=RuntimeError("down")):
+            code, lines = self.run(capsys, str(repos), "--user-id", test_user.id)
+
+        assert code == 1
+        assert len(lines) == 1
+        assert lines[0]["status"] == "error"
+        assert lines[0]["code"] == "INTERNAL_ERROR"
+        assert "id" not in lines[0]
+        assert db_session.query(Analysis).count() == 0
+
+    def test_jsonl_from_stdin(self, capsys, monkeypatch, db_session):
+        """正常系：--output jsonl ではDBに保存せず、レポートも出力（トークンはGITHUB_TOKEN）"""
+        from app.models import Analysis
+
+        monkeypatch.setattr("sys.stdin", io.StringIO("https://github.com/o/a main\n"))
+        monkeypatch.setenv("GITHUB_TOKEN", "env-token")
+        tokens = []
+
+        async def fetch(repo_url, branch, limit, access_token, **kwargs):
+            tokens.append(access_token)
+            return "log"
+
+        code, lines = self.run(capsys, "--output", "jsonl", fetch=fetch)
+
+        assert code == 0
+        assert lines[0]["report"]["test"] == "A"
+        assert tokens == ["env-token"]
+        assert db_session.query(Analysis).count() == 0
+
+    def test_bounded_concurrency(self, capsys, tmp_path, monkeypatch):
+        """正常系：同時に分析するのは --concurrency 件まで"""
+        repos = tmp_path / "repos.txt"
+        repos.write_text(
+            "".join(f"https://github.com/o/repo{i}\n" for i in range(10))
+        )
+        monkeypatch.setenv("GITHUB_TOKEN", "t")
+        running = 0
+        peak = 0
+
+        async def fetch(*args, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "log"
+
+        code, lines = self.run(
+            capsys, str(repos), "--output", "jsonl", "--concurrency", "3", fetch=fetch
+        )
+
+        assert code == 0
+        assert len(lines) == 10
+        assert peak == 3
+
+    def test_db_requires_user(self, capsys):
+        """異常系：DBに保存するときは --user-id が必要"""
+        with pytest.raises(SystemExit):
+            cli.main(["analyze", "repos.txt"])
+
+
+class TestInitTokenKeyCommand:
+    """
+    python -m app.cli init-token-key
+    """
+
+    def test_create_once(self, capsys, tmp_path):
+        """正常系・異常系：鍵ファイルを作り、既にあれば上書きせず終了コード1"""
+        key_file = tmp_path / "token_vault.key"
+
+        assert cli.main(["init-token-key", "--key-file", str(key_file)]) == 0
+        key = key_file.read_text()
+        assert cli.main(["init-token-key", "--key-file", str(key_file)]) == 1
+
+        assert key_file.read_text() == key
+        assert "already exists" in capsys.readouterr().err
+
+    def test_stdout(self, capsys, tmp_path):
+        """正常系：--stdoutならファイルを作らず鍵を出力する（TOKEN_VAULT_KEYS用）"""
+        assert cli.main(["init-token-key", "--stdout"]) == 0
+
+        key = capsys.readouterr().out.strip()
+        TokenVault(str(tmp_path / "missing.key"), 60, 10, keys=key).check()
+        assert not (tmp_path / "missing.key").exists()
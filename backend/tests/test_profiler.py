@@ -0,0 +1,142 @@
+# tests/test_profiler.py
+import asyncio
+import time
+
+import pytest
+
+from app.profiler import Profiler, ProfileStore
+
+
+def busy_work(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def blocking_work(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def make_profiler(tmp_path, **overrides) -> Profiler:
+    options = dict(interval=0.002, slow_threshold=0.0, sample_rate=0.0)
+    options.update(overrides)
+    return Profiler(store=ProfileStore(str(tmp_path), max_profiles=10), **options)
+
+
+class TestProfiler:
+    """
+    Profiler
+    リクエストごとのスタックサンプリング
+    """
+
+    @pytest.mark.asyncio
+    async def test_attributes_running_waiting_and_thread(self, tmp_path):
+        """正常系：CPU・await待ち・スレッドプールの処理をそれぞれ記録する"""
+        profiler = make_profiler(tmp_path)
+        profiler.start()
+
+        async def request():
+            profile = profiler.begin("GET", "/slow")
+            busy_work(0.1)
+            await asyncio.sleep(0.1)
+            await asyncio.to_thread(blocking_work, 0.1)
+            return await profiler.finish(profile, 200)
+
+        try:
+            profile_id = await asyncio.create_task(request())
+        finally:
+            profiler.stop()
+
+        profile = profiler.store.get(profile_id)
+        stacks = {s["stack"]: s["count"] for s in profile["stacks"]}
+        assert profile["path"] == "/slow"
+        assert profile["reason"] == "slow"
+        assert any(s.startswith("[running]") and "busy_work" in s for s in stacks)
+        assert any(s.startswith("[waiting]") and "sleep" in s for s in stacks)
+        assert any(s.startswith("[thread]") and "blocking_work" in s for s in stacks)
+        assert profile["samples"] == sum(stacks.values())
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_not_mixed(self, tmp_path):
+        """正常系：並行するリクエストのCPU時間はそれぞれのリクエストに記録する"""
+        profiler = make_profiler(tmp_path)
+        profiler.start()
+
+        async def request(path: str):
+            profile = profiler.begin("GET", path)
+            await asyncio.sleep(0)
+            if path == "/busy":
+                busy_work(0.1)
+            else:
+                await asyncio.sleep(0.1)
+            return await profiler.finish(profile, 200)
+
+        try:
+            busy_id, idle_id = await asyncio.gather(
+                asyncio.create_task(request("/busy")),
+                asyncio.create_task(request("/idle")),
+            )
+        finally:
+            profiler.stop()
+
+        busy = profiler.store.get(busy_id)
+        idle = profiler.store.get(idle_id)
+        assert busy["by_state"].get("running", 0) > 0
+        assert not any("busy_work" in s["stack"] for s in idle["stacks"])
+
+    @pytest.mark.asyncio
+    async def test_running_task_unavailable(self, tmp_path, monkeypatch):
+        """異常系：実行中のタスクを引けなくても、サンプリングは止めずに"waiting"として記録する"""
+        profiler = make_profiler(tmp_path, interval=60)
+        profiler.start()
+        try:
+            profile = profiler.begin("GET", "/degraded")
+
+            def unavailable(loop=None):
+                raise RuntimeError("no running event loop")
+
+            with monkeypatch.context() as patched:
+                patched.setattr(asyncio, "current_task", unavailable)
+                profiler.sample()
+            profile_id = await profiler.finish(profile, 200)
+        finally:
+            profiler.stop()
+
+        data = profiler.store.get(profile_id)
+        assert data["samples"] == 1
+        assert set(data["by_state"]) == {"waiting"}
+
+    @pytest.mark.asyncio
+    async def test_fast_request_not_saved(self, tmp_path):
+        """正常系：閾値未満で抽出対象でもなければ保存しない"""
+        profiler = make_profiler(tmp_path, slow_threshold=10.0)
+        profiler.start()
+        try:
+            profile = profiler.begin("GET", "/fast")
+            assert await profiler.finish(profile, 200) is None
+        finally:
+            profiler.stop()
+
+        assert profiler.store.list() == []
+
+
+class TestProfileStore:
+    """
+    ProfileStore
+    上限付きのリングバッファ
+    """
+
+    def test_evicts_oldest(self, tmp_path):
+        """正常系：上限を超えたら古いものから消す"""
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        for i in range(3):
+            store.save({"id": f"{i:032x}", "stacks": []})
+            time.sleep(0.01)
+
+        assert [p["id"] for p in store.list()] == [f"{2:032x}", f"{1:032x}"]
+        assert store.get(f"{0:032x}") is None
+
+    def test_rejects_invalid_id(self, tmp_path):
+        """異常系：IDの形式でなければ読まない（パスの指定を防ぐ）"""
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        assert store.get("../secret") is None
@@ -0,0 +1,246 @@
+# tests/test_shared_state.py
+"""
+ワーカー間の共有状態（memory / database、redisはロックだけ偽のクライアントで）のテスト
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import shared_state as shared_state_module
+from app.compression import CompressedCache
+from app.services.github_client import GitHubClient
+from app.shared_state import (
+    DatabaseBackend,
+    MemoryBackend,
+    RedisBackend,
+    SharedStateBackend,
+    shared_lock,
+)
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture(params=["memory", "database"])
+def backend(request, db_session):
+    if request.param == "memory":
+        return MemoryBackend()
+    return DatabaseBackend(TestingSessionLocal)
+
+
+class TestBackend:
+    """
+    SharedStateBackend（memory / database で同じ振る舞い）
+    """
+
+    def test_get_set_ttl(self, backend):
+        """正常系：期限付きの値は期限後に消える"""
+        backend.set("a", b"1")
+        backend.set("b", b"2", ttl=0.01)
+        time.sleep(0.02)
+
+        assert backend.get("a") == b"1"
+        assert backend.get("b") is None
+        backend.delete("a")
+        assert backend.get("a") is None
+
+    def test_incr_fixed_window(self, backend):
+        """正常系：カウンターは窓の終わりで0から数え直す"""
+        assert [backend.incr("c", ttl=0.05) for _ in range(3)] == [1, 2, 3]
+        time.sleep(0.06)
+
+        assert backend.incr("c", ttl=0.05) == 1
+
+    def test_lock(self, backend):
+        """正常系：他の持ち主のロックは期限まで取れない"""
+        assert backend.acquire_lock("l", "worker-1", ttl=10)
+        assert not backend.acquire_lock("l", "worker-2", ttl=10)
+        backend.release_lock("l", "worker-2")
+        assert not backend.acquire_lock("l", "worker-2", ttl=10)
+
+        backend.release_lock("l", "worker-1")
+
+        assert backend.acquire_lock("l", "worker-2", ttl=10)
+
+    def test_lock_expires(self, backend):
+        """正常系：期限切れのロックは他の持ち主が取れる"""
+        backend.acquire_lock("l", "worker-1", ttl=0.01)
+        time.sleep(0.02)
+
+        assert backend.acquire_lock("l", "worker-2", ttl=10)
+
+
+    @pytest.mark.asyncio
+    async def test_async_methods(self, backend):
+        """正常系：非同期版も同期版と同じ振る舞い（database・redisはスレッドで実行）"""
+        await backend.aset("a", b"1", ttl=10)
+        assert await backend.aget("a") == b"1"
+        await backend.adelete("a")
+        assert await backend.aget("a") is None
+
+        assert [await backend.aincr("c", ttl=10) for _ in range(2)] == [1, 2]
+        assert await backend.aacquire_lock("l", "worker-1", ttl=10)
+        assert not await backend.aacquire_lock("l", "worker-2", ttl=10)
+        await backend.arelease_lock("l", "worker-1")
+        assert await backend.aacquire_lock("l", "worker-2", ttl=10)
+
+    def test_backend_must_implement_all(self):
+        """異常系：操作が欠けた保存先は作れない"""
+
+        class Partial(SharedStateBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            Partial()
+
+class FakeRedis:
+    """
+    redis.Redis の代わり（ロックに使うコマンドだけ）
+    - 登録したスクリプトは、比較と操作を1回で行うものとして再現する
+    - ロックの延長でGET・PEXPIREを別々に呼んだら失敗させる
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    @classmethod
+    def from_url(cls, url):
+        return cls()
+
+    def set(self, key, value, px=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        self.ttls[key] = px
+        return True
+
+    def get(self, key):
+        raise AssertionError("lock must not be read and extended separately")
+
+    def pexpire(self, key, ms):
+        raise AssertionError("lock must not be read and extended separately")
+
+    def register_script(self, source):
+        def run(keys, args):
+            key, value = keys[0], args[0]
+            if self.values.get(key) != value:
+                return 0
+            if source == RedisBackend._RENEW_SCRIPT:
+                self.ttls[key] = args[1]
+            else:
+                del self.values[key]
+            return 1
+
+        return run
+
+
+class TestRedisLock:
+    """
+    RedisBackend のロック（SET NX PXで取得、スクリプトで比較と延長を1回で行う）
+    """
+
+    @pytest.fixture
+    def redis_backend(self, monkeypatch):
+        monkeypatch.setattr(
+            shared_state_module, "redis", SimpleNamespace(Redis=FakeRedis)
+        )
+        return RedisBackend("redis://localhost:6379/0")
+
+    def test_acquire_and_renew(self, redis_backend):
+        """正常系：自分のロックは延長でき、他の持ち主は取れない"""
+        assert redis_backend.acquire_lock("l", "worker-1", ttl=10)
+        assert redis_backend.acquire_lock("l", "worker-1", ttl=20)
+        assert not redis_backend.acquire_lock("l", "worker-2", ttl=10)
+
+        assert redis_backend._client.ttls["l"] == 20000
+        assert redis_backend._client.values["l"] == b"worker-1"
+
+    def test_release_then_acquire(self, redis_backend):
+        """正常系：自分のロックだけを消し、消えたら他の持ち主が取れる"""
+        redis_backend.acquire_lock("l", "worker-1", ttl=10)
+        redis_backend.release_lock("l", "worker-2")
+        assert not redis_backend.acquire_lock("l", "worker-2", ttl=10)
+
+        redis_backend.release_lock("l", "worker-1")
+
+        assert redis_backend.acquire_lock("l", "worker-2", ttl=10)
+
+
+class TestSharedUsage:
+    """
+    共有の保存先を使う機能（ワーカー2つ分を同じ保存先で再現）
+    """
+
+    def test_compressed_cache_between_workers(self):
+        """正常系：他のワーカーが圧縮したボディを使い回す"""
+        backend = MemoryBackend()
+        worker1 = CompressedCache(1024, shared=backend)
+        worker2 = CompressedCache(1024, shared=backend)
+        key = ("id", "2026-01-01T00:00:00", "gzip")
+
+        worker1.set(key, b"body")
+
+        assert worker2.get(key) == b"body"
+
+    @pytest.mark.asyncio
+    async def test_github_rate_limit_between_workers(self, monkeypatch):
+        """異常系：他のワーカーがレート制限を使い切っていれば最初から429"""
+        import httpx
+        from app.exceptions import AppException
+
+        monkeypatch.setattr(
+            "app.services.github_client.shared_state", MemoryBackend()
+        )
+
+        async def exhausted(*args, **kwargs):
+            return httpx.Response(
+                200,
+                headers={
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(int(time.time()) + 60),
+                },
+            )
+
+        async with GitHubClient("token") as worker1:
+            monkeypatch.setattr(worker1._client, "get", exhausted)
+            await worker1.get("/rate_limit")
+
+        async with GitHubClient("token") as worker2:
+            with pytest.raises(AppException) as exc:
+                await worker2.get("/rate_limit")
+        async with GitHubClient("other-token") as other:
+            assert other.rate_limit_remaining is None
+
+        assert exc.value.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_shared_lock_single_flight(self, monkeypatch):
+        """正常系：同じキーの処理は1つずつ実行される"""
+        monkeypatch.setattr(shared_state_module, "shared_state", MemoryBackend())
+        running = 0
+        max_running = 0
+
+        async def work(owner):
+            nonlocal running, max_running
+            async with shared_lock("clone", owner, ttl=10, timeout=5):
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*[work(f"worker-{i}") for i in range(3)])
+
+        assert max_running == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_lock_timeout(self, monkeypatch):
+        """異常系：取れないまま待ち時間を過ぎたらTimeoutError"""
+        backend = MemoryBackend()
+        monkeypatch.setattr(shared_state_module, "shared_state", backend)
+        backend.acquire_lock("clone", "worker-1", ttl=10)
+
+        with pytest.raises(TimeoutError):
+            async with shared_lock("clone", "worker-2", ttl=10, timeout=0.1):
+                pass
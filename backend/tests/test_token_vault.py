@@ -0,0 +1,184 @@
+# tests/test_token_vault.py
+"""
+アクセストークンの暗号化（token_vault）のテスト
+"""
+import os
+import stat
+import time
+
+import pytest
+
+from app.token_vault import (
+    TokenVault,
+    TokenVaultError,
+    generate_key,
+    generate_key_file,
+)
+
+
+def make_vault(path, vault_class=TokenVault, **options):
+    generate_key_file(str(path))
+    return vault_class(str(path), **{"cache_ttl": 60, "cache_max_entries": 2, **options})
+
+
+@pytest.fixture
+def vault(tmp_path):
+    return make_vault(tmp_path / "vault.key")
+
+
+class CountingVault(TokenVault):
+    """実際に復号した回数を数える"""
+
+    decrypted = 0
+
+    def _decrypt(self, value):
+        self.decrypted += 1
+        return super()._decrypt(value)
+
+
+class TestEncryption:
+    """
+    エンベロープ暗号化
+    """
+
+    def test_round_trip(self, vault):
+        """正常系：暗号化したトークンを復号できる（毎回別の暗号文になる）"""
+        first = vault.encrypt("gho_secret")
+        second = vault.encrypt("gho_secret")
+
+        assert first.startswith("v1.")
+        assert "gho_secret" not in first
+        assert first != second
+        assert vault.decrypt(first) == vault.decrypt(second) == "gho_secret"
+
+    def test_generate_key_file(self, tmp_path):
+        """正常系：鍵ファイルは本人だけが読める権限で作り、既存の鍵は上書きしない"""
+        path = str(tmp_path / "new.key")
+        generate_key_file(path)
+        with open(path) as f:
+            key = f.read()
+
+        with pytest.raises(FileExistsError):
+            generate_key_file(path)
+
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        with open(path) as f:
+            assert f.read() == key
+
+    def test_missing_key_file(self, tmp_path):
+        """異常系：鍵ファイルが無ければ作らずにTokenVaultError"""
+        vault = TokenVault(str(tmp_path / "missing.key"), 60, 10)
+
+        with pytest.raises(TokenVaultError):
+            vault.check()
+        with pytest.raises(TokenVaultError):
+            vault.encrypt("gho_secret")
+
+        assert not os.path.exists(vault.key_file)
+
+    def test_keys_setting(self, tmp_path):
+        """正常系：TOKEN_VAULT_KEYSで渡した鍵を使い、鍵ファイルは読まない（カンマ区切りで入れ替えも可）"""
+        old_key, new_key = generate_key(), generate_key()
+        old = TokenVault(str(tmp_path / "missing.key"), 60, 10, keys=old_key)
+        old.check()
+        encrypted = old.encrypt("gho_secret")
+
+        rotated = TokenVault(
+            str(tmp_path / "missing.key"), 60, 10, keys=f"{new_key},{old_key}"
+        )
+
+        assert rotated.decrypt(encrypted) == "gho_secret"
+        assert rotated.decrypt(rotated.encrypt("gho_new")) == "gho_new"
+        assert old.encrypt("x").split(".")[1] != rotated.encrypt("x").split(".")[1]
+        assert not os.path.exists(tmp_path / "missing.key")
+
+    def test_key_rotation(self, vault, tmp_path):
+        """正常系：新しい鍵を先頭に足しても、古い鍵の暗号文を復号できる"""
+        old = vault.encrypt("gho_old")
+        with open(vault.key_file) as f:
+            old_key = f.read()
+        rotated = TokenVault(str(tmp_path / "vault.key"), 60, 10)
+        with open(rotated.key_file, "w") as f:
+            f.write("A" * 43 + "\n" + old_key)
+
+        new = rotated.encrypt("gho_new")
+
+        assert new.split(".")[1] != old.split(".")[1]
+        assert rotated.decrypt(old) == "gho_old"
+        assert rotated.decrypt(new) == "gho_new"
+
+    def test_plaintext_passthrough(self, vault):
+        """正常系：暗号化前の平文（移行中の行）はそのまま返す"""
+        assert vault.decrypt("gho_plain") == "gho_plain"
+
+    def test_tampered(self, vault):
+        """異常系：書き換えられた暗号文は復号しない"""
+        encrypted = vault.encrypt("gho_secret")
+        tampered = encrypted[:-2] + ("A" if encrypted[-2] != "A" else "B") + "A"
+
+        with pytest.raises(TokenVaultError):
+            vault.decrypt(tampered)
+
+    def test_unknown_key(self, vault, tmp_path):
+        """異常系：鍵ファイルに無い鍵の暗号文は復号できない"""
+        other = make_vault(tmp_path / "other.key")
+
+        with pytest.raises(TokenVaultError):
+            vault.decrypt(other.encrypt("gho_secret"))
+
+
+class TestCache:
+    """
+    復号したトークンのキャッシュ
+    """
+
+    @pytest.fixture
+    def vault(self, tmp_path):
+        return make_vault(tmp_path / "vault.key", CountingVault)
+
+    def test_hit(self, vault):
+        """正常系：同じユーザー・同じ暗号文は2回目から復号しない"""
+        encrypted = vault.encrypt("gho_secret")
+
+        assert vault.decrypt(encrypted, "u1") == "gho_secret"
+        assert vault.decrypt(encrypted, "u1") == "gho_secret"
+        assert vault.decrypted == 1
+
+    def test_ciphertext_changed(self, vault):
+        """正常系：暗号文が変わったら（他のワーカーで再ログイン）復号し直す"""
+        vault.decrypt(vault.encrypt("gho_old"), "u1")
+
+        assert vault.decrypt(vault.encrypt("gho_new"), "u1") == "gho_new"
+        assert vault.decrypted == 2
+
+    def test_invalidate(self, vault):
+        """正常系：invalidateで捨てたら復号し直す"""
+        encrypted = vault.encrypt("gho_secret")
+        vault.decrypt(encrypted, "u1")
+
+        vault.invalidate("u1")
+        vault.decrypt(encrypted, "u1")
+
+        assert vault.decrypted == 2
+
+    def test_expired(self, vault):
+        """正常系：期限を過ぎたら復号し直す"""
+        vault.cache_ttl = 0.01
+        encrypted = vault.encrypt("gho_secret")
+        vault.decrypt(encrypted, "u1")
+        time.sleep(0.02)
+
+        vault.decrypt(encrypted, "u1")
+
+        assert vault.decrypted == 2
+
+    def test_max_entries(self, vault):
+        """正常系：件数の上限を超えたら古いユーザーから捨てる"""
+        tokens = {user: vault.encrypt(f"gho_{user}") for user in ("u1", "u2", "u3")}
+        for user, encrypted in tokens.items():
+            vault.decrypt(encrypted, user)
+
+        vault.decrypt(tokens["u3"], "u3")
+        vault.decrypt(tokens["u1"], "u1")
+
+        assert vault.decrypted == 4